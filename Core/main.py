@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
-import json
+import sys
 from datetime import datetime
 from modules.web_scanner import WebScanner
 from modules.network_scanner import NetworkScanner
 from core.analyzer import ResultAnalyzer
-from core.reporter import ReportGenerator
+from core.result_cache import ResultCache
+from core.result_store import ResultStore
 
 class KaliNovaPentest:
-    def __init__(self, target: str):
+    def __init__(self, target: str, cache_path: str = 'outputs/scan_cache.db', refresh: bool = False,
+                 store_path: str = 'outputs/results.db'):
         self.target = target
         self.config = {
             'threads': 10,
@@ -17,7 +19,11 @@ class KaliNovaPentest:
             'wordlist': '/usr/share/wordlists/dirb/common.txt'
         }
         self.scanners = []
-        self.results = {}
+        self.store = ResultStore(store_path)
+        self.run_id = None
+        self.cache = ResultCache(cache_path) if cache_path else None
+        if self.cache is not None and refresh:
+            self.cache.invalidate(target)
     
     def setup_scanners(self, scan_type: str = "full"):
         """Configura los scanners según el tipo de escaneo"""
@@ -26,34 +32,69 @@ class KaliNovaPentest:
         
         if scan_type in ["network", "full"]:
             self.scanners.append(NetworkScanner(self.target, self.config))
+        
+        # Re-escaneo incremental: cada scanner reutiliza lo que siga vigente
+        for scanner in self.scanners:
+            scanner.cache = self.cache
     
     async def run_pentest(self):
         """Ejecuta el pentest completo"""
         print(f"[*] Iniciando pentest en {self.target}")
         print(f"[*] Hora de inicio: {datetime.now()}")
         
-        tasks = [scanner.run_scan() for scanner in self.scanners]
-        scan_results = await asyncio.gather(*tasks)
+        self.run_id = self.store.start_run(self.target, {'config': self.config,
+                                                         'scanners': [s.module_name for s in self.scanners]})
+        # Los hallazgos van directos al almacén: el analizador solo guarda contadores y huellas
+        analyzer = ResultAnalyzer(keep_findings=False, on_finding=lambda finding: self.store.append_finding(
+            self.run_id, self.target, finding.get('module', ''), finding))
+        
+        def sink(scanner):
+            """Guarda cada resultado parcial del scanner en cuanto se produce"""
+            def on_result(kind: str, section: str, value):
+                if kind == 'result':
+                    self.store.append_result(self.run_id, self.target, scanner.module_name, {section: value})
+                elif kind == 'finding' and scanner.module_name == 'web':
+                    analyzer.add_web_results({section: [value]}, module=scanner.module_name)
+                else:
+                    self.store.append(self.run_id, self.target, scanner.module_name, kind, value, key=section)
+            return on_result
         
-        # Combinar resultados
-        for i, scanner in enumerate(self.scanners):
-            scanner_name = scanner.__class__.__name__.replace('Scanner', '').lower()
-            self.results[scanner_name] = scan_results[i]
+        async def run(scanner):
+            scanner.result_sink = sink(scanner)
+            return scanner, await scanner.run_scan()
         
-        # Analizar resultados
-        analyzer = ResultAnalyzer()
-        analysis = analyzer.analyze_vulnerabilities(self.results)
-        self.results['analysis'] = analysis
+        try:
+            for finished in asyncio.as_completed([run(scanner) for scanner in self.scanners]):
+                scanner, result = await finished
+                # Solo las secciones que no se guardaron ya (o cambiaron) durante el escaneo
+                self.store.append_result(self.run_id, self.target, scanner.module_name, {
+                    section: value for section, value in result.items()
+                    if scanner.streamed.get(section) is not value
+                })
+                summary = analyzer.generate_summary()
+                print(f"[*] {scanner.module_name} completado: {summary['total']} vulnerabilidades únicas "
+                      f"({summary['duplicates']} duplicadas)")
+        except BaseException:
+            self.store.finish_run(self.run_id, 'failed')
+            raise
         
-        # Generar reporte
-        reporter = ReportGenerator()
-        report = reporter.generate_report(self.results, self.target)
+        analysis = analyzer.snapshot()
+        self.store.append(self.run_id, self.target, 'analysis', 'analysis',
+                          {'summary': analysis['summary'], 'risk_score': analysis['risk_score']})
+        self.store.finish_run(self.run_id)
         
         print(f"[+] Pentest completado")
-        print(f"[+] Vulnerabilidades encontradas: {len(analysis['vulnerabilities'])}")
+        print(f"[+] Vulnerabilidades encontradas: {analysis['summary']['total']}")
         print(f"[+] Score de riesgo: {analysis['risk_score']:.1f}/10.0")
+        print(f"[+] Resultados en {self.store.path} (ejecución {self.run_id})")
+        if self.cache is not None:
+            print(f"[+] Caché: {self.cache.stats['hits']} aciertos, {self.cache.stats['misses']} fallos")
         
-        return report
+        return {'run_id': self.run_id, 'target': self.target, **analysis}
+    
+    def write_report(self, fp):
+        """Reporte completo leído del almacén"""
+        self.store.write_report(self.run_id, fp)
 
 async def main():
     parser = argparse.ArgumentParser(description='KaliNova - Sistema de Automatización de Pentesting')
@@ -61,6 +102,10 @@ async def main():
     parser.add_argument('-t', '--type', choices=['web', 'network', 'full'], 
                        default='full', help='Tipo de escaneo')
     parser.add_argument('-o', '--output', help='Archivo de salida para el reporte')
+    parser.add_argument('--cache', default='outputs/scan_cache.db', help='Base de datos de caché de resultados')
+    parser.add_argument('--no-cache', action='store_true', help='No usar la caché de resultados')
+    parser.add_argument('--refresh', action='store_true', help='Ignorar resultados cacheados de este target')
+    parser.add_argument('--store', default='outputs/results.db', help='Almacén de resultados (SQLite)')
     
     args = parser.parse_args()
     
@@ -69,18 +114,18 @@ async def main():
         args.target = f"http://{args.target}"
     
     # Ejecutar pentest
-    pentest = KaliNovaPentest(args.target)
+    pentest = KaliNovaPentest(args.target, None if args.no_cache else args.cache, args.refresh, args.store)
     pentest.setup_scanners(args.type)
     
-    report = await pentest.run_pentest()
+    await pentest.run_pentest()
     
     # Guardar reporte
     if args.output:
         with open(args.output, 'w') as f:
-            json.dump(report, f, indent=2)
+            pentest.write_report(f)
         print(f"[+] Reporte guardado en: {args.output}")
     else:
-        print(json.dumps(report, indent=2))
+        pentest.write_report(sys.stdout)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,10 +1,39 @@
 import asyncio
+import shutil
+from typing import Dict, Any, List, Callable, Awaitable
 from scapy.all import ARP, Ether, IP, TCP, UDP, ICMP, srp, sr1
 from core.scanner import BaseScanner
+from core.nmap_parser import NmapXMLStreamParser, NmapHost
+from core.scan_planner import PortScanPlanner, PortScanTask
+from core.connect_scanner import AsyncConnectScanner, COMMON_TCP_PORTS
 
 class NetworkScanner(BaseScanner):
     def __init__(self, target: str, config: Dict[str, Any]):
         super().__init__(target, config)
+        self.host_listeners: List[Callable[[NmapHost], Any]] = []
+        self._stages: Dict[str, asyncio.Future] = {}
+        # Cada host se entrega al sink en cuanto nmap lo termina
+        self.add_host_listener(lambda host: self.emit('host', host.address, host.to_dict()))
+    
+    def add_host_listener(self, listener: Callable[[NmapHost], Any]):
+        """Registra un callback que recibe cada host en cuanto nmap lo termina"""
+        self.host_listeners.append(listener)
+    
+    async def run_nmap(self, args: List[str], targets: List[str] = None) -> List[NmapHost]:
+        """Ejecuta nmap con salida XML y la parsea mientras nmap sigue corriendo"""
+        def on_host(host: NmapHost):
+            for listener in self.host_listeners:
+                listener(host)
+        
+        parser = NmapXMLStreamParser(on_host=on_host)
+        result = await self.run_command(
+            ['nmap', *args, '-oX', '-', *(targets or [self.target])],
+            line_callback=parser.feed
+        )
+        hosts = parser.close()
+        if not result['success'] or parser.error:
+            print(f"[-] nmap {' '.join(args)}: {result.get('error') or parser.error}")
+        return hosts
     
     async def run_scan(self):
         """Escaneo completo de red"""
@@ -15,54 +44,209 @@ class NetworkScanner(BaseScanner):
             self.service_detection()
         ]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await self.gather_checks(*tasks)
         return self.compile_results(results)
     
+    async def once(self, name: str, stage: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Ejecuta una fase una sola vez por escaneo y comparte su resultado"""
+        if name not in self._stages:
+            self._stages[name] = asyncio.ensure_future(stage())
+        return await asyncio.shield(self._stages[name])
+    
     async def ping_sweep(self) -> Dict[str, Any]:
         """Escaneo de hosts activos en la red"""
+        return await self.once('ping_sweep', self._ping_sweep)
+    
+    async def _ping_sweep(self) -> Dict[str, Any]:
         print(f"[+] Realizando ping sweep en {self.target}")
         
-        # Implementación con scapy
-        result = self.execute_command(['nmap', '-sn', self.target])
-        
-        active_hosts = []
-        if result['success']:
-            for line in result['stdout'].split('\n'):
-                if 'Nmap scan report for' in line:
-                    host = line.split()[-1]
-                    active_hosts.append(host)
+        hosts = await self.run_nmap(['-sn'])
+        active_hosts = [host.address for host in hosts if host.status == 'up']
         
         return {'active_hosts': active_hosts}
     
+    def port_scan_backend(self) -> str:
+        """'nmap', 'connect' o 'auto' (connect si nmap no está instalado)"""
+        backend = self.config.get('port_scan_backend', 'auto')
+        if backend == 'auto':
+            return 'nmap' if shutil.which('nmap') else 'connect'
+        return backend
+    
+    async def cached_host_stage(self, result_type: str, hosts: List[str],
+                                run: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                                key: Callable[[str], str] = None) -> Dict[str, Any]:
+        """Ejecuta una fase por host reutilizando de la caché los hosts aún vigentes
+        
+        `run` recibe solo los hosts nuevos o caducados y devuelve {host: resultado};
+        solo se cachean los hosts presentes en esa respuesta (un fallo no se cachea).
+        `key` permite incluir en la clave de caché lo que invalida el resultado.
+        """
+        key = key or (lambda host: host)
+        per_host = {}
+        stale = []
+        for host in hosts:
+            cached = self.cache_get(result_type, key=key(host))
+            if cached is None:
+                stale.append(host)
+            else:
+                per_host[host] = cached
+        
+        if stale:
+            if self.cache is not None and per_host:
+                print(f"[*] {result_type}: {len(per_host)} hosts desde caché, {len(stale)} por escanear")
+            fresh = await run(stale)
+            for host, value in fresh.items():
+                self.cache_put(result_type, value, key=key(host))
+            per_host.update(fresh)
+        return per_host
+    
     async def port_scan(self) -> Dict[str, Any]:
-        """Escaneo de puertos"""
-        print(f"[+] Escaneando puertos en {self.target}")
-        
-        scan_types = {
-            'tcp_syn': '-sS',
-            'tcp_connect': '-sT',
-            'udp': '-sU'
-        }
-        
-        scan_results = {}
-        for scan_name, flag in scan_types.items():
-            command = ['nmap', flag, '-p-', '--open', self.target]
-            result = self.execute_command(command)
+        """Escaneo de puertos planificado sobre los hosts vivos"""
+        return await self.once('port_scan', self._port_scan)
+    
+    async def _port_scan(self) -> Dict[str, Any]:
+        live_hosts = (await self.ping_sweep())['active_hosts'] or [self.target]
+        extra = {}
+        
+        async def run(hosts: List[str]) -> Dict[str, Any]:
+            if self.port_scan_backend() == 'connect':
+                records, extra['port_scan_stats'] = await self.connect_port_scan(hosts)
+                per_host = {host: [] for host in hosts}
+            else:
+                records, extra['port_scan_plan'], scanned = await self.nmap_port_scan(hosts)
+                per_host = {host: [] for host in scanned}
+            for record in records:
+                per_host.setdefault(record['host'], []).append(record)
+            return per_host
+        
+        per_host = await self.cached_host_stage('port_scan', live_hosts, run)
+        
+        scan_results = {'tcp': [], 'udp': []}
+        for records in per_host.values():
+            for record in records:
+                scan_results.setdefault(record['protocol'], []).append(record)
+        
+        return {'port_scan': scan_results, **extra}
+    
+    async def nmap_port_scan(self, live_hosts: List[str]):
+        """Ejecuta el plan de nmap y devuelve (puertos abiertos, resumen del plan, hosts escaneados)"""
+        planner = PortScanPlanner(self.config)
+        plan = planner.plan(live_hosts)
+        
+        print(f"[+] Escaneando puertos en {len(live_hosts)} hosts: {len(plan.tasks)} tareas, "
+              f"~{plan.estimated_total():.0f}s estimados")
+        
+        workers = asyncio.Semaphore(plan.workers)
+        # (host, protocolo, puerto) -> registro: la fase 'full' repite los top-ports
+        open_ports: Dict[tuple, Dict[str, Any]] = {}
+        scanned = set()
+        
+        async def run_task(task: PortScanTask):
+            async with workers:
+                hosts = await self.run_nmap(task.nmap_args(), targets=task.hosts)
+            for host in hosts:
+                scanned.add(host.address)
+                for port in host.open_ports():
+                    record = {'host': host.address, **port.to_dict()}
+                    open_ports.setdefault((host.address, record['protocol'], str(record['port'])), record)
+            plan.mark_done(task)
+            print(f"[*] Port scan: {plan.completed_tasks}/{len(plan.tasks)} tareas, ETA {plan.eta():.0f}s")
+        
+        await asyncio.gather(*[run_task(task) for task in plan.tasks])
+        
+        return list(open_ports.values()), plan.summary(), scanned
+    
+    async def connect_port_scan(self, hosts: List[str]):
+        """Escaneo TCP connect con el motor asyncio propio (sin nmap)"""
+        ports = range(1, 65536) if self.config.get('full_port_scan') else COMMON_TCP_PORTS
+        print(f"[+] Escaneando puertos en {len(hosts)} hosts con el motor connect")
+        
+        scanner = AsyncConnectScanner(
+            concurrency=self.config.get('connect_concurrency', 2000),
+            timeout=self.config.get('connect_timeout', 1.0),
+            retries=self.config.get('connect_retries', 1)
+        )
+        open_ports = await scanner.scan_all(hosts, ports)
+        
+        return open_ports, scanner.stats
+    
+    async def os_detection(self) -> Dict[str, Any]:
+        """Detección de sistema operativo"""
+        print(f"[+] Detectando sistema operativo de {self.target}")
+        
+        live_hosts = (await self.ping_sweep())['active_hosts']
+        
+        async def run(targets: List[str]) -> Dict[str, Any]:
+            hosts = await self.run_nmap(['-O', '-Pn'] if live_hosts else ['-O'], targets=targets)
+            return {host.address: host.os_matches for host in hosts}
+        
+        per_host = await self.cached_host_stage('os_detection', live_hosts or [self.target], run)
+        os_matches = {host: matches for host, matches in per_host.items() if matches}
+        
+        return {'os_detection': os_matches}
+    
+    async def service_detection(self) -> Dict[str, Any]:
+        """Detección de versiones solo sobre los puertos abiertos encontrados
+        
+        La clave de caché incluye los puertos abiertos del host: si cambian,
+        sus banners se vuelven a sondear aunque no haya caducado el TTL.
+        """
+        print(f"[+] Detectando servicios en {self.target}")
+        
+        # nmap rechaza -sU sin root: los puertos UDP (p. ej. de caché) no se sondean
+        privileged = PortScanPlanner.is_privileged()
+        skipped_udp = 0
+        open_ports: Dict[str, Dict[str, List[str]]] = {}
+        for records in (await self.port_scan())['port_scan'].values():
+            for record in records:
+                if record['protocol'] == 'udp' and not privileged:
+                    skipped_udp += 1
+                    continue
+                protocols = open_ports.setdefault(record['host'], {})
+                ports = protocols.setdefault(record['protocol'], [])
+                # Resultados cacheados antes de deduplicar el port scan pueden repetir puertos
+                if record['port'] not in ports:
+                    ports.append(record['port'])
+        if skipped_udp:
+            print(f"[!] Detección de servicios UDP (-sU) requiere root: se omiten {skipped_udp} puertos")
+        
+        def port_spec(host: str) -> str:
+            prefixes = {'tcp': 'T', 'udp': 'U'}
+            return ','.join(
+                f"{prefixes.get(protocol, 'T')}:{','.join(sorted(ports, key=int))}"
+                for protocol, ports in sorted(open_ports[host].items())
+            )
+        
+        async def run(targets: List[str]) -> Dict[str, Any]:
+            async def detect(target: str):
+                args = ['-sV', '-Pn', '-p', port_spec(target)]
+                if 'udp' in open_ports[target]:
+                    args.append('-sU')
+                if 'tcp' in open_ports[target]:
+                    args.append('-sS' if privileged else '-sT')
+                return await self.run_nmap(args, targets=[target])
             
-            if result['success']:
-                open_ports = self.parse_nmap_output(result['stdout'])
-                scan_results[scan_name] = open_ports
+            results = await asyncio.gather(*[detect(target) for target in targets])
+            return {
+                target: [{'host': host.address, **port.to_dict()} for host in hosts for port in host.open_ports()]
+                for target, hosts in zip(targets, results) if hosts
+            }
         
-        return {'port_scan': scan_results}
+        per_host = await self.cached_host_stage(
+            'service_detection', list(open_ports), run, key=lambda host: f"{host}|{port_spec(host)}"
+        )
+        services = [service for records in per_host.values() for service in records]
+        return {'service_detection': services}
     
     def parse_nmap_output(self, output: str) -> List[Dict]:
         """Parsea la salida de nmap para extraer puertos abiertos"""
         open_ports = []
         for line in output.split('\n'):
-            if '/tcp' in line and 'open' in line:
+            if ('/tcp' in line or '/udp' in line) and 'open' in line:
                 parts = line.split()
                 port_info = {
                     'port': parts[0].split('/')[0],
+                    'protocol': parts[0].split('/')[1],
                     'state': parts[1],
                     'service': parts[2] if len(parts) > 2 else 'unknown'
                 }
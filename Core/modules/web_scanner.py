@@ -1,18 +1,80 @@
-import aiohttp
 import asyncio
-from urllib.parse import urljoin
+from typing import Dict, Any, List, AsyncIterator
+import ipaddress
+from urllib.parse import urljoin, urlencode, urlsplit
 from core.scanner import BaseScanner
+from core.enumerator import WordlistEnumerator
+from core.injection import InjectionEngine, injection_points
+from core.pattern_matcher import get_matcher
+from core.soft404 import Soft404Detector
+from core.crawler import Crawler, canonicalize
+from core.dns_resolver import AsyncDNSResolver, WildcardFilter
+from config.settings import Wordlists
 from bs4 import BeautifulSoup
 
 class WebScanner(BaseScanner):
+    XSS_PAYLOADS = [
+        "<script>alert('XSS')</script>",
+        "<img src=x onerror=alert(1)>",
+        "'\"><script>alert(1)</script>"
+    ]
+    SQLI_PAYLOADS = [
+        "' OR '1'='1",
+        "' UNION SELECT 1,2,3--",
+        "'; DROP TABLE users--"
+    ]
+    # Mensajes de error propios de cada SGBD (no palabras sueltas como "sql" o "syntax")
+    SQL_ERROR_SIGNATURES = [
+        # MySQL / MariaDB
+        'you have an error in your sql syntax', 'warning: mysql_', 'mysqli_sql_exception',
+        'valid mysql result', 'check the manual that corresponds to your mariadb server version',
+        # PostgreSQL
+        'pg_query(): query failed', 'unterminated quoted string at or near', 'psqlexception',
+        'pg::syntaxerror',
+        # SQL Server
+        'unclosed quotation mark after the character string', 'microsoft ole db provider for sql server',
+        '[microsoft][odbc sql server driver]', 'system.data.sqlclient.sqlexception',
+        # Oracle
+        'ora-00933', 'ora-01756', 'ora-00921', 'quoted string not properly terminated',
+        # SQLite
+        'sqlite3.operationalerror', 'sqlite_error', 'sqlite3::sqlexception', 'unrecognized token:',
+        # Genéricos de drivers
+        'sqlstate[', 'java.sql.sqlexception', 'pdoexception'
+    ]
+    
+    # Marcadores en el cuerpo de la página principal: patrón -> tecnología
+    TECHNOLOGY_MARKERS = {
+        'wp-content/': 'WordPress', 'wp-includes/': 'WordPress', 'drupal.settings': 'Drupal',
+        '/sites/default/files/': 'Drupal', 'joomla': 'Joomla', 'content="magento': 'Magento',
+        'shopify.theme': 'Shopify', '__next_data__': 'Next.js', 'data-reactroot': 'React',
+        'ng-version=': 'Angular', 'data-v-app': 'Vue.js', 'jquery': 'jQuery', 'bootstrap.min.css': 'Bootstrap',
+        'csrfmiddlewaretoken': 'Django', '__viewstate': 'ASP.NET', 'laravel_session': 'Laravel'
+    }
+    # Cookies de sesión características de cada plataforma
+    TECHNOLOGY_COOKIES = {
+        'phpsessid': 'PHP', 'jsessionid': 'Java', 'asp.net_sessionid': 'ASP.NET',
+        'laravel_session': 'Laravel', 'csrftoken': 'Django', 'ci_session': 'CodeIgniter',
+        'connect.sid': 'Express'
+    }
+    
     def __init__(self, target: str, config: Dict[str, Any]):
         super().__init__(target, config)
         self.discovered_urls = set()
+        self.discovered_forms = []
         self.vulnerabilities = []
+        self.injection = None
+        self.soft404 = None
+        # URLs en orden de descubrimiento, para los checks que las consumen en streaming
+        self.url_feed: List[str] = []
+        self.feed_event = asyncio.Event()
+        self.crawling = False
     
     async def run_scan(self):
         """Ejecuta escaneo web completo"""
+        # Los checks de inyección esperan a las URLs del crawler mientras este siga activo
+        self.crawling = self.config.get('crawl', True)
         tasks = [
+            self.crawl(),
             self.dir_enumeration(),
             self.subdomain_enumeration(),
             self.technology_detection(),
@@ -20,78 +82,267 @@ class WebScanner(BaseScanner):
             self.sql_injection_scan()
         ]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        return self.compile_results(results)
+        async with self.http_session():
+            results = await self.gather_checks(*tasks)
+        return self.compile_results(results + [{'http_stats': self.results['http_stats']}])
+    
+    def discover(self, url: str):
+        """Registra una URL nueva y despierta a los checks que esperan URLs"""
+        if url in self.discovered_urls:
+            return
+        self.discovered_urls.add(url)
+        self.url_feed.append(url)
+        event, self.feed_event = self.feed_event, asyncio.Event()
+        event.set()
+    
+    async def discovered(self) -> AsyncIterator[str]:
+        """URLs descubiertas: las ya conocidas y las que vaya encontrando el crawler"""
+        index = 0
+        while True:
+            event = self.feed_event
+            while index < len(self.url_feed):
+                yield self.url_feed[index]
+                index += 1
+            if not self.crawling:
+                return
+            await event.wait()
+    
+    async def crawl(self) -> Dict[str, Any]:
+        """Crawler BFS desde el target; alimenta discovered_urls mientras corre"""
+        if not self.config.get('crawl', True):
+            return {}
+        print(f"[+] Iniciando crawling de {self.target}")
+        self.crawling = True
+        try:
+            async with self.http_session() as session:
+                crawler = Crawler(
+                    lambda url: self.async_http_request(session, url, capture_body=True,
+                                                        max_body_bytes=self.config.get('crawl_body_bytes')),
+                    max_depth=self.config.get('crawl_depth', 3),
+                    max_pages=self.config.get('crawl_max_pages', 200),
+                    frontier_size=self.config.get('crawl_frontier_size', 10000),
+                    workers=self.config.get('crawl_workers', 10),
+                    per_host=self.config.get('crawl_per_host', 4),
+                    host_delay=self.config.get('crawl_delay', 0.0)
+                )
+                async for page in crawler.run([self.target]):
+                    self.discover(page['url'])
+                    for form in page['forms']:
+                        self.discovered_forms.append(form)
+                        # Los formularios GET se prueban como una URL más con sus campos en la query
+                        if form['method'] == 'GET' and form['fields']:
+                            url = canonicalize(f"{form['action'].split('?')[0]}?{urlencode(form['fields'])}")
+                            if url is not None:
+                                self.discover(url)
+                    for link in page['links']:
+                        if '?' in link and crawler.in_scope(link):
+                            self.discover(link)
+        finally:
+            self.crawling = False
+            self.feed_event.set()
+        
+        return {'crawl': {'urls': sorted(self.discovered_urls), 'forms': self.discovered_forms},
+                'crawl_stats': dict(crawler.stats)}
+    
+    async def technology_detection(self) -> Dict[str, Any]:
+        """Tecnologías del target a partir de cabeceras, cookies y la página principal"""
+        async with self.http_session() as session:
+            response = await self.async_http_request(session, self.target, capture_body=True)
+        if not response.get('success'):
+            return {'technologies': [], 'technology_error': response.get('error')}
+        
+        technologies = {}
+        headers = {name.lower(): value for name, value in response.get('headers', {}).items()}
+        for header in ('server', 'x-powered-by', 'x-aspnet-version', 'x-generator'):
+            if headers.get(header):
+                technologies.setdefault(headers[header], header)
+        cookies = headers.get('set-cookie', '').lower()
+        for cookie, technology in self.TECHNOLOGY_COOKIES.items():
+            if f"{cookie}=" in cookies:
+                technologies.setdefault(technology, 'cookie')
+        
+        body = response.get('body', '')
+        markers = get_matcher(tuple(self.TECHNOLOGY_MARKERS))
+        for marker in self.analyze_body(response, markers.matches, key='technologies'):
+            technologies.setdefault(self.TECHNOLOGY_MARKERS[marker], 'body')
+        generator = BeautifulSoup(body, 'html.parser').find('meta', attrs={'name': 'generator'}) if body else None
+        if generator is not None and generator.get('content'):
+            technologies.setdefault(generator['content'], 'meta')
+        
+        return {'technologies': [{'name': name, 'source': source} for name, source in technologies.items()]}
     
     async def dir_enumeration(self) -> Dict[str, Any]:
         """Enumeración de directorios y archivos"""
         print(f"[+] Iniciando enumeración de directorios en {self.target}")
         
-        with open(self.config.get('wordlist', '/usr/share/wordlists/dirb/common.txt'), 'r') as f:
-            paths = [line.strip() for line in f if line.strip()]
+        wordlist = self.config.get('wordlist', Wordlists.COMMON_PATHS)
+        checkpoint_dir = self.config.get('checkpoint_dir')
+        is_hit = lambda resp: (resp.get('success') and resp.get('status') in [200, 301, 302]
+                               and not resp.get('soft_404'))
         
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for path in paths[:100]:  # Limitar para demo
-                url = urljoin(self.target, path)
-                tasks.append(self.async_http_request(session, url))
+        cached = self.cache_get('dir_enumeration')
+        if cached is not None:
+            return await self.revalidate_paths(cached, is_hit)
+        
+        async with self.http_session() as session:
+            detector = self.soft404_detector(session)
+            answered = 0
+            
+            async def probe(path: str) -> Dict[str, Any]:
+                nonlocal answered
+                response = await detector.probe(urljoin(self.target, path))
+                answered += bool(response.get('success'))
+                return response
             
-            responses = await asyncio.gather(*tasks)
+            enumerator = WordlistEnumerator(
+                wordlist,
+                probe=probe,
+                is_hit=is_hit,
+                window=self.config.get('max_in_flight', 50),
+                checkpoint_path=WordlistEnumerator.checkpoint_file(
+                    checkpoint_dir, 'dir', self.target, wordlist) if checkpoint_dir else None
+            )
             
-            found_paths = []
-            for resp in responses:
-                if resp.get('success') and resp.get('status') in [200, 301, 302]:
-                    found_paths.append(resp['url'])
+            found = [{'url': resp['url'], 'status': resp['status']} async for resp in enumerator.run()]
+            # Sin ninguna respuesta (target caído o timeouts) el resultado vacío no es fiable
+            if answered:
+                self.cache_put('dir_enumeration', found)
+            
+            return {'dir_enumeration': [hit['url'] for hit in found],
+                    'dir_enumeration_progress': enumerator.progress,
+                    'soft404_stats': dict(detector.stats)}
+    
+    def soft404_detector(self, session) -> Soft404Detector:
+        """Detector de soft-404 con las huellas de cada host cacheadas para todo el escaneo"""
+        if self.soft404 is None:
+            async def request(url: str, **kwargs) -> Dict[str, Any]:
+                return await self.async_http_request(session, url, **kwargs)
+            self.soft404 = Soft404Detector(
+                request,
+                samples=self.config.get('soft404_samples', 3),
+                similarity=self.config.get('soft404_similarity', 0.8)
+            )
+        return self.soft404
+    
+    async def subdomain_enumeration(self) -> Dict[str, Any]:
+        """Fuerza bruta DNS de subdominios con resolver UDP asíncrono propio"""
+        domain = urlsplit(self.target).hostname or self.target
+        try:
+            ipaddress.ip_address(domain)
+            return {'subdomains': []}
+        except ValueError:
+            pass
+        
+        cached = self.cache_get('subdomain_enumeration')
+        if cached is not None:
+            return {'subdomains': cached}
+        
+        print(f"[+] Iniciando enumeración de subdominios de {domain}")
+        wordlist = self.config.get('subdomain_wordlist', Wordlists.SUBDOMAINS)
+        checkpoint_dir = self.config.get('checkpoint_dir')
+        
+        async with AsyncDNSResolver(
+            self.config.get('dns_servers'),
+            sockets=self.config.get('dns_sockets', 4),
+            timeout=self.config.get('dns_timeout', 1.0),
+            retries=self.config.get('dns_retries', 2),
+            rate=self.config.get('dns_rate', 2000)
+        ) as resolver:
+            wildcard = WildcardFilter(resolver, domain)
+            if await wildcard.detect():
+                print(f"[!] {domain} tiene DNS comodín: se filtran {sorted(wildcard.addresses)}")
             
-            return {'dir_enumeration': found_paths}
+            enumerator = WordlistEnumerator(
+                wordlist,
+                probe=lambda word: resolver.resolve(f"{word}.{domain}"),
+                is_hit=wildcard.is_real,
+                window=self.config.get('dns_in_flight', 500),
+                record=lambda answer: {'name': answer['name'], 'addresses': answer['addresses']},
+                checkpoint_path=WordlistEnumerator.checkpoint_file(
+                    checkpoint_dir, 'dns', domain, wordlist) if checkpoint_dir else None
+            )
+            found = [{'name': answer['name'], 'addresses': answer['addresses']}
+                     async for answer in enumerator.run()]
+        
+        # Sin ninguna respuesta (servidores caídos) el resultado vacío no es fiable
+        if resolver.stats['answers']:
+            self.cache_put('subdomain_enumeration', found)
+        return {'subdomains': found, 'subdomain_wildcard': sorted(wildcard.addresses),
+                'dns_stats': dict(resolver.stats)}
+    
+    async def revalidate_paths(self, cached: List[Dict[str, Any]], is_hit) -> Dict[str, Any]:
+        """Re-sondea solo las rutas cacheadas y detecta cambios de código de estado"""
+        print(f"[*] dir_enumeration: revalidando {len(cached)} rutas desde caché")
+        
+        async with self.http_session() as session:
+            detector = self.soft404_detector(session)
+            responses = await asyncio.gather(*[detector.probe(hit['url']) for hit in cached])
+        
+        found, changed = [], []
+        for hit, resp in zip(cached, responses):
+            if resp.get('status') != hit['status']:
+                changed.append({'url': hit['url'], 'old_status': hit['status'], 'status': resp.get('status')})
+            if is_hit(resp):
+                found.append({'url': hit['url'], 'status': resp['status']})
+        if changed:
+            self.cache_put('dir_enumeration', found)
+        
+        return {'dir_enumeration': [hit['url'] for hit in found], 'dir_enumeration_changes': changed}
+    
+    def injection_engine(self, session) -> InjectionEngine:
+        """Motor de inyección compartido por los checks XSS y SQLi del escaneo"""
+        if self.injection is None:
+            async def probe(url: str, stop_patterns: List[str]) -> Dict[str, Any]:
+                return await self.async_http_request(session, url, capture_body=True,
+                                                     stop_patterns=stop_patterns)
+            self.injection = InjectionEngine(probe, self.config.get('max_in_flight', 50))
+        return self.injection
+    
+    async def injection_targets(self, default_param: str):
+        """Puntos de inyección: el target y las URLs descubiertas según aparecen"""
+        for point in injection_points([self.target], [default_param]):
+            yield point
+        async for url in self.discovered():
+            for point in injection_points([url]):
+                yield point
     
     async def xss_scan(self) -> Dict[str, Any]:
-        """Detección básica de vulnerabilidades XSS"""
-        payloads = [
-            "<script>alert('XSS')</script>",
-            "<img src=x onerror=alert(1)>",
-            "'\"><script>alert(1)</script>"
-        ]
+        """Detección de XSS reflejado en todos los parámetros conocidos"""
+        payloads = self.config.get('xss_payloads', self.XSS_PAYLOADS)
+        
+        def reflected(response: Dict[str, Any], payload: str, baseline: Dict[str, Any] = None) -> bool:
+            matcher = get_matcher((payload,), ignore_case=False)
+            return self.analyze_body(response, matcher.contains_any, key=f"xss:{payload}")
+        
+        async with self.http_session() as session:
+            engine = self.injection_engine(session)
+            vulnerabilities = await engine.run(
+                'XSS', self.injection_targets('q'), payloads, reflected, stop_patterns=lambda payload: [payload],
+                on_finding=lambda finding: self.emit('finding', 'xss_vulnerabilities', finding))
         
-        vulnerabilities = []
-        async with aiohttp.ClientSession() as session:
-            for payload in payloads:
-                test_url = f"{self.target}?q={payload}"
-                response = await self.async_http_request(session, test_url)
-                
-                if response.get('success') and payload in response.get('body', ''):
-                    vulnerabilities.append({
-                        'type': 'XSS',
-                        'payload': payload,
-                        'url': test_url
-                    })
-        
-        return {'xss_vulnerabilities': vulnerabilities}
+        return {'xss_vulnerabilities': vulnerabilities, 'injection_stats': dict(engine.stats)}
     
     async def sql_injection_scan(self) -> Dict[str, Any]:
-        """Detección básica de SQL Injection"""
-        payloads = [
-            "' OR '1'='1",
-            "' UNION SELECT 1,2,3--",
-            "'; DROP TABLE users--"
-        ]
+        """Detección de SQL Injection basada en errores en todos los parámetros conocidos
+        
+        Solo cuenta un error de SGBD que aparece con el payload y no en la
+        respuesta sin payload (páginas que ya muestran mensajes de error,
+        documentación, buscadores que repiten la consulta...).
+        """
+        payloads = self.config.get('sqli_payloads', self.SQLI_PAYLOADS)
+        signatures = self.config.get('sql_error_signatures', self.SQL_ERROR_SIGNATURES)
+        matcher = get_matcher(tuple(signatures))
+        
+        # Una sola pasada por cuerpo distinto (la referencia se comparte entre payloads)
+        def sql_error(response: Dict[str, Any], payload: str, baseline: Dict[str, Any]) -> bool:
+            errors = self.analyze_body(response, matcher.matches, key='sql_errors')
+            return bool(errors - self.analyze_body(baseline, matcher.matches, key='sql_errors'))
+        
+        async with self.http_session() as session:
+            engine = self.injection_engine(session)
+            vulnerabilities = await engine.run(
+                'SQL Injection', self.injection_targets('id'), payloads, sql_error,
+                stop_patterns=lambda payload: signatures, baseline=True,
+                on_finding=lambda finding: self.emit('finding', 'sql_injection_vulnerabilities', finding))
         
-        vulnerabilities = []
-        async with aiohttp.ClientSession() as session:
-            for payload in payloads:
-                test_url = f"{self.target}?id={payload}"
-                response = await self.async_http_request(session, test_url)
-                
-                # Análisis básico de respuestas
-                if response.get('success'):
-                    body = response.get('body', '').lower()
-                    error_indicators = ['sql', 'syntax', 'mysql', 'ora-']
-                    
-                    if any(indicator in body for indicator in error_indicators):
-                        vulnerabilities.append({
-                            'type': 'SQL Injection',
-                            'payload': payload,
-                            'url': test_url
-                        })
-        
-        return {'sql_injection_vulnerabilities': vulnerabilities}
\ No newline at end of file
+        return {'sql_injection_vulnerabilities': vulnerabilities, 'injection_stats': dict(engine.stats)}
@@ -5,6 +5,20 @@ import json
 import random
 from typing import Dict, Any
 import hashlib
+from core.pattern_matcher import PatternMatcher
+
+# Heurísticas HTTP en orden de prioridad: (tipo de ataque, patrones, ignorar mayúsculas, status, mensaje)
+HTTP_ATTACK_RULES = [
+    ('Web Directory Scanning', ['wp-admin', 'phpmyadmin'], False, 404, 'Not Found'),
+    ('Command Injection Attempt', ['cmd.exe', '/bin/bash'], False, 403, 'Forbidden'),
+    ('SQL Injection Attempt', ['union select'], True, 500, 'Internal Server Error')
+]
+# Un matcher por modo: solo la regla SQL ignora mayúsculas
+HTTP_ATTACK_MATCHERS = {
+    ignore_case: PatternMatcher((pattern for _, patterns, rule_case, _, _ in HTTP_ATTACK_RULES
+                                 if rule_case == ignore_case for pattern in patterns), ignore_case)
+    for ignore_case in (False, True)
+}
 
 class IntelligentHoneypot:
     def __init__(self, ports=[22, 23, 80, 443, 3389, 5900]):
@@ -122,18 +136,14 @@ class IntelligentHoneypot:
             request = data.decode('utf-8', errors='ignore')
             attack_data['requests'].append(request)
             
-            # Analizar request HTTP
-            if 'wp-admin' in request or 'phpmyadmin' in request:
-                self.log_attack(attack_data, 'Web Directory Scanning')
-                response = self.generate_http_response(404, 'Not Found')
-            elif 'cmd.exe' in request or '/bin/bash' in request:
-                self.log_attack(attack_data, 'Command Injection Attempt')
-                response = self.generate_http_response(403, 'Forbidden')
-            elif 'union select' in request.lower():
-                self.log_attack(attack_data, 'SQL Injection Attempt')
-                response = self.generate_http_response(500, 'Internal Server Error')
-            else:
-                response = self.generate_http_response(200, 'OK')
+            # Analizar request HTTP: una sola pasada para todas las heurísticas
+            found = {ignore_case: matcher.matches(request) for ignore_case, matcher in HTTP_ATTACK_MATCHERS.items()}
+            response = self.generate_http_response(200, 'OK')
+            for attack_type, patterns, ignore_case, status, message in HTTP_ATTACK_RULES:
+                if found[ignore_case].intersection(patterns):
+                    self.log_attack(attack_data, attack_type)
+                    response = self.generate_http_response(status, message)
+                    break
             
             writer.write(response.encode())
             await writer.drain()
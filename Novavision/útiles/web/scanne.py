@@ -2,22 +2,60 @@
 Web Assessment Module for KaliNova
 """
 
-import requests
+import asyncio
+from typing import List, Callable, Any
+import aiohttp
 from core.modules.base_module import BaseModule
+from core.http_client import HTTPClientManager
+
+# Bytes de cuerpo que se leen (y descartan) para poder reutilizar la conexión
+MAX_DRAIN_BYTES = 256 * 1024
 
 class WebScanner(BaseModule):
     def __init__(self):
         super().__init__()
         self.name = "web_scanner"
-        self.version = "1.0.0"
-        self.requirements = ["requests", "bs4"]
+        self.version = "1.1.0"
+        self.requirements = ["aiohttp", "bs4"]
         self.description = "Escáner web básico para KaliNova"
         
     def execute(self, target: str, **kwargs) -> dict:
         """Ejecutar escaneo web básico"""
+        return self.execute_many([target], **kwargs)[0]
+    
+    def execute_many(self, targets: List[str], on_result: Callable[[int, dict], Any] = None,
+                     **kwargs) -> List[dict]:
+        """Escanear un lote de targets en paralelo sobre un pool HTTP compartido
+        
+        Devuelve un resultado por target, en el mismo orden, y además llama a
+        on_result(índice, resultado) en cuanto termina cada uno. Las conexiones
+        se reutilizan (keep-alive) entre peticiones al mismo host y nunca hay
+        más de connections_per_host abiertas contra un mismo host.
+        """
         if not self.check_requirements():
-            return {"error": "Dependencias faltantes"}
+            return [{"error": "Dependencias faltantes"} for _ in targets]
+        return asyncio.run(self.scan_batch(targets, on_result, **kwargs))
+    
+    async def scan_batch(self, targets: List[str], on_result: Callable[[int, dict], Any] = None,
+                         **kwargs) -> List[dict]:
+        config = {
+            'max_connections': kwargs.get('max_connections', 100),
+            'connections_per_host': kwargs.get('connections_per_host', 4),
+            'timeout': kwargs.get('timeout', 10),
+            'verify_ssl': kwargs.get('verify_ssl', False)
+        }
+        semaphore = asyncio.Semaphore(kwargs.get('concurrency', 50))
         
+        async with HTTPClientManager(config) as http:
+            async def scan(index: int, target: str) -> dict:
+                async with semaphore:
+                    result = await self.scan_target(http.session, target)
+                if on_result is not None:
+                    on_result(index, result)
+                return result
+            return await asyncio.gather(*[scan(index, target) for index, target in enumerate(targets)])
+    
+    async def scan_target(self, session: aiohttp.ClientSession, target: str) -> dict:
         results = {
             "target": target,
             "scan_type": "web_assessment",
@@ -26,12 +64,12 @@ class WebScanner(BaseModule):
         }
         
         try:
-            # Análisis básico
-            info = self.gather_info(target)
+            # Análisis básico y detección de vulnerabilidades en paralelo
+            info, vulns = await asyncio.gather(
+                self.gather_info(session, target),
+                self.check_vulnerabilities(session, target)
+            )
             results["info_found"].extend(info)
-            
-            # Detección básica de vulnerabilidades
-            vulns = self.check_vulnerabilities(target)
             results["vulnerabilities"].extend(vulns)
             
         except Exception as e:
@@ -39,7 +77,7 @@ class WebScanner(BaseModule):
             
         return results
     
-    def gather_info(self, target: str) -> list:
+    async def gather_info(self, session: aiohttp.ClientSession, target: str) -> list:
         """Recopilar información básica del target"""
         info = []
         
@@ -49,17 +87,23 @@ class WebScanner(BaseModule):
                 target = 'https://' + target
             
             # Headers básicos
-            response = requests.get(target, timeout=10, verify=False)
-            info.append(f"Status Code: {response.status_code}")
-            info.append(f"Server: {response.headers.get('Server', 'Unknown')}")
-            info.append(f"Content Type: {response.headers.get('Content-Type', 'Unknown')}")
+            async with session.get(target) as response:
+                info.append(f"Status Code: {response.status}")
+                info.append(f"Server: {response.headers.get('Server', 'Unknown')}")
+                info.append(f"Content Type: {response.headers.get('Content-Type', 'Unknown')}")
+                # Vaciar cuerpos pequeños para que la conexión vuelva al pool (keep-alive)
+                remaining = MAX_DRAIN_BYTES
+                async for chunk in response.content.iter_chunked(16384):
+                    remaining -= len(chunk)
+                    if remaining <= 0:
+                        break
             
-        except requests.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             info.append(f"Connection error: {e}")
             
         return info
     
-    def check_vulnerabilities(self, target: str) -> list:
+    async def check_vulnerabilities(self, session: aiohttp.ClientSession, target: str) -> list:
         """Chequeo básico de vulnerabilidades"""
         vulns = []
         
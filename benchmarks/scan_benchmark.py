@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+KaliNova - Benchmarks de la pila de escaneo contra servidores locales
+
+Cada benchmark se ejecuta en un proceso hijo (para medir su RSS máximo y
+su CPU por separado) mientras los servidores de prueba corren en el
+proceso padre. Los resultados se guardan en un baseline JSON y se
+comparan contra él con umbrales de regresión.
+
+    python benchmarks/scan_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/scan_benchmark.py --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'Core'), os.path.dirname(os.path.abspath(__file__))]
+
+from standins import StandInHTTPServer, StandInTCPServer, StandInDNSServer, ServerThread
+
+# Variación relativa tolerada antes de marcar regresión
+DEFAULT_THRESHOLDS = {
+    'requests_per_sec': 0.15,
+    'wall_seconds': 0.20,
+    'p50_ms': 0.25,
+    'p99_ms': 0.30,
+    'peak_rss_mb': 0.20,
+    'cpu_seconds': 0.25
+}
+HIGHER_IS_BETTER = {'requests_per_sec'}
+
+BENCHMARKS = ['http_request', 'dir_enumeration', 'dir_enumeration_wildcard',
+              'subdomain_enumeration', 'subdomain_enumeration_wildcard',
+              'web_injection', 'web_scan', 'network_port_scan', 'pentest']
+
+TCP_PORTS = [20022, 20080, 20443, 23306, 28080]
+DNS_DOMAIN = 'bench.test'
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def timed(func, latencies: List[float]):
+    """Envuelve una corutina para registrar la latencia de cada llamada"""
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    return wrapper
+
+
+# --- Benchmarks (se ejecutan en el proceso hijo) ---
+
+async def bench_http_request(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    from core.scanner import BaseScanner
+    scanner = BaseScanner(env['http'], {'threads': 50})
+    request = timed(scanner.async_http_request, latencies)
+    semaphore = asyncio.Semaphore(100)
+
+    async def one(i: int):
+        async with semaphore:
+            return await request(session, f"{env['http']}item{i % 50}")
+
+    async with scanner.http_session() as session:
+        results = await asyncio.gather(*[one(i) for i in range(env['requests'])])
+    return {'requests': len(results), 'http_stats': scanner.results.get('http_stats')}
+
+
+async def bench_dir_enumeration(env: Dict[str, Any], latencies: List[float], target: str = None) -> Dict[str, Any]:
+    from modules.web_scanner import WebScanner
+    scanner = WebScanner(target or env['http'], {'wordlist': env['wordlist'], 'max_in_flight': 50})
+    scanner.async_http_request = timed(scanner.async_http_request, latencies)
+    async with scanner.http_session():
+        result = await scanner.dir_enumeration()
+    return {'requests': len(latencies), 'found': len(result['dir_enumeration'])}
+
+
+async def bench_dir_enumeration_wildcard(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    return await bench_dir_enumeration(env, latencies, target=env['wildcard'])
+
+
+async def bench_subdomain_enumeration(env: Dict[str, Any], latencies: List[float], dns: str = None) -> Dict[str, Any]:
+    from modules.web_scanner import WebScanner
+    from core.dns_resolver import AsyncDNSResolver
+    AsyncDNSResolver.resolve = timed(AsyncDNSResolver.resolve, latencies)
+    scanner = WebScanner(f"http://{DNS_DOMAIN}/", {'subdomain_wordlist': env['wordlist'],
+                                                    'dns_servers': [dns or env['dns']], 'dns_rate': 0,
+                                                    'dns_timeout': 0.2})
+    result = await scanner.subdomain_enumeration()
+    return {'requests': result['dns_stats']['queries'], 'found': len(result['subdomains']),
+            'dns_stats': result['dns_stats']}
+
+
+async def bench_subdomain_enumeration_wildcard(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    return await bench_subdomain_enumeration(env, latencies, dns=env['dns_wildcard'])
+
+
+async def bench_web_injection(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    from modules.web_scanner import WebScanner
+    scanner = WebScanner(env['http'], {})
+    scanner.async_http_request = timed(scanner.async_http_request, latencies)
+    async with scanner.http_session():
+        xss, sqli = await asyncio.gather(scanner.xss_scan(), scanner.sql_injection_scan())
+    return {
+        'requests': len(latencies),
+        'found': len(xss['xss_vulnerabilities']) + len(sqli['sql_injection_vulnerabilities'])
+    }
+
+
+async def bench_web_scan(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    """WebScanner.run_scan completo: crawler, enumeración y checks solapados"""
+    from modules.web_scanner import WebScanner
+    scanner = WebScanner(env['http'], {'wordlist': env['wordlist'], 'max_in_flight': 50})
+    scanner.async_http_request = timed(scanner.async_http_request, latencies)
+    result = await scanner.run_scan()
+    if result['errors']:
+        raise RuntimeError(f"run_scan con errores: {result['errors']}")
+    return {
+        'requests': len(latencies),
+        'found': (len(result['dir_enumeration']) + len(result['xss_vulnerabilities']) +
+                  len(result['sql_injection_vulnerabilities']))
+    }
+
+
+async def bench_network_port_scan(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    from modules.network_scanner import NetworkScanner
+    scanner = NetworkScanner('127.0.0.1', {'port_scan_backend': 'connect', 'full_port_scan': True})
+    result = await scanner.port_scan()
+    return {'requests': result['port_scan_stats']['probes'], 'found': len(result['port_scan']['tcp'])}
+
+
+async def bench_pentest(env: Dict[str, Any], latencies: List[float]) -> Dict[str, Any]:
+    from main import KaliNovaPentest
+    with tempfile.TemporaryDirectory() as tmp:
+        pentest = KaliNovaPentest('127.0.0.1', cache_path=None, store_path=os.path.join(tmp, 'results.db'))
+        pentest.config.update({'port_scan_backend': 'connect', 'full_port_scan': True})
+        pentest.setup_scanners('network')
+        report = await pentest.run_pentest()
+        pentest.store.close()
+    return {'requests': None, 'found': report['summary']['total']}
+
+
+def run_child(name: str, env: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta un benchmark y mide tiempo, latencias, RSS y CPU del propio proceso"""
+    latencies: List[float] = []
+    bench = globals()[f"bench_{name}"]
+    output = io.StringIO()
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            details = asyncio.run(bench(env, latencies))
+    except ImportError as e:
+        return {'name': name, 'skipped': f"dependencia no disponible: {e}"}
+    wall = time.perf_counter() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    requests = details.pop('requests', None) or len(latencies)
+    return {
+        'name': name,
+        'wall_seconds': round(wall, 4),
+        'requests': requests,
+        'requests_per_sec': round(requests / wall, 1) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        'peak_rss_mb': round(usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+        **details
+    }
+
+
+# --- Orquestación (proceso padre) ---
+
+def build_wordlist(path: str, size: int, known: List[str]):
+    """Wordlist de `size` entradas con las rutas conocidas repartidas uniformemente"""
+    step = max(size // len(known), 1)
+    with open(path, 'w') as f:
+        for i in range(size):
+            slot = i // step
+            f.write(f"{known[slot] if i % step == 0 and slot < len(known) else f'path{i}'}\n")
+
+
+def run_benchmarks(names: List[str], args) -> List[Dict[str, Any]]:
+    known_paths = [f"admin{i}" for i in range(50)]
+    servers = {
+        'http': StandInHTTPServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                  known_paths=known_paths),
+        'wildcard': StandInHTTPServer(latency=args.latency, jitter=args.jitter, wildcard=True),
+        'tcp': StandInTCPServer(TCP_PORTS),
+        'dns': StandInDNSServer({f"{path}.{DNS_DOMAIN}": '10.0.0.1' for path in known_paths},
+                                drop_rate=args.error_rate, latency=args.latency),
+        'dns_wildcard': StandInDNSServer({f"{path}.{DNS_DOMAIN}": '10.0.0.1' for path in known_paths},
+                                         wildcard='10.9.9.9', latency=args.latency)
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, ServerThread(servers) as thread:
+        wordlist = os.path.join(tmp, 'wordlist.txt')
+        build_wordlist(wordlist, args.wordlist_size, known_paths)
+        env = {
+            'http': servers['http'].base_url,
+            'wildcard': servers['wildcard'].base_url,
+            'dns': servers['dns'].address,
+            'dns_wildcard': servers['dns_wildcard'].address,
+            'wordlist': wordlist,
+            'requests': args.requests
+        }
+
+        for name in names:
+            before = thread.snapshot()
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', name, '--env', json.dumps(env)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0 or not proc.stdout.strip():
+                result = {'name': name, 'error': proc.stderr.strip().splitlines()[-1:] or 'sin salida'}
+            else:
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+            after = thread.snapshot()
+            result['server_requests'] = sum(
+                after[s].get('requests', after[s].get('connections', 0)) -
+                before[s].get('requests', before[s].get('connections', 0)) for s in after
+            )
+            results.append(result)
+            print(format_result(result))
+    return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    if 'skipped' in result or 'error' in result:
+        return f"[-] {result['name']:<26} {result.get('skipped') or result.get('error')}"
+    return (f"[+] {result['name']:<26} {result['requests_per_sec']:>10.1f} req/s  "
+            f"p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+            f"rss {result['peak_rss_mb']:>7.1f}MB  cpu {result['cpu_seconds']:>6.2f}s  "
+            f"wall {result['wall_seconds']:>6.2f}s")
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any]) -> List[str]:
+    """Lista de regresiones frente al baseline"""
+    thresholds = {**DEFAULT_THRESHOLDS, **baseline.get('thresholds', {})}
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = previous.get(result['name'])
+        if not base or 'skipped' in result or 'error' in result or 'skipped' in base:
+            continue
+        for metric, tolerance in thresholds.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{result['name']}.{metric}: {old} -> {new} ({change:+.1%}, "
+                                   f"umbral {tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='KaliNova - Benchmarks de escaneo')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Benchmarks a ejecutar')
+    parser.add_argument('--baseline', help='Baseline JSON contra el que comparar')
+    parser.add_argument('--save-baseline', help='Guardar los resultados como baseline')
+    parser.add_argument('--latency', type=float, default=0.002, help='Latencia del servidor (s)')
+    parser.add_argument('--jitter', type=float, default=0.003, help='Variación de latencia (s)')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='Fracción de respuestas 500')
+    parser.add_argument('--requests', type=int, default=2000, help='Peticiones del benchmark http_request')
+    parser.add_argument('--wordlist-size', type=int, default=5000, help='Entradas del wordlist')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--env', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, json.loads(args.env))))
+        return
+
+    results = run_benchmarks(args.only or BENCHMARKS, args)
+
+    exit_code = 0
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print("\n[!] Regresiones de rendimiento:")
+            for regression in regressions:
+                print(f"    {regression}")
+            exit_code = 1
+        else:
+            print("\n[+] Sin regresiones frente al baseline")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(),
+                'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+                'settings': {k: getattr(args, k) for k in ('latency', 'jitter', 'error_rate',
+                                                           'requests', 'wordlist_size')},
+                'thresholds': DEFAULT_THRESHOLDS,
+                'results': results
+            }, f, indent=2)
+        print(f"[+] Baseline guardado en: {args.save_baseline}")
+
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Servidores locales que imitan objetivos reales para los benchmarks
+"""
+
+import asyncio
+import random
+import socket
+import struct
+import threading
+from typing import Dict, Any, List, Iterable
+
+from aiohttp import web
+
+SQL_ERROR_PAGE = "You have an error in your SQL syntax; check the manual that corresponds to your MySQL server"
+
+
+class StandInHTTPServer:
+    """Servidor aiohttp con latencia, errores y comodines configurables
+
+    - latency / jitter: segundos de espera por petición
+    - error_rate: fracción de respuestas 500
+    - wildcard: responde 200 a cualquier ruta (servidor catch-all)
+    - known_paths: rutas que existen de verdad
+    - reflect: refleja los parámetros de la query en el cuerpo (XSS)
+    - sql_errors: devuelve un error SQL cuando un parámetro lleva comilla
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, wildcard: bool = False, known_paths: Iterable[str] = (),
+                 reflect: bool = True, sql_errors: bool = True, body_size: int = 2048, seed: int = 1337):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.wildcard = wildcard
+        self.known_paths = {path.strip('/') for path in known_paths}
+        self.reflect = reflect
+        self.sql_errors = sql_errors
+        self.padding = 'x' * body_size
+        self.random = random.Random(seed)
+        self.runner = None
+        self.stats = {'requests': 0, 'errors': 0, 'bytes': 0}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.stats['requests'] += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=500, text='Internal Server Error')
+
+        path = request.path.strip('/')
+        params = ' '.join(request.query.values())
+        if self.sql_errors and "'" in params:
+            body = f"<html><body>{SQL_ERROR_PAGE}</body></html>"
+        elif path == '' or path in self.known_paths or self.wildcard:
+            reflected = params if self.reflect else ''
+            body = f"<html><body><h1>{path or 'index'}</h1>{reflected}<p>{self.padding}</p></body></html>"
+        else:
+            return web.Response(status=404, text='Not Found')
+
+        self.stats['bytes'] += len(body)
+        return web.Response(text=body, content_type='text/html')
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/{path:.*}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+class StandInTCPServer:
+    """Escucha en varios puertos TCP y cierra cada conexión tras un retardo opcional"""
+
+    def __init__(self, ports: List[int], host: str = '127.0.0.1', latency: float = 0.0, banner: bytes = b''):
+        self.host = host
+        self.ports = ports
+        self.latency = latency
+        self.banner = banner
+        self.servers = []
+        self.stats = {'connections': 0}
+
+    async def handle(self, reader, writer):
+        self.stats['connections'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.banner:
+            writer.write(self.banner)
+        writer.close()
+
+    async def start(self):
+        for port in self.ports:
+            self.servers.append(await asyncio.start_server(self.handle, self.host, port))
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+
+class StandInDNSServer(asyncio.DatagramProtocol):
+    """Servidor DNS UDP mínimo (solo registros A) para probar el brute-force de subdominios
+
+    - zone: nombre -> IP de los subdominios que existen
+    - wildcard: IP devuelta para cualquier otro nombre (DNS comodín)
+    - drop_rate: fracción de consultas que se ignoran, para forzar retransmisiones
+    """
+
+    def __init__(self, zone: Dict[str, str] = None, host: str = '127.0.0.1', port: int = 0,
+                 wildcard: str = None, drop_rate: float = 0.0, latency: float = 0.0, seed: int = 1337):
+        self.zone = {name.lower().rstrip('.'): ip for name, ip in (zone or {}).items()}
+        self.host = host
+        self.port = port
+        self.wildcard = wildcard
+        self.drop_rate = drop_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.transport = None
+        self.stats = {'requests': 0, 'dropped': 0}
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.stats['requests'] += 1
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats['dropped'] += 1
+            return
+        if self.latency:
+            asyncio.get_running_loop().call_later(self.latency, self.reply, data, addr)
+        else:
+            self.reply(data, addr)
+
+    def reply(self, data: bytes, addr):
+        qid = data[:2]
+        offset, labels = 12, []
+        while data[offset]:
+            labels.append(data[offset + 1:offset + 1 + data[offset]].decode())
+            offset += data[offset] + 1
+        question = data[12:offset + 5]
+        ip = self.zone.get('.'.join(labels).lower(), self.wildcard)
+        if ip is None:
+            self.transport.sendto(qid + struct.pack('!HHHHH', 0x8183, 1, 0, 0, 0) + question, addr)
+            return
+        answer = struct.pack('!HHHIH', 0xC00C, 1, 1, 60, 4) + socket.inet_aton(ip)
+        self.transport.sendto(qid + struct.pack('!HHHHH', 0x8180, 1, 1, 0, 0) + question + answer, addr)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port))
+        self.port = self.transport.get_extra_info('sockname')[1]
+
+    async def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+class ServerThread:
+    """Ejecuta los servidores en un event loop propio para no medir su CPU junto al escáner"""
+
+    def __init__(self, servers: Dict[str, Any]):
+        self.servers = servers
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> 'ServerThread':
+        self.thread.start()
+        for server in self.servers.values():
+            asyncio.run_coroutine_threadsafe(server.start(), self.loop).result()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for server in self.servers.values():
+            asyncio.run_coroutine_threadsafe(server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(server.stats) for name, server in self.servers.items()}
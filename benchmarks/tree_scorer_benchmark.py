@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+KaliNova - Benchmark del scorer de árboles aplanados
+
+Entrena los modelos con la misma configuración que ThreatModelTrainer
+sobre datos sintéticos, los aplana con tree_scorer y compara contra
+predict_proba: paridad de probabilidades y latencia por tamaño de lote.
+Sin xgboost instalado, el ensemble usa RandomForest + ExtraTrees.
+
+    python benchmarks/tree_scorer_benchmark.py
+    python benchmarks/tree_scorer_benchmark.py --models random_forest --json outputs/tree_scorer.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, VotingClassifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'core', 'ML')]
+
+from tree_scorer import flatten_model, check_parity, benchmark_latency
+
+try:
+    import xgboost as xgb
+except ImportError:
+    xgb = None
+
+MODELS = ['random_forest', 'xgboost', 'ensemble']
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+
+def build_model(name: str):
+    """Modelos con los hiperparámetros de ThreatModelTrainer"""
+    if name == 'random_forest':
+        return RandomForestClassifier(n_estimators=100, max_depth=20, min_samples_split=5,
+                                      min_samples_leaf=2, random_state=42, n_jobs=-1)
+    if name == 'xgboost':
+        if xgb is None:
+            return None
+        return xgb.XGBClassifier(n_estimators=100, max_depth=6, learning_rate=0.1, subsample=0.8,
+                                 colsample_bytree=0.8, random_state=42, eval_metric='logloss')
+    second = (('xgb', xgb.XGBClassifier(random_state=42)) if xgb is not None
+              else ('et', ExtraTreesClassifier(n_estimators=50, random_state=42)))
+    return VotingClassifier(estimators=[('rf', RandomForestClassifier(n_estimators=50, random_state=42)), second],
+                            voting='soft', n_jobs=-1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='KaliNova - Benchmark del scorer de árboles')
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=MODELS, help='Modelos a medir')
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=BATCH_SIZES, help='Tamaños de lote')
+    parser.add_argument('--samples', type=int, default=20000, help='Muestras sintéticas de entrenamiento')
+    parser.add_argument('--features', type=int, default=10, help='Características por muestra')
+    parser.add_argument('--repeats', type=int, default=20, help='Repeticiones por tamaño de lote')
+    parser.add_argument('--json', help='Guardar los resultados en JSON')
+
+    args = parser.parse_args()
+
+    X, y = make_classification(n_samples=args.samples, n_features=args.features,
+                               n_informative=max(2, args.features // 2), random_state=42)
+    X = X.astype(np.float32)
+    split = int(len(X) * 0.8)
+    X_train, X_test, y_train = X[:split], X[split:], y[:split]
+
+    results = []
+    failed = False
+    for name in args.models:
+        model = build_model(name)
+        if model is None:
+            print(f"[!] {name}: xgboost no está instalado, se omite")
+            continue
+        model.fit(X_train, y_train)
+        scorer = flatten_model(model)
+        parity = check_parity(model, scorer, X_test)
+        failed |= not parity['ok']
+
+        print(f"\n[*] {name}: {scorer.n_trees} árboles, {scorer.n_nodes} nodos, profundidad {scorer.max_depth}")
+        print(f"    Paridad: diferencia máxima {parity['max_abs_diff']:.2e}, "
+              f"etiquetas {parity['label_agreement']:.2%} {'OK' if parity['ok'] else 'FALLO'}")
+        print(f"    {'lote':>7} {'modelo ms':>11} {'scorer ms':>11} {'speedup':>8} {'filas/s':>11}")
+        latency = benchmark_latency(model, scorer, X_test, args.batch_sizes, args.repeats)
+        for row in latency:
+            print(f"    {row['batch_size']:>7} {row['model_ms']:>11.3f} {row['scorer_ms']:>11.3f} "
+                  f"{row['speedup']:>7.1f}x {row['scorer_rows_per_sec']:>11.0f}")
+
+        results.append({'name': name, 'source': scorer.source, 'trees': scorer.n_trees,
+                        'nodes': scorer.n_nodes, 'parity': parity, 'latency': latency})
+
+    if args.json:
+        if os.path.dirname(args.json):
+            os.makedirs(os.path.dirname(args.json), exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(),
+                'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+                'results': results
+            }, f, indent=2)
+        print(f"\n[+] Resultados guardados en: {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
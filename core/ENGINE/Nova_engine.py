@@ -4,18 +4,31 @@ KaliNova Core Engine
 🚀 Ethical Pentesting Platform
 """
 
-import importlib
+import asyncio
+import inspect
 import json
 import os
-from pathlib import Path
-from typing import Dict, Any, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, List, Iterable, AsyncIterator, Union, Callable
 import logging
 
+from core.engine.module_registry import ModuleRegistry
+from core.result_cache import ResultCache, config_hash
+from core.metrics import MetricsRegistry, get_metrics, set_metrics
+
 class NovaEngine:
     def __init__(self, config_path: str = None):
         self.modules: Dict[str, Any] = {}
         self.config = self.load_config(config_path)
         self.setup_logging()
+        self.registry = ModuleRegistry(
+            self.config.get('modules_dir'), self.config.get('module_manifest')
+        )
+        self._executor = None
+        self._cache = None
+        self.metrics = self.setup_metrics()
         
     def setup_logging(self):
         """Configurar sistema de logging"""
@@ -23,19 +36,58 @@ class NovaEngine:
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler('kalinova.log'),
+                logging.FileHandler('kalinova.log', delay=True),
                 logging.StreamHandler()
             ]
         )
         self.logger = logging.getLogger('KaliNova')
         
+    def setup_metrics(self) -> MetricsRegistry:
+        """Registro de métricas global (no-op salvo que config['metrics']['enabled'])"""
+        options = self.config.get('metrics') or {}
+        if not options.get('enabled'):
+            return get_metrics()
+        metrics = get_metrics()
+        if not metrics.enabled:
+            metrics = MetricsRegistry()
+            set_metrics(metrics)
+        if options.get('port') and metrics.server is None:
+            try:
+                metrics.serve(options.get('host', '127.0.0.1'), options['port'])
+                self.logger.info(f"Métricas en http://{options.get('host', '127.0.0.1')}:{options['port']}/metrics")
+            except OSError as e:
+                self.logger.error(f"No se pudo abrir el endpoint de métricas: {e}")
+        return metrics
+    
+    def export_metrics(self, path: str = None, fmt: str = None) -> str:
+        """Vuelca las métricas a `path` (o a config['metrics']['export_path']) y devuelve la ruta"""
+        options = self.config.get('metrics') or {}
+        path = path or options.get('export_path')
+        if not self.metrics.enabled or not path:
+            return None
+        self.metrics.write(path, fmt or options.get('format'))
+        return path
+    
     def load_config(self, config_path: str = None) -> Dict:
         """Cargar configuración desde archivo"""
         default_config = {
             "max_scan_time": 3600,
             "allowed_modules": ["web", "network"],
             "report_format": "json",
-            "legal_disclaimer": True
+            "legal_disclaimer": True,
+            "max_workers": 32,
+            "module_concurrency": {},
+            "modules_dir": None,
+            "module_manifest": None,
+            "result_cache": "outputs/scan_cache.db",
+            "cache_ttls": {},
+            "metrics": {
+                "enabled": False,
+                "port": None,
+                "host": "127.0.0.1",
+                "export_path": None,
+                "format": None
+            }
         }
         
         if config_path and os.path.exists(config_path):
@@ -48,14 +100,12 @@ class NovaEngine:
         return default_config
     
     def load_module(self, module_name: str) -> bool:
-        """Cargar un módulo dinámicamente"""
+        """Cargar un módulo dinámicamente (solo se importa en el primer uso)"""
         try:
-            module_path = f"modules.{module_name}.scanner"
-            module = importlib.import_module(module_path)
-            self.modules[module_name] = module.Scanner()
+            self.modules[module_name] = self.registry.get(module_name)
             self.logger.info(f"Módulo {module_name} cargado exitosamente")
             return True
-        except ImportError as e:
+        except (ImportError, AttributeError, TypeError) as e:
             self.logger.error(f"Error cargando módulo {module_name}: {e}")
             return False
     
@@ -69,18 +119,275 @@ class NovaEngine:
         if not kwargs.get('accept_disclaimer', False):
             return {"error": "Debe aceptar el disclaimer legal"}
         
+        cache = self.get_cache()
+        module = self.modules[module_type]
+        scan_options = {k: v for k, v in kwargs.items() if k not in ('accept_disclaimer', 'force_rescan')}
+        cache_key = config_hash({**scan_options, 'module_version': getattr(module, 'version', '')})
+        
+        if cache is not None and not kwargs.get('force_rescan', False):
+            with self.metrics.timer('scan_stage_seconds', module=module_type, stage='cache_lookup'):
+                cached = cache.get(target, module_type, cache_key, 'module')
+            if cached is not None:
+                self.logger.info(f"Resultado de {target} con {module_type} servido desde caché")
+                self.metrics.inc('scans_total', module=module_type, status='cached')
+                return {**cached, "cached": True}
+        
         try:
             self.logger.info(f"Iniciando escaneo de {target} con {module_type}")
-            results = self.modules[module_type].execute(target, **kwargs)
+            scan_kwargs = {k: v for k, v in kwargs.items() if k != 'force_rescan'}
+            with self.metrics.timer('scan_stage_seconds', module=module_type, stage='execute'):
+                results = module.execute(target, **scan_kwargs)
+            if cache is not None and 'error' not in results:
+                cache.put(target, module_type, cache_key, 'module', results)
+            self.metrics.inc('scans_total', module=module_type, status='error' if 'error' in results else 'ok')
             return results
         except Exception as e:
             self.logger.error(f"Error durante el escaneo: {e}")
+            self.metrics.inc('scans_total', module=module_type, status='error')
             return {"error": str(e)}
     
+    def run_scan_batch(self, targets: List[str], module_type: str,
+                       on_result: Callable[[int, Dict], Any] = None, **kwargs) -> List[Dict]:
+        """Escanear un lote de targets con un módulo que implementa execute_many
+        
+        Mismas reglas que run_scan (disclaimer, caché por target), pero los
+        targets no cacheados se pasan juntos al módulo para que comparta
+        conexiones y los escanee en paralelo. `on_result(índice, resultado)`
+        se llama una vez por target en cuanto su resultado está listo (al
+        terminar cada target si el módulo acepta on_result, si no al final
+        del lote).
+        """
+        def finish(index: int, result: Dict) -> Dict:
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+            return result
+        
+        results: List[Dict] = [None] * len(targets)
+        if module_type not in self.modules:
+            if not self.load_module(module_type):
+                return [finish(i, {"error": f"Módulo {module_type} no disponible"}) for i in range(len(targets))]
+        
+        if not kwargs.get('accept_disclaimer', False):
+            return [finish(i, {"error": "Debe aceptar el disclaimer legal"}) for i in range(len(targets))]
+        
+        cache = self.get_cache()
+        module = self.modules[module_type]
+        scan_options = {k: v for k, v in kwargs.items() if k not in ('accept_disclaimer', 'force_rescan')}
+        cache_key = config_hash({**scan_options, 'module_version': getattr(module, 'version', '')})
+        
+        pending = []
+        with self.metrics.timer('scan_stage_seconds', module=module_type, stage='cache_lookup'):
+            for index, target in enumerate(targets):
+                cached = None
+                if cache is not None and not kwargs.get('force_rescan', False):
+                    cached = cache.get(target, module_type, cache_key, 'module')
+                if cached is not None:
+                    finish(index, {**cached, "cached": True})
+                else:
+                    pending.append(index)
+        self.metrics.inc('scans_total', len(targets) - len(pending), module=module_type, status='cached')
+        
+        if pending:
+            self.logger.info(f"Iniciando escaneo de {len(pending)} targets con {module_type}")
+            scan_kwargs = {k: v for k, v in kwargs.items() if k != 'force_rescan'}
+            self.metrics.inc('scan_batches_total', module=module_type)
+            self.metrics.inc('scan_batch_targets_total', len(pending), module=module_type)
+            
+            def done(position: int, result: Dict):
+                index = pending[position]
+                if results[index] is not None:
+                    return
+                if cache is not None and 'error' not in result:
+                    cache.put(targets[index], module_type, cache_key, 'module', result)
+                self.metrics.inc('scans_total', module=module_type, status='error' if 'error' in result else 'ok')
+                finish(index, result)
+            
+            if 'on_result' in inspect.signature(module.execute_many).parameters:
+                scan_kwargs['on_result'] = done
+            try:
+                with self.metrics.timer('scan_stage_seconds', module=module_type, stage='execute_batch'):
+                    batch = module.execute_many([targets[i] for i in pending], **scan_kwargs)
+            except Exception as e:
+                self.logger.error(f"Error durante el escaneo: {e}")
+                batch = [{"error": str(e)} for _ in pending]
+            # Los que el módulo no haya entregado ya (módulos sin on_result o lote fallido)
+            for position, result in enumerate(batch):
+                done(position, result)
+        return results
+    
+    async def run_scan_many(self, targets: Iterable[str], module_types: Union[str, List[str]],
+                            max_workers: int = None, **kwargs) -> AsyncIterator[Dict]:
+        """Escanear muchos targets en paralelo, devolviendo cada resultado al terminar
+
+        Los trabajos se reparten por turnos entre módulos (respetando el
+        límite de concurrencia de cada uno en config['module_concurrency'])
+        y en orden de llegada entre targets. Los targets se consumen de forma
+        perezosa, así que `targets` puede ser un generador sobre un fichero.
+        Los módulos con execute_many reciben lotes de hasta
+        config['module_batch_size'] targets por trabajo; cada target de un
+        lote se devuelve en cuanto termina, sin esperar al resto del lote.
+        """
+        if isinstance(module_types, str):
+            module_types = [module_types]
+
+        if not kwargs.get('accept_disclaimer', False):
+            yield {"error": "Debe aceptar el disclaimer legal"}
+            return
+
+        available = []
+        for module_type in module_types:
+            if module_type in self.modules or self.load_module(module_type):
+                available.append(module_type)
+            else:
+                yield {"module": module_type, "error": f"Módulo {module_type} no disponible"}
+        if not available:
+            return
+
+        max_workers = max_workers or self.config.get('max_workers', 32)
+        caps = {m: max(1, min(self.config.get('module_concurrency', {}).get(m, max_workers), max_workers))
+                for m in available}
+        batch_size = max(1, self.config.get('module_batch_size', 64))
+        batched = {m for m in available if hasattr(self.modules[m], 'execute_many')}
+        executor = self.get_executor(max_workers)
+        loop = asyncio.get_running_loop()
+        # Resultados por target de los lotes, entregados desde los hilos del pool
+        finished: asyncio.Queue = asyncio.Queue()
+
+        def deliver(batch: List[str], module_type: str, delivered: set, index: int, result: Dict):
+            delivered.add(index)
+            finished.put_nowait({"target": batch[index], "module": module_type, **result})
+
+        def on_result(batch: List[str], module_type: str, delivered: set):
+            return lambda index, result: loop.call_soon_threadsafe(
+                deliver, batch, module_type, delivered, index, result)
+
+        target_iter = iter(targets)
+        queues = {m: deque() for m in available}
+        in_flight = {m: 0 for m in available}
+        running = {}
+        exhausted = False
+        rotation = 0
+
+        while True:
+            # Rellenar las colas sin leer más targets de los necesarios
+            while not exhausted and max(len(q) for q in queues.values()) < max_workers * 4 + batch_size:
+                target = next(target_iter, None)
+                if target is None:
+                    exhausted = True
+                    break
+                for q in queues.values():
+                    q.append(target)
+
+            # Lanzar trabajos por turnos entre módulos hasta llenar el pool
+            launched = True
+            while launched and len(running) < max_workers:
+                launched = False
+                for i in range(len(available)):
+                    module_type = available[(rotation + i) % len(available)]
+                    if queues[module_type] and in_flight[module_type] < caps[module_type]:
+                        queue = queues[module_type]
+                        delivered = set()
+                        if module_type in batched:
+                            target = [queue.popleft() for _ in range(min(batch_size, len(queue)))]
+                            job = partial(self.run_scan_batch, target, module_type,
+                                          on_result(target, module_type, delivered), **kwargs)
+                        else:
+                            target = queue.popleft()
+                            job = partial(self.run_scan, target, module_type, **kwargs)
+                        future = loop.run_in_executor(executor, job)
+                        running[future] = (target, module_type, delivered)
+                        in_flight[module_type] += 1
+                        launched = True
+                        if len(running) >= max_workers:
+                            break
+                rotation = (rotation + 1) % len(available)
+
+            if self.metrics.enabled:
+                for module_type in available:
+                    self.metrics.set_gauge('queue_depth', len(queues[module_type]), queue=module_type)
+                    self.metrics.set_gauge('jobs_in_flight', in_flight[module_type], module=module_type)
+
+            while not finished.empty():
+                yield finished.get_nowait()
+            if not running:
+                return
+
+            getter = asyncio.ensure_future(finished.get())
+            done, _ = await asyncio.wait([getter, *running], return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+            else:
+                getter.cancel()
+            for future in done - {getter}:
+                target, module_type, delivered = running.pop(future)
+                in_flight[module_type] -= 1
+                # Los resultados de un lote llegan antes que su future (mismo orden en el loop)
+                while not finished.empty():
+                    yield finished.get_nowait()
+                if isinstance(target, list):
+                    try:
+                        future.result()
+                        missing = {"error": "Sin resultado"}
+                    except Exception as e:
+                        missing = {"error": str(e)}
+                    for index, item in enumerate(target):
+                        if index not in delivered:
+                            yield {"target": item, "module": module_type, **missing}
+                else:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"error": str(e)}
+                    yield {"target": target, "module": module_type, **result}
+
+    def get_cache(self) -> ResultCache:
+        """Caché persistente de resultados (None si está desactivada en la config)"""
+        if self._cache is None and self.config.get('result_cache'):
+            try:
+                self._cache = ResultCache(self.config['result_cache'], self.config.get('cache_ttls'))
+            except Exception as e:
+                self.logger.error(f"No se pudo abrir la caché de resultados: {e}")
+                self.config['result_cache'] = None
+        return self._cache
+    
+    def get_executor(self, max_workers: int) -> ThreadPoolExecutor:
+        """Pool de workers compartido por los escaneos masivos"""
+        if self._executor is None or self._executor._max_workers < max_workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nova-scan')
+        return self._executor
+
     def list_modules(self) -> List[str]:
         """Listar módulos disponibles"""
-        modules_dir = Path("modules")
-        return [d.name for d in modules_dir.iterdir() if d.is_dir()]
+        return self.registry.names()
+    
+    def describe_modules(self) -> List[Dict[str, Any]]:
+        """Metadata de los módulos disponibles sin importarlos"""
+        index = self.registry.discover()
+        return [
+            {
+                "name": key,
+                "version": info.version,
+                "description": info.description,
+                "requirements": info.requirements
+            }
+            for key, info in sorted(index.items())
+        ]
+
+# Singleton para acceso global, creado bajo demanda
+_engine = None
+
+def get_engine(config_path: str = None) -> NovaEngine:
+    """Obtener (o crear en el primer uso) el engine global"""
+    global _engine
+    if _engine is None:
+        _engine = NovaEngine(config_path)
+    return _engine
 
-# Singleton para acceso global
-engine = NovaEngine()
\ No newline at end of file
+def __getattr__(name: str):
+    # Compatibilidad con `from core.engine.nova_engine import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,309 @@
+"""
+Module Registry for KaliNova
+Descubre módulos y su metadata sin importarlos
+"""
+
+import ast
+import importlib
+import importlib.util
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+ENTRY_POINT_GROUP = "kalinova.modules"
+METADATA_FIELDS = ("name", "version", "requirements", "description")
+ROOT = Path(__file__).resolve().parent.parent.parent
+# (directorio, paquete importable) donde se buscan módulos del engine. Core/modules
+# contiene sobre todo scanners de Core/main.py, que se descartan al no ser BaseModule
+DEFAULT_MODULE_DIRS = (
+    (ROOT / "Core" / "modules", "modules"),
+    (ROOT / "Novavision" / "útiles", "Novavision.útiles"),
+)
+DEFAULT_MANIFEST = Path.home() / ".cache" / "kalinova" / "module_manifest.json"
+# Cambia cuando cambia qué se considera un módulo: invalida los manifests anteriores
+MANIFEST_FORMAT = 2
+
+
+@dataclass
+class ModuleInfo:
+    key: str
+    entry: str
+    source: str
+    name: str = ""
+    version: str = ""
+    requirements: List[str] = field(default_factory=list)
+    description: str = ""
+    path: Optional[str] = None
+    mtime_ns: int = 0
+    size: int = 0
+
+
+def is_engine_module(cls: ast.ClassDef) -> bool:
+    """Subclase de BaseModule con execute() que se puede instanciar sin argumentos"""
+    bases = {base.id if isinstance(base, ast.Name) else getattr(base, 'attr', '') for base in cls.bases}
+    if "BaseModule" not in bases:
+        return False
+    methods = {item.name: item for item in cls.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    if "execute" not in methods:
+        return False
+    init = methods.get("__init__")
+    if init is None:
+        return True
+    args = init.args
+    positional = args.posonlyargs + args.args
+    required_kwonly = [arg for arg, default in zip(args.kwonlyargs, args.kw_defaults) if default is None]
+    return len(positional) - len(args.defaults) <= 1 and not required_kwonly
+
+
+def parse_module_metadata(path: str) -> Dict[str, Any]:
+    """Extrae name/version/requirements/description del __init__ sin importar el módulo
+
+    Solo cuentan las clases que el engine puede usar (ver is_engine_module);
+    sin ninguna devuelve {}.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    candidates = [node for node in tree.body if isinstance(node, ast.ClassDef) and is_engine_module(node)]
+    # Preferir la clase que usa el engine por convención
+    candidates.sort(key=lambda node: node.name != "Scanner")
+
+    for cls in candidates:
+        metadata = {}
+        for item in cls.body:
+            if not (isinstance(item, ast.FunctionDef) and item.name == "__init__"):
+                continue
+            for stmt in ast.walk(item):
+                if not isinstance(stmt, ast.Assign):
+                    continue
+                for target in stmt.targets:
+                    if (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                            and target.value.id == "self" and target.attr in METADATA_FIELDS):
+                        try:
+                            metadata[target.attr] = ast.literal_eval(stmt.value)
+                        except ValueError:
+                            pass
+        if metadata:
+            metadata["class_name"] = cls.name
+            return metadata
+    # Sin metadata declarada: al menos la clase que exporta el módulo
+    return {"class_name": candidates[0].name} if candidates else {}
+
+
+class ModuleRegistry:
+    def __init__(self, modules_dir: str = None, manifest_path: str = None, package: str = "modules"):
+        self.module_dirs: Sequence[Tuple[Path, str]] = (
+            ((Path(modules_dir), package),) if modules_dir else DEFAULT_MODULE_DIRS
+        )
+        self.manifest_path = Path(manifest_path) if manifest_path else DEFAULT_MANIFEST
+        self._index: Optional[Dict[str, ModuleInfo]] = None
+        self._instances: Dict[str, Any] = {}
+        # Ficheros ya analizados que no contienen ningún módulo: ruta -> [mtime_ns, size]
+        self._skipped: Dict[str, List[int]] = {}
+
+    def discover(self, refresh: bool = False) -> Dict[str, ModuleInfo]:
+        """Construye el índice de módulos usando el manifest cacheado cuando es válido"""
+        if self._index is not None and not refresh:
+            return self._index
+
+        cached, skipped = ({}, {}) if refresh else self.load_manifest()
+        index: Dict[str, ModuleInfo] = {}
+        self._skipped = {}
+
+        for info in self.discover_directory(cached, skipped):
+            index.setdefault(info.key, info)
+        for info in self.discover_entry_points(cached):
+            index.setdefault(info.key, info)
+
+        if (any(cached.get(key) != asdict(info) for key, info in index.items()) or len(cached) != len(index)
+                or skipped != self._skipped):
+            self.save_manifest(index)
+
+        self._index = index
+        return index
+
+    def module_source(self, entry: os.DirEntry, package: str) -> Optional[tuple]:
+        """(clave, módulo importable, fichero) de una entrada de modules_dir
+
+        Acepta <nombre>/scanner.py (convención del engine), un paquete
+        <nombre>/ con un único módulo principal y ficheros <nombre>.py.
+        """
+        if entry.name.startswith(('.', '_')):
+            return None
+        if entry.is_file():
+            if not entry.name.endswith(".py"):
+                return None
+            stem = entry.name[:-3]
+            return stem, f"{package}.{stem}", Path(entry.path)
+        if not entry.is_dir():
+            return None
+        scanner = Path(entry.path) / "scanner.py"
+        if scanner.is_file():
+            return entry.name, f"{package}.{entry.name}.scanner", scanner
+        sources = sorted(path for path in Path(entry.path).glob("*.py") if not path.name.startswith('_'))
+        if not sources:
+            return None
+        return entry.name, f"{package}.{entry.name}.{sources[0].stem}", sources[0]
+
+    def discover_directory(self, cached: Dict[str, Dict], skipped: Dict[str, List[int]]) -> List[ModuleInfo]:
+        """Módulos en los directorios de módulos (ver module_source)
+
+        Los ficheros sin ninguna clase utilizable por el engine (scanners
+        que necesitan argumentos, utilidades...) no se registran, y se
+        recuerdan en el manifest para no volver a analizarlos.
+        """
+        found = []
+        for modules_dir, package in self.module_dirs:
+            if not modules_dir.is_dir():
+                continue
+            for entry in sorted(os.scandir(modules_dir), key=lambda entry: entry.name):
+                source = self.module_source(entry, package)
+                if source is None:
+                    continue
+                key, module_name, path = source
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                signature = [stat.st_mtime_ns, stat.st_size]
+
+                previous = cached.get(key)
+                if (previous and previous.get("path") == str(path)
+                        and [previous.get("mtime_ns"), previous.get("size")] == signature):
+                    found.append(ModuleInfo(**previous))
+                    continue
+                if skipped.get(str(path)) == signature:
+                    self._skipped[str(path)] = signature
+                    continue
+
+                info = self.build_info(key, module_name, "directory", str(path), stat)
+                if info is None:
+                    self._skipped[str(path)] = signature
+                else:
+                    found.append(info)
+        return found
+
+    def discover_entry_points(self, cached: Dict[str, Dict]) -> List[ModuleInfo]:
+        """Módulos instalados que declaran el entry point kalinova.modules"""
+        found = []
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            module_name, _, attr = ep.value.partition(":")
+            previous = cached.get(ep.name)
+            if previous and previous.get("source") == "entry_point" and self.entry_unchanged(previous, module_name, attr):
+                found.append(ModuleInfo(**previous))
+                continue
+
+            path, stat = None, None
+            try:
+                spec = importlib.util.find_spec(module_name)
+                if spec and spec.origin and spec.origin.endswith(".py"):
+                    path, stat = spec.origin, os.stat(spec.origin)
+            except (ImportError, ValueError, OSError):
+                pass
+            found.append(self.build_info(ep.name, module_name, "entry_point", path, stat, attr or None))
+        return found
+
+    @staticmethod
+    def entry_unchanged(previous: Dict[str, Any], module_name: str, attr: str) -> bool:
+        """El entry point apunta al mismo módulo/clase y su fichero no ha cambiado"""
+        cached_module, _, cached_class = previous.get("entry", "").partition(":")
+        # Sin ":Clase" en el entry point, la clase cacheada salió de la metadata del fichero
+        if cached_module != module_name or (attr and cached_class != attr):
+            return False
+        if not previous.get("path"):
+            return True
+        try:
+            stat = os.stat(previous["path"])
+        except OSError:
+            return False
+        return previous.get("mtime_ns") == stat.st_mtime_ns and previous.get("size") == stat.st_size
+
+    def build_info(self, key: str, module_name: str, source: str, path: Optional[str],
+                   stat: Optional[os.stat_result], class_name: str = None) -> Optional[ModuleInfo]:
+        """Crea la entrada del índice leyendo la metadata del código fuente
+
+        Un fichero de directorio sin clase de módulo devuelve None; los entry
+        points declaran su clase y se aceptan tal cual.
+        """
+        metadata = {}
+        if path:
+            try:
+                metadata = parse_module_metadata(path)
+            except (OSError, SyntaxError, UnicodeDecodeError):
+                metadata = {}
+
+        if source == "directory" and "class_name" not in metadata:
+            return None
+        class_name = class_name or metadata.pop("class_name", "Scanner")
+        metadata.pop("class_name", None)
+        return ModuleInfo(
+            key=key,
+            entry=f"{module_name}:{class_name}",
+            source=source,
+            path=path,
+            mtime_ns=stat.st_mtime_ns if stat else 0,
+            size=stat.st_size if stat else 0,
+            **{name: metadata[name] for name in METADATA_FIELDS if name in metadata}
+        )
+
+    def manifest_dirs(self) -> List[str]:
+        return [f"{modules_dir}:{package}" for modules_dir, package in self.module_dirs]
+
+    def load_manifest(self) -> Tuple[Dict[str, Dict], Dict[str, List[int]]]:
+        """Leer manifest cacheado: (módulos, ficheros descartados)"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT and data.get("modules_dirs") == self.manifest_dirs():
+                return data.get("modules", {}), data.get("skipped", {})
+        except (OSError, ValueError):
+            pass
+        return {}, {}
+
+    def save_manifest(self, index: Dict[str, ModuleInfo]):
+        """Guardar manifest de forma atómica"""
+        data = {
+            "format": MANIFEST_FORMAT,
+            "modules_dirs": self.manifest_dirs(),
+            "modules": {key: asdict(info) for key, info in index.items()},
+            "skipped": self._skipped
+        }
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError:
+            pass
+
+    def names(self) -> List[str]:
+        """Nombres de módulos disponibles"""
+        return sorted(self.discover())
+
+    def get_info(self, key: str) -> Optional[ModuleInfo]:
+        """Metadata de un módulo sin importarlo"""
+        return self.discover().get(key)
+
+    def get(self, key: str) -> Any:
+        """Importa e instancia el módulo en el primer uso
+
+        ImportError si el módulo no está registrado; TypeError si la clase
+        no se puede instanciar sin argumentos o no tiene execute().
+        """
+        if key in self._instances:
+            return self._instances[key]
+
+        info = self.get_info(key)
+        if info is None:
+            raise ImportError(f"Módulo no registrado: {key}")
+        module_name, _, class_name = info.entry.partition(":")
+        module = importlib.import_module(module_name)
+        instance = getattr(module, class_name or "Scanner")()
+        if not callable(getattr(instance, "execute", None)):
+            raise TypeError(f"{info.entry} no implementa execute()")
+        self._instances[key] = instance
+        return instance
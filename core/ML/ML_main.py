@@ -3,53 +3,99 @@ import asyncio
 import argparse
 import pandas as pd
 import numpy as np
-from ml.feature_engineer import ThreatFeatureEngineer
+from ml.feature_engineer import ThreatFeatureEngineer, NETWORK_FEATURES
+from ml.flow_state import FlowStateEngine
 from ml.model_trainer import ThreatModelTrainer
 from ml.deep_threat_detector import DeepThreatDetector
+from ml.model_registry import ModelRegistry
 from monitoring.realtime_detector import RealTimeThreatDetector
 import json
-import joblib
+from datetime import datetime
 
 class KaliNovaML:
-    def __init__(self):
+    def __init__(self, registry_path: str = 'models/registry'):
         self.feature_engineer = ThreatFeatureEngineer()
         self.model_trainer = ThreatModelTrainer()
+        self.registry = ModelRegistry(registry_path)
         self.realtime_detector = None
+        # Configuración del motor de flujos con el que se generaron los datos de entrenamiento
+        self.flow_features = None
     
     def generate_sample_data(self, num_samples=10000):
-        """Genera datos de ejemplo para entrenamiento"""
+        """Genera datos de ejemplo para entrenamiento
+        
+        Se sintetizan sesiones completas (no paquetes sueltos) y las
+        características se extraen con un FlowStateEngine igual que el del
+        detector, así que pps, bps, entropía de puertos y varianza tienen
+        en entrenamiento la misma distribución que en producción.
+        """
         print("[+] Generando datos de entrenamiento...")
         
-        features = []
-        labels = []
+        packets, labels = self.synthesize_flows(num_samples)
+        flow_state = FlowStateEngine()
+        features = ThreatFeatureEngineer(flow_state).extract_network_features_batch(packets)
+        self.flow_features = flow_state.config()
+        
+        return features, labels
+    
+    def synthesize_flows(self, num_samples: int, duration: float = 600.0):
+        """Paquetes en columnas, ordenados por tiempo, de sesiones normales y maliciosas
         
-        for i in range(num_samples):
-            # Datos normales (80%)
-            if np.random.random() < 0.8:
-                packet_data = {
-                    'length': np.random.randint(40, 1500),
-                    'protocol': 'TCP',
-                    'src_port': np.random.randint(1024, 65535),
-                    'dst_port': np.random.choice([80, 443, 22, 53]),
-                    'timestamp': datetime.now()
-                }
-                label = 0  # Normal
+        Normales (~80% de los paquetes): clientes de la red interna contra
+        servicios habituales, pocas decenas de paquetes a ritmo humano.
+        Maliciosas: ráfagas de paquetes grandes contra puertos de
+        administración (fuerza bruta/flood) y barridos de puertos con
+        paquetes pequeños desde un mismo origen.
+        """
+        sessions = []
+        total = malicious = 0
+        while total < num_samples:
+            start = np.random.uniform(0, duration)
+            src_ip = f"192.168.1.{np.random.randint(1, 255)}"
+            if malicious >= 0.2 * total:
+                # Sesión normal
+                count = np.random.randint(1, 30)
+                dst_port = np.full(count, np.random.choice([80, 443, 22, 53]))
+                gaps = np.random.exponential(0.5, count)
+                length = np.random.randint(40, 1500, count)
+                label = 0
+            elif np.random.random() < 0.5:
+                # Ráfaga contra un puerto de administración
+                count = np.random.randint(50, 300)
+                dst_port = np.full(count, np.random.choice([22, 23, 3389]))
+                gaps = np.random.exponential(0.01, count)
+                length = np.random.randint(1500, 10000, count)
+                src_ip = f"203.0.113.{np.random.randint(1, 255)}"
+                label = 1
             else:
-                # Datos maliciosos (20%)
-                packet_data = {
-                    'length': np.random.randint(1500, 10000),
-                    'protocol': 'TCP',
-                    'src_port': np.random.randint(1024, 65535),
-                    'dst_port': np.random.choice([22, 23, 3389]),  # Puertos comúnmente atacados
-                    'timestamp': datetime.now()
-                }
-                label = 1  # Malicioso
-            
-            feature_vector = self.feature_engineer.extract_network_features(packet_data)
-            features.append(list(feature_vector.values()))
-            labels.append(label)
+                # Barrido de puertos
+                count = np.random.randint(50, 300)
+                dst_port = np.random.randint(1, 65536, count)
+                gaps = np.random.exponential(0.005, count)
+                length = np.random.randint(40, 80, count)
+                src_ip = f"198.51.100.{np.random.randint(1, 255)}"
+                label = 1
+            sessions.append({
+                'time': start + np.cumsum(gaps),
+                'length': length,
+                'protocol': np.full(count, 'UDP' if dst_port[0] == 53 and not label else 'TCP'),
+                'src_ip': np.full(count, src_ip),
+                'dst_ip': np.full(count, f"10.0.0.{np.random.randint(1, 10)}"),
+                'src_port': np.full(count, np.random.randint(1024, 65535)),
+                'dst_port': dst_port,
+                'label': np.full(count, label)
+            })
+            total += count
+            malicious += count * label
+        
+        columns = {name: np.concatenate([session[name] for session in sessions]) for name in sessions[0]}
+        order = np.argsort(columns['time'], kind='stable')[:num_samples]
+        columns = {name: values[order] for name, values in columns.items()}
         
-        return np.array(features), np.array(labels)
+        start = np.datetime64(datetime.now(), 'us') - np.timedelta64(int(duration * 1e6), 'us')
+        columns['timestamp'] = start + (columns.pop('time') * 1e6).astype('timedelta64[us]')
+        labels = columns.pop('label').astype(int)
+        return columns, labels
     
     async def train_models(self, X, y):
         """Entrena todos los modelos"""
@@ -69,10 +115,13 @@ class KaliNovaML:
         # Comparar modelos
         comparison = self.model_trainer.compare_models()
         
-        # Guardar mejor modelo
+        # Registrar el mejor modelo como nueva versión activa
         best_model_name = self.model_trainer.best_model
-        best_model = self.model_trainer.models[best_model_name]['model']
-        joblib.dump(best_model, f'models/trained_models/best_model_{best_model_name}.pkl')
+        best = self.model_trainer.models[best_model_name]
+        self.registry.register('network_threat', best['model'], schema=NETWORK_FEATURES,
+                               metrics=best['metrics'], flow_features=self.flow_features,
+                               metadata={'algorithm': best_model_name, 'samples': len(X),
+                                         'comparison': comparison})
         
         print("[+] Entrenamiento completado!")
         return comparison
@@ -81,9 +130,8 @@ class KaliNovaML:
         """Inicia la detección en tiempo real"""
         print(f"[+] Iniciando detección en tiempo real en {interface}...")
         
-        self.realtime_detector = RealTimeThreatDetector(
-            model_path='models/trained_models/best_model_random_forest.pkl'
-        )
+        # Un entrenamiento posterior se activa solo, sin reiniciar el detector
+        self.realtime_detector = RealTimeThreatDetector(registry=self.registry, watch_interval=5.0)
         
         # Simular tráfico en tiempo real (en producción usarías un sniffer real)
         await self.simulate_realtime_traffic()
@@ -116,10 +164,11 @@ async def main():
     parser.add_argument('--train', action='store_true', help='Entrenar modelos')
     parser.add_argument('--detect', action='store_true', help='Iniciar detección en tiempo real')
     parser.add_argument('--interface', default='eth0', help='Interfaz de red para monitoreo')
+    parser.add_argument('--registry', default='models/registry', help='Directorio del registro de modelos')
     
     args = parser.parse_args()
     
-    kalinovaml = KaliNovaML()
+    kalinovaml = KaliNovaML(args.registry)
     
     if args.train:
         # Generar datos y entrenar
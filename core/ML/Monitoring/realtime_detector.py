@@ -3,73 +3,260 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import json
+import joblib
 from collections import deque
 import warnings
+from ml.feature_engineer import ThreatFeatureEngineer, NETWORK_FEATURES
+from ml.flow_state import FlowStateEngine
+from ml.model_registry import ModelRegistry
+from core.metrics import get_metrics
 warnings.filterwarnings('ignore')
 
+DROP_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
 class RealTimeThreatDetector:
-    def __init__(self, model_path=None, threshold=0.8):
-        self.model = self.load_model(model_path)
+    """Detector en tiempo real con inferencia por micro-lotes
+    
+    Los paquetes entran en una cola acotada y un único consumidor los
+    agrupa en lotes de hasta `batch_size` paquetes o `max_wait` segundos
+    (lo que llegue antes). Cada lote se extrae y se predice de una vez y
+    cada paquete recibe su veredicto por su propio future. Con la cola
+    llena, `drop_policy` decide: 'block' (backpressure sobre el
+    productor), 'drop_newest' (se descarta el paquete entrante) o
+    'drop_oldest' (se descarta el más antiguo de la cola).
+    
+    Con `registry` el modelo sale del registro versionado (mapeado en
+    memoria y compartido entre procesos) y puede cambiarse en caliente
+    con reload_model() o vigilando el registro cada `watch_interval`
+    segundos: cada lote usa el modelo activo cuando empezó, así que el
+    cambio no pierde ni mezcla paquetes.
+    """
+    
+    def __init__(self, model_path=None, threshold=0.8, flow_state: FlowStateEngine = None,
+                 batch_size: int = 256, max_wait: float = 0.005, queue_size: int = 10000,
+                 drop_policy: str = 'block', registry: ModelRegistry = None,
+                 model_name: str = 'network_threat', watch_interval: float = None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy debe ser uno de {DROP_POLICIES}")
+        self.registry = registry
+        self.model_name = model_name
+        self.watch_interval = watch_interval
+        self.watcher: asyncio.Task = None
+        # Un único extractor con estado de flujos: pps, entropía y varianza reales por flujo
+        self.feature_engineer = ThreatFeatureEngineer(flow_state if flow_state is not None else FlowStateEngine())
+        # (versión, predictor): se sustituye de una sola asignación
+        self.active = self.load_model(model_path)
         self.threshold = threshold
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.queue: asyncio.Queue = None
+        self.worker: asyncio.Task = None
         self.detection_history = deque(maxlen=1000)
         self.alerts = []
+        # received = accepted + descartados al llegar; total_packets son los analizados,
+        # así que detection_rate no se diluye con lo que nunca se llegó a predecir
         self.stats = {
+            'received': 0,
+            'accepted': 0,
             'total_packets': 0,
             'threats_detected': 0,
-            'false_positives': 0
+            'false_positives': 0,
+            'dropped': 0,
+            'batches': 0,
+            'errors': 0,
+            'model_swaps': 0
         }
     
-    def load_model(self, model_path):
-        """Carga el modelo ML entrenado"""
-        if model_path:
+    @property
+    def model(self):
+        return self.active[1]
+    
+    @property
+    def model_version(self):
+        return self.active[0]
+    
+    def load_model(self, model_path=None, version: int = None) -> tuple:
+        """(versión, predictor) del registro o de un fichero joblib, mapeado en memoria
+        
+        Un modelo que no carga es un error: sin modelo no hay detección, y
+        tampoco con un modelo entrenado con otras características de flujo.
+        """
+        if self.registry is not None and not model_path:
+            loaded = self.registry.load(self.model_name, version, schema=NETWORK_FEATURES,
+                                        flow_features=self.feature_engineer.flow_state.config())
+            return loaded.version, loaded.predictor
+        if not model_path:
+            raise ValueError("Hace falta un registro de modelos o un model_path")
+        return model_path, joblib.load(model_path, mmap_mode='r')
+    
+    def swap_model(self, active: tuple):
+        """Activa otro (versión, predictor); los lotes en curso terminan con el anterior"""
+        version, predictor = active
+        # Una predicción de prueba antes del cambio: un modelo roto no llega a activarse
+        self.predict_batch(np.zeros((1, len(NETWORK_FEATURES)), dtype=np.float32), active)
+        previous = self.model_version
+        self.active = active
+        self.stats['model_swaps'] += 1
+        get_metrics().inc('detector_model_swaps_total', model=self.model_name)
+        print(f"[+] Modelo {self.model_name}: {previous} -> {version}")
+    
+    async def reload_model(self, version: int = None):
+        """Carga una versión del registro (por defecto la activa) y la cambia en caliente"""
+        if self.registry is None:
+            raise ValueError("El detector no tiene registro de modelos")
+        loop = asyncio.get_running_loop()
+        active = await loop.run_in_executor(None, self.load_model, None, version)
+        if active[0] != self.model_version:
+            await loop.run_in_executor(None, self.swap_model, active)
+        return self.model_version
+    
+    async def watch_registry(self, interval: float):
+        """Cambia al modelo que el registro marque como activo en cuanto aparece"""
+        while True:
+            await asyncio.sleep(interval)
             try:
-                return joblib.load(model_path)
-            except:
-                print("[-] No se pudo cargar el modelo, usando detector básico")
-        return self.create_basic_detector()
+                if self.registry.latest_version(self.model_name) != self.model_version:
+                    await self.reload_model()
+            except Exception as e:
+                print(f"[-] No se pudo cambiar de modelo: {e}")
     
-    def create_basic_detector(self):
-        """Crea un detector básico basado en reglas"""
-        from sklearn.ensemble import IsolationForest
-        return IsolationForest(contamination=0.1)
+    def start(self):
+        """Arranca el consumidor de la cola (se llama solo en el primer paquete)"""
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.worker = asyncio.ensure_future(self.batch_loop())
+        if self.registry is not None and self.watch_interval and (self.watcher is None or self.watcher.done()):
+            self.watcher = asyncio.ensure_future(self.watch_registry(self.watch_interval))
+    
+    async def stop(self):
+        """Procesa lo que queda en la cola y detiene el consumidor"""
+        if self.watcher is not None:
+            self.watcher.cancel()
+            self.watcher = None
+        if self.worker is None:
+            return
+        await self.queue.join()
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.worker = None
+    
+    async def submit(self, packet_data: dict) -> asyncio.Future:
+        """Encola un paquete y devuelve el future de su veredicto (None si se descarta)"""
+        self.start()
+        self.stats['received'] += 1
+        future = asyncio.get_running_loop().create_future()
+        item = (packet_data, future)
+        
+        if self.drop_policy == 'block':
+            await self.queue.put(item)
+            self.stats['accepted'] += 1
+        else:
+            if self.queue.full():
+                if self.drop_policy == 'drop_newest':
+                    self.drop(future)
+                    return future
+                dropped = self.queue.get_nowait()
+                self.queue.task_done()
+                self.drop(dropped[1])
+            self.queue.put_nowait(item)
+            self.stats['accepted'] += 1
+        get_metrics().set_gauge('detector_queue_depth', self.queue.qsize())
+        return future
+    
+    def drop(self, future: asyncio.Future):
+        self.stats['dropped'] += 1
+        get_metrics().inc('detector_dropped_total', policy=self.drop_policy)
+        if not future.done():
+            future.set_result(None)
     
     async def analyze_packet(self, packet_data: dict):
-        """Analiza un paquete en tiempo real"""
-        self.stats['total_packets'] += 1
+        """Analiza un paquete en tiempo real (espera al veredicto de su lote)"""
+        return await (await self.submit(packet_data))
+    
+    async def next_batch(self) -> list:
+        """Espera un paquete y junta los que lleguen hasta llenar el lote o agotar max_wait"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def batch_loop(self):
+        while True:
+            batch = await self.next_batch()
+            try:
+                await self.process_batch(batch)
+            except Exception as e:
+                print(f"[-] Error en análisis: {e}")
+                self.stats['errors'] += 1
+            finally:
+                # Los paquetes de un lote fallido reciben None, como antes un error por paquete
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+                    self.queue.task_done()
+    
+    async def process_batch(self, batch: list):
+        """Una extracción y una inferencia por lote; los veredictos vuelven a cada paquete"""
+        packets = [packet for packet, _ in batch]
+        self.stats['batches'] += 1
+        self.stats['total_packets'] += len(batch)
+        metrics = get_metrics()
+        metrics.inc('detector_packets_total', len(batch))
         
-        # Extraer características
-        feature_engineer = ThreatFeatureEngineer()
-        features = feature_engineer.extract_network_features(packet_data)
-        feature_vector = np.array(list(features.values())).reshape(1, -1)
+        with metrics.timer('detector_stage_seconds', stage='features'):
+            columns = self.feature_engineer.packets_to_columns(packets)
+            matrix = self.feature_engineer.extract_network_features_batch(columns)
+        # La inferencia va a un hilo para no bloquear a los productores; el lote entero
+        # usa el modelo activo al empezar aunque entre tanto se cambie
+        active = self.active
+        with metrics.timer('detector_stage_seconds', stage='inference'):
+            probabilities, verdicts = await asyncio.get_running_loop().run_in_executor(
+                None, self.predict_batch, matrix, active
+            )
         
-        # Realizar predicción
-        try:
-            if hasattr(self.model, 'predict_proba'):
-                probability = self.model.predict_proba(feature_vector)[0, 1]
-                is_threat = probability > self.threshold
-            else:
-                prediction = self.model.predict(feature_vector)
-                is_threat = prediction[0] == 1
-            
-            # Registrar detección
+        now = datetime.now()
+        for index, (packet_data, future) in enumerate(batch):
             detection_record = {
-                'timestamp': datetime.now(),
-                'features': features,
-                'is_threat': bool(is_threat),
-                'probability': probability if 'probability' in locals() else None,
+                'timestamp': now,
+                'features': dict(zip(NETWORK_FEATURES, matrix[index].tolist())),
+                'is_threat': bool(verdicts[index]),
+                'probability': None if probabilities is None else float(probabilities[index]),
+                'model_version': active[0],
                 'packet_data': packet_data
             }
-            
             self.detection_history.append(detection_record)
             
-            if is_threat:
+            if detection_record['is_threat']:
                 await self.handle_threat_detection(detection_record)
             
-            return detection_record
-            
-        except Exception as e:
-            print(f"[-] Error en análisis: {e}")
-            return None
+            if not future.done():
+                future.set_result(detection_record)
+    
+    def predict_batch(self, matrix: np.ndarray, active: tuple = None):
+        """(probabilidades o None, veredictos) para todas las filas de la matriz"""
+        model = (active or self.active)[1]
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(matrix)[:, 1]
+            return probabilities, probabilities > self.threshold
+        return None, model.predict(matrix) == 1
     
     async def handle_threat_detection(self, detection: dict):
         """Maneja la detección de una amenaza"""
@@ -144,6 +331,8 @@ class RealTimeThreatDetector:
         """Obtiene estadísticas de detección"""
         return {
             **self.stats,
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'model_version': self.model_version,
             'detection_rate': self.stats['threats_detected'] / max(self.stats['total_packets'], 1),
             'recent_alerts': len([a for a in self.alerts if 
                                 (datetime.now() - a['timestamp']).total_seconds() < 3600])
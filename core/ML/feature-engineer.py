@@ -3,16 +3,43 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.feature_extraction.text import TfidfVectorizer
 import json
+from collections import Counter
 from datetime import datetime
+from typing import Any, Dict, List, Mapping, Union
+from core.pattern_matcher import PatternMatcher
+
+SUSPICIOUS_HEADERS = PatternMatcher([
+    'x-forwarded-for', 'x-real-ip', 'x-powered-by',
+    'server', 'x-aspnet-version'
+])
+
+# Orden fijo de las columnas de la matriz de características de red
+NETWORK_FEATURES = (
+    'packet_size', 'protocol', 'src_port', 'dst_port', 'hour', 'day_of_week',
+    'packets_per_second', 'bytes_per_second', 'port_entropy', 'size_variance'
+)
+
+# Valores por defecto de los campos de un paquete (los mismos .get() de extract_network_features)
+NETWORK_DEFAULTS = {
+    'length': 0, 'protocol': 'unknown', 'src_port': 0, 'dst_port': 0,
+    'packet_count': 1, 'time_window': 1, 'src_ip': '', 'dst_ip': ''
+}
+
+# Números de protocolo IANA; 0 para desconocidos
+PROTOCOL_CODES = {'ICMP': 1, 'TCP': 6, 'UDP': 17, 'ICMPV6': 58, 'SCTP': 132}
 
 class ThreatFeatureEngineer:
-    def __init__(self):
+    def __init__(self, flow_state=None):
+        # FlowStateEngine opcional: cada paquete extraído actualiza su flujo
+        self.flow_state = flow_state
         self.scalers = {}
         self.encoders = {}
         self.feature_names = []
     
     def extract_network_features(self, packet_data: dict) -> dict:
         """Extrae características de tráfico de red"""
+        if self.flow_state is not None:
+            packet_data = self.flow_state.annotate(packet_data)
         features = {}
         
         # Características básicas del paquete
@@ -36,6 +63,117 @@ class ThreatFeatureEngineer:
         
         return features
     
+    def extract_network_features_batch(self, packets: Union[pd.DataFrame, Mapping[str, Any]],
+                                       out: np.ndarray = None) -> np.ndarray:
+        """Versión vectorizada de extract_network_features para datos en columnas
+        
+        `packets` es un DataFrame o un dict columna -> array con las mismas
+        claves que los paquetes ('length', 'protocol', 'timestamp',
+        'packet_count'...). Devuelve una matriz float32 (n, len(NETWORK_FEATURES))
+        cuyas filas son iguales a los valores del camino por paquete
+        convertidos a float32. `out` permite reutilizar una matriz ya reservada.
+        """
+        if isinstance(packets, pd.DataFrame):
+            columns = {name: packets[name] for name in packets.columns}
+            n = len(packets)
+        else:
+            columns = dict(packets)
+            n = len(next(iter(columns.values()), ()))
+        if self.flow_state is not None:
+            columns.update(self.flow_state.update_batch(columns))
+        if out is None:
+            out = np.empty((n, len(NETWORK_FEATURES)), dtype=np.float32)
+        elif out.shape != (n, len(NETWORK_FEATURES)) or out.dtype != np.float32:
+            raise ValueError(f"out debe ser float32 de forma {(n, len(NETWORK_FEATURES))}")
+        
+        def column(name, default):
+            if name not in columns:
+                return None if default is None else np.full(n, default, dtype=np.float64)
+            return np.asarray(columns[name])
+        
+        length = column('length', 0)
+        out[:, 0] = length
+        out[:, 1] = self.encode_protocol_batch(column('protocol', None), n)
+        out[:, 2] = column('src_port', 0)
+        out[:, 3] = column('dst_port', 0)
+        
+        # Hora y día de la semana en hora local de pared, como datetime.hour/weekday()
+        if 'timestamp' in columns:
+            timestamps = self.wall_clock(columns['timestamp'])
+        else:
+            timestamps = np.full(n, np.datetime64(datetime.now(), 'us'))
+        days = timestamps.astype('datetime64[D]')
+        out[:, 4] = (timestamps - days).astype('timedelta64[h]').astype(np.int64)
+        # 1970-01-01 fue jueves (weekday() == 3)
+        out[:, 5] = (days.astype(np.int64) + 3) % 7
+        
+        window = np.maximum(column('time_window', 1), 1)
+        out[:, 6] = column('packet_count', 1) / window
+        byte_count = column('byte_count', None)
+        out[:, 7] = (length if byte_count is None else byte_count) / window
+        
+        # Valores del motor de flujos si los hay; si no, ventanas recientes (listas) o 0
+        for index, name, recent, calculate in ((8, 'port_entropy', 'recent_ports', self.port_entropy),
+                                               (9, 'size_variance', 'recent_sizes', self.size_variance)):
+            if name in columns:
+                out[:, index] = columns[name]
+            elif recent in columns:
+                out[:, index] = [calculate(values) for values in columns[recent]]
+            else:
+                out[:, index] = 0.0
+        
+        self.feature_names = list(NETWORK_FEATURES)
+        return out
+    
+    @staticmethod
+    def wall_clock(timestamps) -> np.ndarray:
+        """Columna de timestamps -> datetime64[us] en hora de pared
+        
+        Como datetime.hour/weekday() en el camino por paquete, cada valor con
+        zona horaria conserva su hora local y se descarta la zona (sin pasar
+        a UTC). Acepta datetime64, Series de pandas (con o sin zona) y listas
+        de datetime, Timestamp o cadenas, incluso con zonas distintas; los
+        valores ausentes (None/NaT) toman la hora actual, como un paquete sin
+        'timestamp'.
+        """
+        values = np.asarray(timestamps)
+        if np.issubdtype(values.dtype, np.datetime64):
+            converted = values.astype('datetime64[us]')
+        else:
+            series = timestamps if isinstance(timestamps, pd.Series) else pd.Series(list(timestamps), dtype=object)
+            try:
+                parsed = pd.to_datetime(series)
+            except (ValueError, TypeError):
+                # Zonas distintas en la misma columna: cada valor a su hora de pared
+                parsed = pd.to_datetime(series.map(
+                    lambda value: pd.Timestamp(value).tz_localize(None)
+                    if value is not None and not pd.isna(value) and pd.Timestamp(value).tzinfo is not None
+                    else value))
+            if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+                parsed = parsed.dt.tz_localize(None)
+            converted = parsed.to_numpy().astype('datetime64[us]')
+        missing = np.isnat(converted)
+        if missing.any():
+            converted = converted.copy()
+            converted[missing] = np.datetime64(datetime.now(), 'us')
+        return converted
+    
+    @staticmethod
+    def packets_to_columns(packets: List[dict]) -> Dict[str, list]:
+        """Lista de paquetes -> columnas, con los mismos valores por defecto que el camino por paquete"""
+        keys = set().union(*packets) if packets else set()
+        now = datetime.now()
+        columns = {}
+        for key in keys:
+            if key == 'byte_count':
+                columns[key] = [p.get('byte_count', p.get('length', 0)) for p in packets]
+            elif key == 'timestamp':
+                columns[key] = [p.get('timestamp', now) for p in packets]
+            else:
+                default = NETWORK_DEFAULTS.get(key)
+                columns[key] = [p.get(key, default) for p in packets]
+        return columns
+
     def extract_web_features(self, http_data: dict) -> dict:
         """Extrae características de tráfico HTTP/HTTPS"""
         features = {}
@@ -94,16 +232,57 @@ class ThreatFeatureEngineer:
         
         return feature_vector
     
+    def encode_protocol(self, protocol) -> int:
+        """Número de protocolo IANA (0 si es desconocido)"""
+        return PROTOCOL_CODES.get(str(protocol).upper(), 0)
+    
+    def encode_protocol_batch(self, protocols, n: int) -> np.ndarray:
+        """encode_protocol sobre una columna: se codifica cada valor distinto una sola vez"""
+        if protocols is None:
+            return np.full(n, self.encode_protocol('unknown'))
+        codes, uniques = pd.factorize(protocols)
+        # El código -1 (nulos) cae en la última posición: se trata como desconocido
+        lookup = np.array([self.encode_protocol(value) for value in uniques] + [self.encode_protocol('unknown')])
+        return lookup[codes]
+    
     def calculate_pps(self, packet_data: dict) -> float:
         """Calcula paquetes por segundo"""
         # Implementación simplificada
         return packet_data.get('packet_count', 1) / max(packet_data.get('time_window', 1), 1)
     
+    def calculate_bps(self, packet_data: dict) -> float:
+        """Calcula bytes por segundo (por defecto, el tamaño del propio paquete)"""
+        byte_count = packet_data.get('byte_count', packet_data.get('length', 0))
+        return byte_count / max(packet_data.get('time_window', 1), 1)
+    
+    def calculate_port_entropy(self, packet_data: dict) -> float:
+        """Entropía de los puertos destino del origen (FlowStateEngine o 'recent_ports')"""
+        if 'port_entropy' in packet_data:
+            return packet_data['port_entropy']
+        return self.port_entropy(packet_data.get('recent_ports'))
+    
+    def calculate_size_variance(self, packet_data: dict) -> float:
+        """Varianza de los tamaños del flujo (FlowStateEngine o 'recent_sizes')"""
+        if 'size_variance' in packet_data:
+            return packet_data['size_variance']
+        return self.size_variance(packet_data.get('recent_sizes'))
+    
+    @staticmethod
+    def port_entropy(ports) -> float:
+        """Entropía de Shannon (bits) de una lista de puertos"""
+        if ports is None or len(ports) == 0:
+            return 0.0
+        counts = np.fromiter(Counter(ports).values(), dtype=np.float64)
+        probabilities = counts / counts.sum()
+        return float(-(probabilities * np.log2(probabilities)).sum())
+    
+    @staticmethod
+    def size_variance(sizes) -> float:
+        """Varianza poblacional de una lista de tamaños"""
+        if sizes is None or len(sizes) < 2:
+            return 0.0
+        return float(np.var(np.asarray(sizes, dtype=np.float64)))
+    
     def detect_suspicious_headers(self, headers: dict) -> int:
         """Detecta headers HTTP sospechosos"""
-        suspicious_patterns = [
-            'x-forwarded-for', 'x-real-ip', 'x-powered-by', 
-            'server', 'x-aspnet-version'
-        ]
-        return sum(1 for header in headers.keys() 
-                  if any(pattern in header.lower() for pattern in suspicious_patterns))
\ No newline at end of file
+        return sum(1 for header in headers.keys() if SUSPICIOUS_HEADERS.contains_any(header))
\ No newline at end of file
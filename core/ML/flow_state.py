@@ -0,0 +1,259 @@
+import math
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, Tuple, Mapping
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+
+FlowKey = Tuple[str, str, int, int, str]
+
+
+def packet_time(timestamp) -> float:
+    """Segundos de un timestamp (datetime, datetime64 o número)
+
+    Los datetime sin zona se interpretan como hora de pared (igual que
+    datetime64), así que paquetes sueltos y columnas dan la misma escala.
+    """
+    if timestamp is None:
+        timestamp = datetime.now()
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is not None:
+            return timestamp.timestamp()
+        return (timestamp - EPOCH).total_seconds()
+    if isinstance(timestamp, np.datetime64):
+        return timestamp.astype('datetime64[us]').astype(np.int64) / 1e6
+    return float(timestamp)
+
+
+class FlowState:
+    """Estado de un flujo: ventana deslizante por buckets y tamaño (Welford)"""
+
+    __slots__ = ('packets', 'bytes', 'head', 'head_slot', 'window_packets', 'window_bytes',
+                 'first_seen', 'last_seen', 'count', 'mean', 'm2')
+
+    def __init__(self, buckets: int, slot: int, now: float):
+        self.packets = [0] * buckets
+        self.bytes = [0] * buckets
+        self.head = 0
+        self.head_slot = slot
+        self.window_packets = 0
+        self.window_bytes = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def advance(self, slot: int):
+        """Mueve la ventana hasta `slot` vaciando los buckets caducados (como mucho uno por bucket)"""
+        steps = slot - self.head_slot
+        if steps >= len(self.packets):
+            # Inactivo más de una ventana: todo ha caducado
+            self.packets = [0] * len(self.packets)
+            self.bytes = [0] * len(self.bytes)
+            self.window_packets = 0
+            self.window_bytes = 0
+            steps = 0
+        for _ in range(max(steps, 0)):
+            self.head = (self.head + 1) % len(self.packets)
+            self.window_packets -= self.packets[self.head]
+            self.window_bytes -= self.bytes[self.head]
+            self.packets[self.head] = 0
+            self.bytes[self.head] = 0
+        self.head_slot = max(self.head_slot, slot)
+
+    def add(self, size: int):
+        self.packets[self.head] += 1
+        self.bytes[self.head] += size
+        self.window_packets += 1
+        self.window_bytes += size
+        # Welford: media y suma de cuadrados incrementales
+        self.count += 1
+        delta = size - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (size - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+
+class PortHistogram:
+    """Histograma de puertos destino de los últimos N paquetes de un origen
+
+    Mantiene S = sum(c * log2(c)) para obtener la entropía como
+    log2(N) - S / N sin recorrer el histograma.
+    """
+
+    __slots__ = ('recent', 'counts', 'weighted', 'updates', 'last_seen')
+
+    def __init__(self, size: int, now: float):
+        self.recent = deque(maxlen=size)
+        self.counts: Dict[int, int] = {}
+        self.weighted = 0.0
+        self.updates = 0
+        self.last_seen = now
+
+    @staticmethod
+    def term(count: int) -> float:
+        return count * math.log2(count) if count > 1 else 0.0
+
+    def change(self, port: int, delta: int):
+        count = self.counts.get(port, 0)
+        self.weighted += self.term(count + delta) - self.term(count)
+        if count + delta:
+            self.counts[port] = count + delta
+        else:
+            del self.counts[port]
+
+    def add(self, port: int):
+        if len(self.recent) == self.recent.maxlen:
+            self.change(self.recent[0], -1)
+        self.recent.append(port)
+        self.change(port, 1)
+        self.updates += 1
+        # Recalcular de vez en cuando para que no se acumule error de redondeo
+        if self.updates % (self.recent.maxlen * 8) == 0:
+            self.weighted = sum(self.term(count) for count in self.counts.values())
+
+    @property
+    def entropy(self) -> float:
+        total = len(self.recent)
+        if total < 2:
+            return 0.0
+        return max(math.log2(total) - self.weighted / total, 0.0)
+
+
+class FlowStateEngine:
+    """Estadísticas por flujo (5-tupla) actualizadas en O(1) por paquete
+
+    Cada flujo mantiene contadores de paquetes y bytes en una ventana
+    deslizante de `window` segundos dividida en `buckets`, y la varianza
+    del tamaño con Welford. La entropía de puertos se calcula por host de
+    origen (dentro de una 5-tupla el puerto destino es fijo) sobre sus
+    últimos `port_window` paquetes. Los flujos y orígenes inactivos más de
+    `idle_timeout` se expulsan, y si se supera `max_flows`/`max_sources`
+    se expulsan los menos recientes.
+
+    update() devuelve las claves que ya entiende ThreatFeatureEngineer:
+    packet_count, byte_count y time_window (pps/bps), port_entropy y
+    size_variance.
+    """
+
+    def __init__(self, window: float = 10.0, buckets: int = 10, port_window: int = 128,
+                 max_flows: int = 100000, max_sources: int = 50000, idle_timeout: float = 120.0):
+        self.window = window
+        self.buckets = max(1, buckets)
+        self.bucket_width = window / self.buckets
+        self.port_window = port_window
+        self.max_flows = max_flows
+        self.max_sources = max_sources
+        self.idle_timeout = idle_timeout
+        self.flows: 'OrderedDict[FlowKey, FlowState]' = OrderedDict()
+        self.sources: 'OrderedDict[str, PortHistogram]' = OrderedDict()
+        self.now = float('-inf')
+        self.stats = {'packets': 0, 'flows_created': 0, 'evicted_idle': 0, 'evicted_budget': 0}
+
+    def __len__(self) -> int:
+        return len(self.flows)
+
+    def config(self) -> Dict[str, Any]:
+        """Modo y parámetros que fijan la distribución de las características de flujo
+
+        Se guarda en el manifest del modelo: un modelo solo es válido con
+        características calculadas por un motor con la misma configuración.
+        """
+        return {'mode': 'flow_state', 'window': self.window, 'buckets': self.buckets,
+                'port_window': self.port_window}
+
+    @staticmethod
+    def flow_key(packet: Mapping[str, Any]) -> FlowKey:
+        return (str(packet.get('src_ip', '')), str(packet.get('dst_ip', '')), int(packet.get('src_port', 0)),
+                int(packet.get('dst_port', 0)), str(packet.get('protocol', 'unknown')).upper())
+
+    def update(self, packet: Mapping[str, Any]) -> Dict[str, float]:
+        """Registra un paquete y devuelve las características de su flujo"""
+        key = self.flow_key(packet)
+        return self.observe(key, int(packet.get('length', 0)), packet_time(packet.get('timestamp')))
+
+    def annotate(self, packet: Mapping[str, Any]) -> Dict[str, Any]:
+        """El paquete con las características de su flujo añadidas"""
+        return {**packet, **self.update(packet)}
+
+    def observe(self, key: FlowKey, size: int, now: float) -> Dict[str, float]:
+        # Relojes que retroceden (paquetes desordenados) cuentan en el bucket actual
+        now = max(now, self.now)
+        self.now = now
+        slot = int(now // self.bucket_width)
+        self.stats['packets'] += 1
+
+        flow = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = FlowState(self.buckets, slot, now)
+            self.stats['flows_created'] += 1
+        else:
+            self.flows.move_to_end(key)
+            flow.advance(slot)
+        flow.add(size)
+        flow.last_seen = now
+
+        source = self.sources.get(key[0])
+        if source is None:
+            source = self.sources[key[0]] = PortHistogram(self.port_window, now)
+        else:
+            self.sources.move_to_end(key[0])
+        source.add(key[3])
+        source.last_seen = now
+
+        self.evict(now)
+        return {
+            'packet_count': flow.window_packets,
+            'byte_count': flow.window_bytes,
+            'time_window': min(self.window, now - flow.first_seen + self.bucket_width),
+            'port_entropy': source.entropy,
+            'size_variance': flow.variance
+        }
+
+    def evict(self, now: float):
+        """Expulsa por el extremo LRU: inactivos primero y, si no basta, por presupuesto"""
+        for table, limit in ((self.flows, self.max_flows), (self.sources, self.max_sources)):
+            while table:
+                oldest = next(iter(table.values()))
+                if now - oldest.last_seen > self.idle_timeout:
+                    self.stats['evicted_idle'] += 1
+                elif len(table) > limit:
+                    self.stats['evicted_budget'] += 1
+                else:
+                    break
+                table.popitem(last=False)
+
+    def update_batch(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """update() fila a fila sobre datos en columnas; devuelve una columna por característica"""
+        n = len(next(iter(columns.values()), ()))
+
+        def column(name, default):
+            if name not in columns:
+                return [default] * n
+            values = columns[name]
+            return values.tolist() if hasattr(values, 'tolist') else values
+
+        if 'timestamp' in columns:
+            timestamps = np.asarray(columns['timestamp'])
+            if np.issubdtype(timestamps.dtype, np.datetime64):
+                times = timestamps.astype('datetime64[us]').astype(np.int64) / 1e6
+            else:
+                times = [packet_time(value) for value in timestamps]
+        else:
+            times = [packet_time(None)] * n
+
+        result = {name: np.empty(n, dtype=np.float64)
+                  for name in ('packet_count', 'byte_count', 'time_window', 'port_entropy', 'size_variance')}
+        rows = zip(column('src_ip', ''), column('dst_ip', ''), column('src_port', 0), column('dst_port', 0),
+                   column('protocol', 'unknown'), column('length', 0), times)
+        for index, (src_ip, dst_ip, src_port, dst_port, protocol, length, now) in enumerate(rows):
+            key = (str(src_ip), str(dst_ip), int(src_port), int(dst_port), str(protocol).upper())
+            for name, value in self.observe(key, int(length), float(now)).items():
+                result[name][index] = value
+        return result
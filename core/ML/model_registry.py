@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Sequence
+
+import joblib
+
+from ml.tree_scorer import flatten_model
+
+MANIFEST = 'manifest.json'
+MODEL_FILE = 'model.joblib'
+SCORER_FILE = 'scorer.joblib'
+LATEST = 'LATEST'
+
+
+def _jsonable(value):
+    """Escalares de NumPy y similares para json.dump"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class LoadedModel:
+    """Una versión cargada del registro
+
+    `predictor` es el scorer aplanado si existe (sus arrays quedan
+    mapeados en memoria y se comparten entre procesos) o, si no, el
+    modelo original. El modelo original solo se carga al pedirlo, porque
+    sklearn copia los nodos de sus árboles a memoria propia del proceso.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any], mmap: bool = True):
+        self.path = path
+        self.manifest = manifest
+        self.mmap_mode = 'r' if mmap else None
+        self.lock = threading.Lock()
+        self._model = None
+        self.scorer = None
+        if manifest['files'].get('scorer'):
+            self.scorer = joblib.load(os.path.join(path, manifest['files']['scorer']), mmap_mode=self.mmap_mode)
+
+    @property
+    def name(self) -> str:
+        return self.manifest['name']
+
+    @property
+    def version(self) -> int:
+        return self.manifest['version']
+
+    @property
+    def schema(self) -> List[str]:
+        return self.manifest['schema']
+
+    @property
+    def model(self):
+        with self.lock:
+            if self._model is None:
+                self._model = joblib.load(os.path.join(self.path, self.manifest['files']['model']),
+                                          mmap_mode=self.mmap_mode)
+            return self._model
+
+    @property
+    def predictor(self):
+        return self.scorer if self.scorer is not None else self.model
+
+    def __repr__(self) -> str:
+        return f"LoadedModel({self.name!r}, v{self.version}, {self.manifest['model_class']})"
+
+
+class ModelRegistry:
+    """Registro versionado de modelos en disco
+
+    Cada versión es un directorio inmutable `<root>/<nombre>/<versión>/`
+    con el modelo (joblib sin comprimir, para poder mapearlo en memoria),
+    su scorer aplanado cuando el modelo es un ensemble de árboles y un
+    manifest.json con el esquema de características, las métricas y los
+    metadatos. Las versiones se publican con un rename atómico y el
+    fichero LATEST apunta a la versión activa, así que varios procesos
+    pueden registrar y cargar a la vez sin ver versiones a medias.
+    """
+
+    def __init__(self, root: str = 'models/registry', mmap: bool = True):
+        self.root = root
+        self.mmap = mmap
+        self.lock = threading.Lock()
+        # Versiones ya cargadas en este proceso: los detectores del proceso comparten la misma
+        self.loaded: Dict[tuple, LoadedModel] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def model_dir(self, name: str) -> str:
+        if not name or os.sep in name or name.startswith('.'):
+            raise ValueError(f"Nombre de modelo no válido: {name!r}")
+        return os.path.join(self.root, name)
+
+    def versions(self, name: str) -> List[int]:
+        directory = self.model_dir(name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(entry) for entry in os.listdir(directory) if entry.isdigit())
+
+    def latest_version(self, name: str) -> int:
+        """Versión activa (LATEST) o, si no hay puntero, la más alta; None si no hay ninguna"""
+        try:
+            with open(os.path.join(self.model_dir(name), LATEST), 'r') as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            versions = self.versions(name)
+            return versions[-1] if versions else None
+
+    def manifest(self, name: str, version: int = None) -> Dict[str, Any]:
+        version = self.latest_version(name) if version is None else version
+        if version is None:
+            raise FileNotFoundError(f"No hay versiones registradas de {name}")
+        with open(os.path.join(self.model_dir(name), str(version), MANIFEST), 'r') as f:
+            return json.load(f)
+
+    def register(self, name: str, model, schema: Sequence[str], metrics: Dict[str, Any] = None,
+                 metadata: Dict[str, Any] = None, promote: bool = True,
+                 flow_features: Dict[str, Any] = None) -> int:
+        """Guarda una nueva versión del modelo y devuelve su número
+
+        `flow_features` es la configuración del motor de flujos con el que
+        se calcularon las características (FlowStateEngine.config()), o
+        None si se entrenó sin él.
+        """
+        directory = self.model_dir(name)
+        os.makedirs(directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=directory)
+        try:
+            files = {'model': MODEL_FILE, 'scorer': None}
+            joblib.dump(model, os.path.join(staging, MODEL_FILE))
+            try:
+                scorer = flatten_model(model)
+            except (TypeError, AttributeError):
+                # Modelos que no son ensembles de árboles (IsolationForest, SVM...): solo el original
+                scorer = None
+            if scorer is not None:
+                joblib.dump(scorer, os.path.join(staging, SCORER_FILE))
+                files['scorer'] = SCORER_FILE
+
+            manifest = {
+                'name': name,
+                'created': datetime.now().isoformat(),
+                'model_class': type(model).__name__,
+                'schema': list(schema),
+                'flow_features': flow_features,
+                'metrics': metrics or {},
+                'metadata': metadata or {},
+                'files': files
+            }
+            # El rename del directorio publica la versión entera o nada; si otro proceso
+            # se adelantó con el mismo número, se prueba con el siguiente
+            while True:
+                version = (self.versions(name) or [0])[-1] + 1
+                manifest['version'] = version
+                with open(os.path.join(staging, MANIFEST), 'w') as f:
+                    json.dump(manifest, f, indent=2, default=_jsonable)
+                try:
+                    os.rename(staging, os.path.join(directory, str(version)))
+                    break
+                except OSError:
+                    if not os.path.isdir(os.path.join(directory, str(version))):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if promote:
+            self.promote(name, version)
+        print(f"[+] Modelo {name} v{version} registrado ({manifest['model_class']})")
+        return version
+
+    def promote(self, name: str, version: int):
+        """Apunta LATEST a `version` (también sirve para volver a una versión anterior)"""
+        if version not in self.versions(name):
+            raise FileNotFoundError(f"No existe la versión {version} de {name}")
+        pointer = os.path.join(self.model_dir(name), LATEST)
+        tmp_path = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, pointer)
+
+    def load(self, name: str, version: int = None, schema: Sequence[str] = None,
+             flow_features: Dict[str, Any] = None) -> LoadedModel:
+        """Carga una versión (por defecto la activa) mapeada en memoria
+
+        Con `schema` se comprueba que el modelo se entrenó con las mismas
+        características, en el mismo orden, que las que se le van a pasar,
+        y con `flow_features` que las de flujo salen del mismo motor.
+        """
+        version = self.latest_version(name) if version is None else version
+        if version is None:
+            raise FileNotFoundError(f"No hay versiones registradas de {name}")
+        key = (name, version)
+        with self.lock:
+            loaded = self.loaded.get(key)
+            if loaded is None:
+                manifest = self.manifest(name, version)
+                loaded = self.loaded[key] = LoadedModel(
+                    os.path.join(self.model_dir(name), str(version)), manifest, self.mmap
+                )
+        if schema is not None and list(schema) != loaded.schema:
+            raise ValueError(f"El esquema de {name} v{version} no coincide: "
+                             f"{loaded.schema} != {list(schema)}")
+        if flow_features is not None and loaded.manifest.get('flow_features') != flow_features:
+            raise ValueError(f"Las características de flujo de {name} v{version} no coinciden "
+                             f"(hay que reentrenar): {loaded.manifest.get('flow_features')} != {flow_features}")
+        return loaded
+
+    def release(self, name: str, version: int):
+        """Olvida una versión cargada (los mapas se liberan cuando nadie la usa)"""
+        with self.lock:
+            self.loaded.pop((name, version), None)
@@ -11,6 +11,7 @@ import xgboost as xgb
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
+from ml.tree_scorer import FlatTreeEnsemble, flatten_model, check_parity
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -120,10 +121,10 @@ class ThreatModelTrainer:
         from sklearn.ensemble import VotingClassifier
         
         rf = RandomForestClassifier(n_estimators=50, random_state=42)
-        xgb = xgb.XGBClassifier(random_state=42)
+        xgb_model = xgb.XGBClassifier(random_state=42)
         
         ensemble = VotingClassifier(
-            estimators=[('rf', rf), ('xgb', xgb)],
+            estimators=[('rf', rf), ('xgb', xgb_model)],
             voting='soft',
             n_jobs=-1
         )
@@ -184,4 +185,24 @@ class ThreatModelTrainer:
             self.best_model = best_model[0]
             print(f"[+] Mejor modelo: {best_model[0]} (AUC: {best_model[1]['roc_auc']:.4f})")
         
-        return comparison
\ No newline at end of file
+        return comparison
+    
+    def export_scorer(self, name: str = None, X_check=None) -> FlatTreeEnsemble:
+        """Aplana un modelo entrenado (por defecto el mejor) para el scorer vectorizado
+        
+        Si se pasa `X_check`, comprueba que el scorer da las mismas
+        probabilidades que el modelo antes de devolverlo.
+        """
+        name = name or self.best_model
+        if name not in self.models:
+            raise ValueError(f"Modelo no entrenado: {name}")
+        model = self.models[name]['model']
+        scorer = flatten_model(model)
+        scorer.metadata['model_name'] = name
+        if X_check is not None:
+            parity = check_parity(model, scorer, X_check)
+            if not parity['ok']:
+                raise ValueError(f"El scorer de {name} no coincide con el modelo: {parity}")
+            scorer.metadata['parity'] = parity
+        print(f"[+] Scorer de {name}: {scorer.n_trees} árboles, {scorer.n_nodes} nodos")
+        return scorer
@@ -0,0 +1,346 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+
+# Elementos (filas x árboles) por bloque: los temporales del recorrido caben en caché
+BLOCK_ELEMENTS = 1 << 15
+# Cada cuántos pasos se descartan los pares (fila, árbol) que ya llegaron a una hoja
+COMPACT_EVERY = 4
+
+_pool = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    """Pool compartido para repartir bloques de filas (NumPy libera el GIL)"""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='nova-trees')
+    return _pool
+
+
+@dataclass
+class TreeComponent:
+    """Grupo de árboles que se combina igual: media de probabilidades (RF) o suma de márgenes (XGBoost)"""
+    kind: str
+    start: int
+    stop: int
+    weight: float = 1.0
+    base_margin: float = 0.0
+
+
+@dataclass
+class FlatTreeEnsemble:
+    """Ensemble de árboles aplanado en arrays contiguos de nodos
+
+    Todos los árboles comparten los arrays feature, threshold, children,
+    missing_left y value (una fila por nodo). Los dos hijos de un nodo
+    están contiguos (derecho = izquierdo + 1) y las hojas apuntan a sí
+    mismas con umbral +inf, así que cada paso del recorrido es
+    `nodo = children[nodo] + (x > threshold[nodo])` para todos los
+    árboles y todas las filas del bloque a la vez, sin ramas por nodo
+    (los pares que ya están en una hoja se van retirando).
+
+    Los umbrales se guardan en float32 de forma que `x > t` equivale a la
+    regla original con x en float32: `x <= t64` en sklearn y `x < t` en
+    XGBoost.
+    """
+    feature: np.ndarray
+    threshold: np.ndarray
+    children: np.ndarray
+    missing_left: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    components: List[TreeComponent]
+    classes: np.ndarray
+    n_features: int
+    max_depth: int
+    source: str = ''
+    n_jobs: int = -1
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def validate(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Se esperaban {self.n_features} características, hay {X.shape[1]}")
+        return X
+
+    def run_blocks(self, function, X: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Aplica `function(X[bloque], out[bloque])` por bloques de filas, en paralelo si hay varios"""
+        size = max(1, BLOCK_ELEMENTS // self.n_trees)
+        blocks = [slice(start, min(start + size, len(X))) for start in range(0, len(X), size)]
+        if len(blocks) > 1 and self.n_jobs != 1:
+            list(_executor().map(lambda block: function(X[block], out[block]), blocks))
+        else:
+            for block in blocks:
+                function(X[block], out[block])
+        return out
+
+    def apply_block(self, X: np.ndarray, out: np.ndarray):
+        """Recorre los pares (fila, árbol) del bloque; cada COMPACT_EVERY pasos se apartan los que ya están en hoja"""
+        flat = X.ravel()
+        has_missing = bool(np.isnan(flat).any())
+        result = out.reshape(-1)
+        position = np.arange(result.size, dtype=np.int32)
+        node = np.tile(self.roots, len(X))
+        offsets = np.repeat(np.arange(len(X), dtype=np.int32) * self.n_features, self.n_trees)
+
+        for step in range(1, self.max_depth + 1):
+            values = flat.take(offsets + self.feature.take(node))
+            go_right = values > self.threshold.take(node)
+            if has_missing:
+                go_right = np.where(np.isnan(values), ~self.missing_left.take(node), go_right)
+            following = self.children.take(node) + go_right
+            if step % COMPACT_EVERY == 0:
+                active = following != node
+                if not active.all():
+                    finished = ~active
+                    result[position[finished]] = following[finished]
+                    position, following, offsets = position[active], following[active], offsets[active]
+                    if not len(position):
+                        return
+            node = following
+        result[position] = node
+
+    def apply(self, X) -> np.ndarray:
+        """Nodo hoja de cada fila en cada árbol: matriz (n, n_trees) de índices globales"""
+        X = self.validate(X)
+        return self.run_blocks(self.apply_block, X, np.empty((len(X), self.n_trees), dtype=np.int32))
+
+    def proba_block(self, X: np.ndarray, out: np.ndarray):
+        leaves = np.empty((len(X), self.n_trees), dtype=np.int32)
+        self.apply_block(X, leaves)
+        out[...] = 0.0
+        total_weight = 0.0
+        for component in self.components:
+            scores = self.value[leaves[:, component.start:component.stop]].sum(axis=1)
+            if component.kind == 'mean':
+                part = scores / (component.stop - component.start)
+            else:
+                positive = 1.0 / (1.0 + np.exp(-(component.base_margin + scores[:, 1])))
+                part = np.column_stack([1.0 - positive, positive])
+            out += component.weight * part
+            total_weight += component.weight
+        out /= total_weight
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self.validate(X)
+        return self.run_blocks(self.proba_block, X, np.empty((len(X), len(self.classes))))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _float32_below(threshold: np.ndarray) -> np.ndarray:
+    """Mayor float32 <= threshold: para x float32, x <= t64 sii x <= resultado"""
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _pack_tree(feature, threshold, left, right, missing_left, value) -> Dict[str, Any]:
+    """Renumera un árbol en anchura con los hijos contiguos y las hojas apuntando a sí mismas
+
+    `threshold` ya debe estar en float32 con la semántica "a la derecha si x > t".
+    """
+    order, children, depths = [0], [0], [0]
+    position = 0
+    while position < len(order):
+        node = order[position]
+        if left[node] == -1:
+            children[position] = position
+        else:
+            children[position] = len(order)
+            order.extend((left[node], right[node]))
+            children.extend((0, 0))
+            depths.extend((depths[position] + 1,) * 2)
+        position += 1
+    order = np.asarray(order)
+    leaf = left[order] == -1
+    return {
+        'feature': np.where(leaf, 0, feature[order]),
+        'threshold': np.where(leaf, np.float32(np.inf), threshold[order]).astype(np.float32),
+        'children': np.asarray(children),
+        'missing_left': np.where(leaf, True, missing_left[order]),
+        'value': value[order],
+        'depth': max(depths)
+    }
+
+
+def _sklearn_trees(estimators) -> List[Dict[str, Any]]:
+    """Árboles de un bosque de sklearn (RandomForest, ExtraTrees)"""
+    trees = []
+    for estimator in estimators:
+        tree = getattr(estimator, 'tree_', None)
+        if tree is None or tree.n_outputs != 1:
+            raise TypeError(f"Árbol no soportado: {type(estimator).__name__}")
+        value = tree.value[:, 0, :].astype(np.float64)
+        missing = getattr(tree, 'missing_go_to_left', None)
+        trees.append(_pack_tree(
+            tree.feature, _float32_below(tree.threshold), tree.children_left, tree.children_right,
+            np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool),
+            value / value.sum(axis=1, keepdims=True)
+        ))
+    return trees
+
+
+def _xgboost_trees(model) -> (List[Dict[str, Any]], float):
+    """Árboles de un XGBClassifier binario (modelo JSON del booster) y su margen base"""
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise TypeError(f"Objetivo de XGBoost no soportado: {objective}")
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster.get('name') != 'gbtree':
+        raise TypeError(f"Booster no soportado: {gradient_booster.get('name')}")
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    base_margin = math.log(base_score / (1.0 - base_score))
+
+    model_trees = gradient_booster['model']['trees']
+    # predict_proba usa solo hasta best_iteration si hubo early stopping
+    try:
+        parallel = int(gradient_booster['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+        model_trees = model_trees[:(model.best_iteration + 1) * parallel]
+    except AttributeError:
+        pass
+
+    trees = []
+    for tree in model_trees:
+        if any(int(kind) != 0 for kind in tree.get('split_type', [])):
+            raise TypeError("Divisiones categóricas de XGBoost no soportadas")
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # En las hojas split_conditions guarda el valor de la hoja
+        value = np.zeros((len(left), 2))
+        value[:, 1] = np.where(left == -1, conditions, 0.0)
+        # x < t (float32)  <=>  no (x > float32 anterior a t)
+        trees.append(_pack_tree(
+            np.asarray(tree['split_indices'], dtype=np.int64),
+            np.nextafter(conditions, np.float32(-np.inf)),
+            left, np.asarray(tree['right_children'], dtype=np.int64),
+            np.asarray(tree['default_left'], dtype=bool), value
+        ))
+    return trees, base_margin
+
+
+def _components(model, weight: float = 1.0) -> List[Dict[str, Any]]:
+    name = type(model).__name__
+    if name == 'VotingClassifier':
+        if model.voting != 'soft':
+            raise TypeError("Solo se soporta VotingClassifier con voting='soft'")
+        weights = model.weights if model.weights is not None else [1.0] * len(model.estimators)
+        # Los estimadores 'drop' no están en estimators_ ni cuentan en la media
+        weights = [w for (_, estimator), w in zip(model.estimators, weights) if estimator != 'drop']
+        return [part for estimator, w in zip(model.estimators_, weights)
+                for part in _components(estimator, weight * w)]
+    if name == 'XGBClassifier':
+        trees, base_margin = _xgboost_trees(model)
+        return [{'kind': 'logistic', 'trees': trees, 'weight': weight, 'base_margin': base_margin}]
+    if hasattr(model, 'estimators_') and hasattr(model, 'predict_proba'):
+        return [{'kind': 'mean', 'trees': _sklearn_trees(model.estimators_), 'weight': weight}]
+    if hasattr(model, 'tree_'):
+        return [{'kind': 'mean', 'trees': _sklearn_trees([model]), 'weight': weight}]
+    raise TypeError(f"Modelo no soportado: {name}")
+
+
+def flatten_model(model) -> FlatTreeEnsemble:
+    """Aplana un RandomForest/ExtraTrees, XGBClassifier o VotingClassifier (soft) entrenado"""
+    parts = _components(model)
+    n_classes = len(model.classes_)
+    if any(part['kind'] == 'logistic' for part in parts) and n_classes != 2:
+        raise TypeError("XGBoost solo se soporta en clasificación binaria")
+
+    arrays = {key: [] for key in ('feature', 'threshold', 'children', 'missing_left', 'value')}
+    roots, components = [], []
+    offset, tree_count, max_depth = 0, 0, 0
+    for part in parts:
+        start = tree_count
+        for tree in part['trees']:
+            roots.append(offset)
+            for key in ('feature', 'threshold', 'missing_left', 'value'):
+                arrays[key].append(tree[key])
+            arrays['children'].append(tree['children'] + offset)
+            offset += len(tree['feature'])
+            max_depth = max(max_depth, tree['depth'])
+            tree_count += 1
+        components.append(TreeComponent(part['kind'], start, tree_count, float(part['weight']),
+                                        float(part.get('base_margin', 0.0))))
+
+    value = np.concatenate(arrays['value'])
+    if value.shape[1] != n_classes:
+        raise TypeError(f"Los árboles tienen {value.shape[1]} clases y el modelo {n_classes}")
+    if offset >= 2 ** 31:
+        raise ValueError("Demasiados nodos para índices de 32 bits")
+    return FlatTreeEnsemble(
+        feature=np.concatenate(arrays['feature']).astype(np.int32),
+        threshold=np.concatenate(arrays['threshold']).astype(np.float32),
+        children=np.concatenate(arrays['children']).astype(np.int32),
+        missing_left=np.concatenate(arrays['missing_left']).astype(bool),
+        value=value,
+        roots=np.asarray(roots, dtype=np.int32),
+        components=components,
+        classes=np.asarray(model.classes_),
+        n_features=int(model.n_features_in_),
+        max_depth=max_depth,
+        source=type(model).__name__
+    )
+
+
+def check_parity(model, scorer: FlatTreeEnsemble, X, atol: float = 1e-5) -> Dict[str, Any]:
+    """Compara el scorer con el predict_proba original sobre X
+
+    XGBoost acumula los márgenes en float32, de ahí la tolerancia por defecto.
+    """
+    expected = model.predict_proba(X)
+    actual = scorer.predict_proba(X)
+    difference = float(np.abs(expected - actual).max()) if len(expected) else 0.0
+    return {
+        'rows': len(expected),
+        'max_abs_diff': difference,
+        'label_agreement': float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1))),
+        'ok': difference <= atol
+    }
+
+
+def benchmark_latency(model, scorer: FlatTreeEnsemble, X,
+                      batch_sizes: Sequence[int] = (1, 10, 100, 1000, 10000),
+                      repeats: int = 20) -> List[Dict[str, Any]]:
+    """Latencia mediana (ms) del modelo original y del scorer por tamaño de lote"""
+    results = []
+    for batch_size in batch_sizes:
+        batch = np.resize(X, (batch_size, X.shape[1])).astype(np.float32)
+        rounds = max(3, min(repeats, int(repeats * 100 / batch_size) or 3))
+        timings = {}
+        for name, predict in (('model', model.predict_proba), ('scorer', scorer.predict_proba)):
+            predict(batch)
+            samples = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                predict(batch)
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = float(np.median(samples))
+        results.append({
+            'batch_size': batch_size,
+            'model_ms': timings['model'],
+            'scorer_ms': timings['scorer'],
+            'speedup': timings['model'] / timings['scorer'] if timings['scorer'] else float('inf'),
+            'scorer_rows_per_sec': batch_size / (timings['scorer'] / 1000) if timings['scorer'] else float('inf')
+        })
+    return results
@@ -1,9 +1,30 @@
+import hashlib
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Callable, Optional
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+
+# Clave de resultados del WebScanner -> (tipo, severidad, descripción, CVSS)
+WEB_FINDING_RULES = {
+    'xss_vulnerabilities': ('XSS', 'high', 'Cross-Site Scripting vulnerability detected', 7.5),
+    'sql_injection_vulnerabilities': ('SQL Injection', 'critical', 'SQL Injection vulnerability detected', 9.0)
+}
 
 class ResultAnalyzer:
-    def __init__(self):
+    """Agrega hallazgos de forma incremental y sin duplicados
+
+    Cada hallazgo se identifica por una huella estable (tipo + URL sin query
+    + parámetro + hash de la evidencia). Los contadores por severidad y el
+    score de riesgo se actualizan en O(1) por hallazgo, así que snapshot()
+    puede llamarse en cualquier momento sin recorrer los resultados.
+
+    Con keep_findings=False solo se conservan las huellas: cada hallazgo
+    nuevo se entrega a on_finding (p. ej. un almacén en disco) y no se
+    acumula en memoria.
+    """
+
+    def __init__(self, keep_findings: bool = True,
+                 on_finding: Optional[Callable[[Dict[str, Any]], Any]] = None):
         self.severity_levels = {
             'critical': 5,
             'high': 4,
@@ -11,57 +32,114 @@ class ResultAnalyzer:
             'low': 2,
             'info': 1
         }
-    
+        self.keep_findings = keep_findings
+        self.on_finding = on_finding
+        self.findings: Dict[str, Dict[str, Any]] = {}
+        self.fingerprints = set()
+        self.severity_counts = {level: 0 for level in self.severity_levels}
+        self.total_cvss = 0.0
+        self.max_cvss = 0.0
+        self.raw_findings = 0
+        self.updated_at = None
+
+    @staticmethod
+    def fingerprint(finding: Dict[str, Any]) -> str:
+        """Huella estable de un hallazgo: tipo + URL + parámetro + hash de la evidencia"""
+        evidence = finding.get('evidence', {})
+        if not isinstance(evidence, dict):
+            evidence = {'value': evidence}
+        parts = urlsplit(str(evidence.get('url', '')))
+        url = urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+        detail = {k: v for k, v in evidence.items() if k != 'url'}
+        evidence_hash = hashlib.sha1(json.dumps(detail, sort_keys=True, default=str).encode()).hexdigest()
+        key = '|'.join([finding.get('type', ''), url, str(evidence.get('parameter', '')), evidence_hash])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def add_finding(self, finding: Dict[str, Any]) -> bool:
+        """Incorpora un hallazgo; False si era un duplicado"""
+        self.raw_findings += 1
+        fingerprint = self.fingerprint(finding)
+        if fingerprint in self.fingerprints:
+            return False
+
+        finding = {**finding, 'fingerprint': fingerprint}
+        self.fingerprints.add(fingerprint)
+        if self.keep_findings:
+            self.findings[fingerprint] = finding
+        if self.on_finding is not None:
+            self.on_finding(finding)
+        severity = finding.get('severity', 'info')
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+        cvss = finding.get('cvss_score', 0)
+        self.total_cvss += cvss
+        self.max_cvss = max(self.max_cvss, cvss)
+        self.updated_at = datetime.now()
+        return True
+
+    def add_findings(self, findings: Iterable[Dict[str, Any]]) -> int:
+        """Incorpora varios hallazgos; devuelve cuántos eran nuevos"""
+        return sum(self.add_finding(finding) for finding in findings)
+
+    def add_web_results(self, web_results: Dict[str, Any], module: str = None) -> int:
+        findings = self.analyze_web_vulnerabilities(web_results)
+        if module is not None:
+            findings = ({**finding, 'module': module} for finding in findings)
+        return self.add_findings(findings)
+
+    @property
+    def risk_score(self) -> float:
+        """Media del CVSS de los hallazgos únicos (los duplicados no cuentan)"""
+        if not self.fingerprints:
+            return 0.0
+        return min(self.total_cvss / len(self.fingerprints), 10.0)
+
+    def generate_summary(self) -> Dict[str, Any]:
+        return {
+            'total': len(self.fingerprints),
+            'raw_findings': self.raw_findings,
+            'duplicates': self.raw_findings - len(self.fingerprints),
+            'by_severity': dict(self.severity_counts),
+            'max_cvss': self.max_cvss,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual del análisis (mismo formato que analyze_vulnerabilities)"""
+        return {
+            'vulnerabilities': list(self.findings.values()),
+            'summary': self.generate_summary(),
+            'risk_score': self.risk_score
+        }
+
     def analyze_vulnerabilities(self, scan_results: Dict[str, Any]) -> Dict[str, Any]:
         """Analiza y clasifica vulnerabilidades"""
-        vulnerabilities = []
-        
         # Análisis de vulnerabilidades web
         if 'web_scan' in scan_results:
-            web_vulns = self.analyze_web_vulnerabilities(scan_results['web_scan'])
-            vulnerabilities.extend(web_vulns)
-        
+            self.add_web_results(scan_results['web_scan'])
+
         # Análisis de vulnerabilidades de red
         if 'network_scan' in scan_results:
-            network_vulns = self.analyze_network_vulnerabilities(scan_results['network_scan'])
-            vulnerabilities.extend(network_vulns)
-        
-        return {
-            'vulnerabilities': vulnerabilities,
-            'summary': self.generate_summary(vulnerabilities),
-            'risk_score': self.calculate_risk_score(vulnerabilities)
-        }
-    
-    def analyze_web_vulnerabilities(self, web_results: Dict[str, Any]) -> List[Dict]:
-        """Analiza específicamente vulnerabilidades web"""
-        vulns = []
-        
-        if 'xss_vulnerabilities' in web_results:
-            for vuln in web_results['xss_vulnerabilities']:
-                vulns.append({
-                    'type': 'XSS',
-                    'severity': 'high',
-                    'description': 'Cross-Site Scripting vulnerability detected',
-                    'evidence': vuln,
-                    'cvss_score': 7.5
-                })
-        
-        if 'sql_injection_vulnerabilities' in web_results:
-            for vuln in web_results['sql_injection_vulnerabilities']:
-                vulns.append({
-                    'type': 'SQL Injection',
-                    'severity': 'critical',
-                    'description': 'SQL Injection vulnerability detected',
+            self.add_findings(self.analyze_network_vulnerabilities(scan_results['network_scan']))
+
+        return self.snapshot()
+
+    def analyze_web_vulnerabilities(self, web_results: Dict[str, Any]) -> Iterable[Dict]:
+        """Analiza específicamente vulnerabilidades web (genera los hallazgos uno a uno)"""
+        for key, (vuln_type, severity, description, cvss) in WEB_FINDING_RULES.items():
+            for vuln in web_results.get(key, []):
+                yield {
+                    'type': vuln_type,
+                    'severity': severity,
+                    'description': description,
                     'evidence': vuln,
-                    'cvss_score': 9.0
-                })
-        
-        return vulns
-    
+                    'cvss_score': cvss
+                }
+
     def calculate_risk_score(self, vulnerabilities: List[Dict]) -> float:
         """Calcula el score de riesgo total"""
         if not vulnerabilities:
             return 0.0
-        
-        total_score = sum(vuln.get('cvss_score', 0) for vuln in vulnerabilities)
-        return min(total_score / len(vulnerabilities), 10.0)
\ No newline at end of file
+
+        unique = {self.fingerprint(vuln): vuln for vuln in vulnerabilities}
+        total_score = sum(vuln.get('cvss_score', 0) for vuln in unique.values())
+        return min(total_score / len(unique), 10.0)
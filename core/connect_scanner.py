@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import errno
+import ipaddress
+import socket
+import time
+from typing import Dict, Any, List, Iterable, AsyncIterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Puertos TCP más habituales, para escaneos rápidos sin la lista de nmap
+COMMON_TCP_PORTS = [
+    7, 9, 13, 21, 22, 23, 25, 26, 37, 53, 79, 80, 81, 88, 106, 110, 111, 113, 119, 135,
+    139, 143, 144, 179, 199, 389, 427, 443, 444, 445, 465, 513, 514, 515, 543, 544, 548,
+    554, 587, 631, 646, 873, 990, 993, 995, 1025, 1026, 1027, 1028, 1029, 1080, 1110,
+    1433, 1720, 1723, 1755, 1900, 2000, 2001, 2049, 2121, 2717, 3000, 3128, 3306, 3389,
+    3986, 4899, 5000, 5009, 5051, 5060, 5101, 5190, 5357, 5432, 5631, 5666, 5800, 5900,
+    6000, 6001, 6379, 6646, 7070, 8000, 8008, 8009, 8080, 8081, 8443, 8888, 9100, 9200,
+    9999, 10000, 11211, 27017, 32768, 49152, 49153, 49154, 49155, 49156, 49157
+]
+
+# Espera (segundos) antes de repetir una sonda que se quedó sin descriptores
+FD_WAIT_INITIAL = 0.05
+FD_WAIT_MAX = 1.0
+
+_service_names: Dict[int, str] = {}
+
+
+def service_name(port: int) -> str:
+    if port not in _service_names:
+        try:
+            _service_names[port] = socket.getservbyport(port, 'tcp')
+        except OSError:
+            _service_names[port] = 'unknown'
+    return _service_names[port]
+
+
+def parse_ports(spec: str) -> List[int]:
+    """'22,80,8000-8100' -> lista de puertos"""
+    ports = []
+    for part in spec.split(','):
+        if '-' in part:
+            start, end = part.split('-', 1)
+            ports.extend(range(int(start or 1), int(end or 65535) + 1))
+        elif part:
+            ports.append(int(part))
+    return ports
+
+
+def expand_targets(targets: Iterable[str]) -> List[str]:
+    """Expande rangos CIDR; los nombres de host se dejan tal cual"""
+    hosts = []
+    for target in targets:
+        try:
+            network = ipaddress.ip_network(target, strict=False)
+        except ValueError:
+            hosts.append(target)
+            continue
+        hosts.extend(str(ip) for ip in (network.hosts() if network.num_addresses > 2 else network))
+    return hosts
+
+
+def raise_fd_limit(wanted: int) -> int:
+    """Sube el límite de descriptores hasta `wanted` si el límite duro lo permite"""
+    if resource is None:
+        return wanted
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+    if soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+class RTTEstimator:
+    """Timeout adaptativo por host al estilo RFC 6298 (SRTT + 4 * RTTVAR)"""
+
+    def __init__(self, initial: float, minimum: float, maximum: float):
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.minimum), self.maximum)
+
+    def backoff(self):
+        self.rto = min(self.rto * 2, self.maximum)
+
+
+class AsyncConnectScanner:
+    """Escáner TCP connect puro asyncio, alternativa a nmap -sT
+
+    Lanza miles de intentos de conexión concurrentes, adapta el timeout de
+    cada host a su RTT medido (también cuenta el RST de un puerto cerrado)
+    y reintenta las sondas sin respuesta. Los resultados tienen la misma
+    forma que NetworkScanner.parse_nmap_output.
+    """
+
+    def __init__(self, concurrency: int = 2000, timeout: float = 1.0, min_timeout: float = 0.25,
+                 max_timeout: float = 3.0, retries: int = 1, report_closed: bool = False):
+        self.concurrency = min(concurrency, max(raise_fd_limit(concurrency + 256) - 256, 64))
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.retries = retries
+        self.report_closed = report_closed
+        self.rtt: Dict[str, RTTEstimator] = {}
+        self.addresses: Dict[str, tuple] = {}
+        self.stats = {'probes': 0, 'open': 0, 'closed': 0, 'filtered': 0, 'retries': 0, 'fd_waits': 0}
+
+    def estimator(self, host: str) -> RTTEstimator:
+        if host not in self.rtt:
+            self.rtt[host] = RTTEstimator(self.timeout, self.min_timeout, self.max_timeout)
+        return self.rtt[host]
+
+    async def resolve(self, host: str):
+        """Resuelve cada host una sola vez (familia y dirección)"""
+        if host not in self.addresses:
+            try:
+                ip = ipaddress.ip_address(host)
+                self.addresses[host] = (socket.AF_INET6 if ip.version == 6 else socket.AF_INET, host)
+            except ValueError:
+                loop = asyncio.get_running_loop()
+                infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+                self.addresses[host] = (infos[0][0], infos[0][4][0])
+        return self.addresses[host]
+
+    async def probe(self, host: str, port: int) -> str:
+        """Un intento de conexión: open, closed o filtered (sin respuesta)"""
+        loop = asyncio.get_running_loop()
+        estimator = self.estimator(host)
+        family, address = await self.resolve(host)
+        attempt = 0
+        fd_wait = FD_WAIT_INITIAL
+        while attempt <= self.retries:
+            started = time.monotonic()
+            sock = None
+            try:
+                # Socket no bloqueante directo: evita el coste de StreamReader/Writer por sonda
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                self.stats['probes'] += 1
+                await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeout=estimator.rto)
+            except asyncio.TimeoutError:
+                estimator.backoff()
+                attempt += 1
+                if attempt <= self.retries:
+                    self.stats['retries'] += 1
+                continue
+            except ConnectionRefusedError:
+                estimator.sample(time.monotonic() - started)
+                return 'closed'
+            except OSError as e:
+                if e.errno in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+                    return 'filtered'
+                if e.errno in (errno.EMFILE, errno.ENFILE):
+                    # Sin descriptores libres la sonda no llegó a salir: esperar (con backoff)
+                    # a que otras cierren y repetir sin gastar un intento
+                    self.stats['fd_waits'] += 1
+                    await asyncio.sleep(fd_wait)
+                    fd_wait = min(fd_wait * 2, FD_WAIT_MAX)
+                    continue
+                return 'closed'
+            finally:
+                if sock is not None:
+                    sock.close()
+            estimator.sample(time.monotonic() - started)
+            return 'open'
+        return 'filtered'
+
+    async def scan(self, targets: Iterable[str], ports: Iterable[int]) -> AsyncIterator[Dict[str, Any]]:
+        """Genera un registro por puerto (abierto, o todos con report_closed) según terminan"""
+        hosts = []
+        for host in expand_targets(targets):
+            try:
+                await self.resolve(host)
+                hosts.append(host)
+            except OSError as e:
+                print(f"[-] No se pudo resolver {host}: {e}")
+        ports = list(ports)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = set()
+
+        async def worker(host: str, port: int):
+            try:
+                state = await self.probe(host, port)
+            finally:
+                semaphore.release()
+            self.stats[state] += 1
+            if state == 'open' or self.report_closed:
+                await results.put({
+                    'host': host,
+                    'port': str(port),
+                    'protocol': 'tcp',
+                    'state': state,
+                    'service': service_name(port)
+                })
+
+        async def producer():
+            # Intercalar hosts por puerto reparte la carga entre objetivos
+            for port in ports:
+                for host in hosts:
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(worker(host, port))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            await results.put(None)
+
+        producer_task = asyncio.ensure_future(producer())
+        try:
+            while True:
+                record = await results.get()
+                if record is None:
+                    break
+                yield record
+        finally:
+            producer_task.cancel()
+            for task in list(tasks):
+                task.cancel()
+
+    async def scan_all(self, targets: Iterable[str], ports: Iterable[int]) -> List[Dict[str, Any]]:
+        return [record async for record in self.scan(targets, ports)]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='KaliNova - Escáner TCP connect asíncrono')
+    parser.add_argument('targets', nargs='+', help='Hosts o rangos CIDR')
+    parser.add_argument('-p', '--ports', default=None, help='Puertos (ej. 22,80,1-1024)')
+    parser.add_argument('-c', '--concurrency', type=int, default=2000)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    parser.add_argument('--retries', type=int, default=1)
+
+    args = parser.parse_args()
+    ports = parse_ports(args.ports) if args.ports else COMMON_TCP_PORTS
+
+    scanner = AsyncConnectScanner(args.concurrency, args.timeout, retries=args.retries)
+    started = time.monotonic()
+    async for record in scanner.scan(args.targets, ports):
+        print(f"[+] {record['host']}:{record['port']}/tcp {record['state']} {record['service']}")
+
+    elapsed = time.monotonic() - started
+    print(f"[*] {scanner.stats['probes']} sondas en {elapsed:.2f}s "
+          f"({scanner.stats['probes'] / max(elapsed, 1e-9):.0f}/s) - {scanner.stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import html
+import math
+import posixpath
+import re
+import time
+from typing import Dict, Any, List, Optional, Iterable, Callable, Awaitable, AsyncIterator
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Recursos que no contienen enlaces: no se descargan
+STATIC_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.webp', '.bmp', '.css', '.woff', '.woff2',
+    '.ttf', '.eot', '.mp3', '.mp4', '.avi', '.mov', '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z',
+    '.exe', '.dmg', '.iso'
+}
+IGNORED_SCHEMES = ('javascript:', 'mailto:', 'tel:', 'data:', '#')
+
+_ATTRIBUTE = r'''\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))'''
+_LINK = re.compile(r'(?:href|src|action)' + _ATTRIBUTE, re.I)
+_FORM = re.compile(r'<form\b([^>]*)>(.*?)</form\s*>', re.I | re.S)
+_FIELD = re.compile(r'<(?:input|select|textarea)\b([^>]*)>', re.I)
+_ATTRIBUTES = re.compile(r'([\w:-]+)' + _ATTRIBUTE)
+
+
+def canonicalize(url: str, base: str = None) -> Optional[str]:
+    """Forma canónica de una URL (None si no es http/https)
+
+    Esquema y host en minúsculas, sin puerto por defecto ni fragmento,
+    ruta con los '.'/'..' resueltos y la query ordenada.
+    """
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    host = parts.hostname.lower()
+    if ':' in host:
+        host = f"[{host}]"
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = posixpath.normpath(parts.path) if parts.path else '/'
+    if path.startswith('//'):
+        path = '/' + path.lstrip('/')
+    if path == '.':
+        path = '/'
+    if parts.path.endswith('/') and not path.endswith('/'):
+        path += '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class BloomFilter:
+    """Conjunto probabilístico: memoria fija, sin falsos negativos"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """Añade el elemento; False si (probablemente) ya estaba"""
+        new = False
+        for position in self.positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p // 8] & (1 << (p % 8)) for p in self.positions(item))
+
+
+def _attribute_value(match: re.Match) -> str:
+    return html.unescape(next(group for group in match.groups()[-3:] if group is not None))
+
+
+def extract_links(body: str, base_url: str) -> List[str]:
+    """Enlaces (href/src/action) canónicos de una página, sin parsear el DOM"""
+    links = []
+    for match in _LINK.finditer(body):
+        value = _attribute_value(match).strip()
+        if not value or value.lower().startswith(IGNORED_SCHEMES):
+            continue
+        url = canonicalize(value, base_url)
+        if url is not None:
+            links.append(url)
+    return links
+
+
+def extract_forms(body: str, base_url: str) -> List[Dict[str, Any]]:
+    """Formularios con su acción, método y campos (nombre -> valor por defecto)"""
+    forms = []
+    for form in _FORM.finditer(body):
+        attributes = {m.group(1).lower(): _attribute_value(m) for m in _ATTRIBUTES.finditer(form.group(1))}
+        fields = {}
+        for field in _FIELD.finditer(form.group(2)):
+            field_attributes = {m.group(1).lower(): _attribute_value(m) for m in _ATTRIBUTES.finditer(field.group(1))}
+            if field_attributes.get('name'):
+                fields[field_attributes['name']] = field_attributes.get('value', '')
+        action = canonicalize(attributes.get('action') or base_url, base_url)
+        if action is not None:
+            forms.append({'action': action, 'method': attributes.get('method', 'get').upper(),
+                          'fields': fields, 'page': base_url})
+    return forms
+
+
+class Crawler:
+    """Crawler BFS asíncrono con presupuesto de profundidad y de páginas
+
+    La frontera es una cola FIFO acotada (los enlaces que no caben se
+    descartan y se cuentan), las URLs se canonicalizan y se deduplican con
+    un filtro de Bloom, y cada host tiene un límite de peticiones
+    simultáneas y un intervalo mínimo entre ellas. Las páginas se generan
+    según se descargan, con sus enlaces y formularios.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Dict[str, Any]]], max_depth: int = 3,
+                 max_pages: int = 500, frontier_size: int = 10000, workers: int = 10,
+                 per_host: int = 4, host_delay: float = 0.0, expected_urls: int = 100000,
+                 allowed_hosts: Iterable[str] = None):
+        self.fetch = fetch
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.frontier_size = frontier_size
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.host_delay = host_delay
+        self.seen = BloomFilter(expected_urls)
+        self.allowed_hosts = set(allowed_hosts or ())
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.host_next: Dict[str, float] = {}
+        self.stats = {'fetched': 0, 'errors': 0, 'queued': 0, 'duplicates': 0, 'frontier_dropped': 0,
+                      'out_of_scope': 0, 'forms': 0}
+
+    def in_scope(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if posixpath.splitext(parts.path)[1].lower() in STATIC_EXTENSIONS:
+            return False
+        return not self.allowed_hosts or parts.netloc in self.allowed_hosts
+
+    def enqueue(self, frontier: asyncio.Queue, url: str, depth: int):
+        if depth > self.max_depth:
+            return
+        if not self.in_scope(url):
+            self.stats['out_of_scope'] += 1
+            return
+        if not self.seen.add(url):
+            self.stats['duplicates'] += 1
+            return
+        try:
+            frontier.put_nowait((url, depth))
+            self.stats['queued'] += 1
+        except asyncio.QueueFull:
+            self.stats['frontier_dropped'] += 1
+
+    async def polite_fetch(self, url: str) -> Dict[str, Any]:
+        """Descarga respetando el límite de concurrencia y el intervalo por host"""
+        host = urlsplit(url).netloc
+        slot = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with slot:
+            if self.host_delay:
+                now = time.monotonic()
+                start = max(now, self.host_next.get(host, now))
+                self.host_next[host] = start + self.host_delay
+                if start > now:
+                    await asyncio.sleep(start - now)
+            return await self.fetch(url)
+
+    async def run(self, seeds: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Genera {'url', 'depth', 'status', 'links', 'forms'} por cada página descargada"""
+        frontier: asyncio.Queue = asyncio.Queue(maxsize=self.frontier_size)
+        pages: asyncio.Queue = asyncio.Queue()
+        budget = {'pages': self.max_pages}
+
+        for seed in seeds:
+            url = canonicalize(seed)
+            if url is not None:
+                if not self.allowed_hosts:
+                    self.allowed_hosts.add(urlsplit(url).netloc)
+                self.enqueue(frontier, url, 0)
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    if budget['pages'] <= 0:
+                        continue
+                    budget['pages'] -= 1
+                    response = await self.polite_fetch(url)
+                    if not response.get('success'):
+                        self.stats['errors'] += 1
+                        continue
+                    self.stats['fetched'] += 1
+                    body = response.get('body', '')
+                    content_type = response.get('headers', {}).get('Content-Type', 'text/html')
+                    links, forms = [], []
+                    if 'html' in content_type:
+                        links = extract_links(body, url)
+                        forms = extract_forms(body, url)
+                        self.stats['forms'] += len(forms)
+                        for link in links:
+                            self.enqueue(frontier, link, depth + 1)
+                    await pages.put({'url': url, 'depth': depth, 'status': response.get('status'),
+                                     'links': links, 'forms': forms})
+                except Exception:
+                    self.stats['errors'] += 1
+                finally:
+                    frontier.task_done()
+
+        async def finished():
+            await frontier.join()
+            await pages.put(None)
+
+        tasks = [asyncio.ensure_future(worker()) for _ in range(self.workers)]
+        tasks.append(asyncio.ensure_future(finished()))
+        try:
+            while True:
+                page = await pages.get()
+                if page is None:
+                    break
+                yield page
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,290 @@
+import asyncio
+import random
+import secrets
+import socket
+import struct
+import time
+from typing import Dict, Any, List, Tuple, Optional, Iterable
+
+QTYPES = {'A': 1, 'CNAME': 5, 'AAAA': 28}
+RCODES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+# Respuestas que merecen reintentarse con otro servidor
+RETRY_RCODES = {2, 5}
+FALLBACK_NAMESERVERS = ['1.1.1.1', '8.8.8.8']
+
+
+def build_query(qid: int, name: str, qtype: int = 1) -> bytes:
+    """Consulta DNS estándar con recursión deseada"""
+    header = struct.pack('!HHHHHH', qid, 0x0100, 1, 0, 0, 0)
+    labels = b''.join(len(label).to_bytes(1, 'big') + label
+                      for label in name.encode('idna').split(b'.') if label)
+    return header + labels + b'\x00' + struct.pack('!HH', qtype, 1)
+
+
+def read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Nombre (con punteros de compresión) y offset tras él"""
+    labels = []
+    end = None
+    hops = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError('nombre truncado')
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data) or hops > 64:
+                raise ValueError('puntero de compresión inválido')
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            hops += 1
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('ascii', errors='replace'))
+        offset += length
+    return '.'.join(labels).lower(), end if end is not None else offset
+
+
+def parse_response(data: bytes) -> Dict[str, Any]:
+    """Id, rcode, pregunta y registros A/AAAA/CNAME de una respuesta"""
+    if len(data) < 12:
+        raise ValueError('respuesta demasiado corta')
+    qid, flags, qdcount, ancount, _, _ = struct.unpack('!HHHHHH', data[:12])
+    offset = 12
+    question = ''
+    for _ in range(qdcount):
+        question, offset = read_name(data, offset)
+        offset += 4
+    addresses, cnames = [], []
+    for _ in range(ancount):
+        _, offset = read_name(data, offset)
+        if offset + 10 > len(data):
+            raise ValueError('registro truncado')
+        rtype, _, _, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+        offset += 10
+        rdata = data[offset:offset + rdlength]
+        if rtype == 1 and rdlength == 4:
+            addresses.append(socket.inet_ntop(socket.AF_INET, rdata))
+        elif rtype == 28 and rdlength == 16:
+            addresses.append(socket.inet_ntop(socket.AF_INET6, rdata))
+        elif rtype == 5:
+            cnames.append(read_name(data, offset)[0])
+        offset += rdlength
+    return {'id': qid, 'rcode': flags & 0x0F, 'question': question,
+            'addresses': addresses, 'cnames': cnames}
+
+
+def system_nameservers(path: str = '/etc/resolv.conf') -> List[str]:
+    try:
+        with open(path, 'r') as f:
+            servers = [line.split()[1] for line in f
+                       if line.startswith('nameserver') and len(line.split()) > 1]
+    except OSError:
+        servers = []
+    return servers or FALLBACK_NAMESERVERS
+
+
+def parse_nameserver(server: str) -> Tuple[str, int]:
+    """'1.1.1.1', '127.0.0.1:5353' o '[::1]:53' -> (host, puerto)"""
+    if server.startswith('['):
+        host, _, port = server[1:].partition(']:')
+        return host.rstrip(']'), int(port or 53)
+    if server.count(':') == 1:
+        host, port = server.split(':')
+        return host, int(port)
+    return server, 53
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    """Un socket UDP del pool: casa cada respuesta con su consulta pendiente"""
+
+    def __init__(self, resolver: 'AsyncDNSResolver'):
+        self.resolver = resolver
+        self.transport = None
+        self.pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            reply = parse_response(data)
+        except (ValueError, struct.error):
+            self.resolver.stats['malformed'] += 1
+            return
+        entry = self.pending.get(reply['id'])
+        # Id y pregunta deben coincidir: descarta respuestas tardías o falsificadas
+        if entry is None or entry[0] != reply['question']:
+            self.resolver.stats['unexpected'] += 1
+            return
+        del self.pending[reply['id']]
+        if not entry[1].done():
+            entry[1].set_result(reply)
+
+    def error_received(self, exc):
+        # ICMP port unreachable y similares: la consulta acabará por timeout y se reintentará
+        self.resolver.stats['socket_errors'] += 1
+
+
+class AsyncDNSResolver:
+    """Resolver DNS asíncrono sobre un pequeño pool de sockets UDP
+
+    Miles de consultas en vuelo multiplexadas por id sobre unos pocos
+    sockets, con reintentos propios (backoff exponencial y rotación de
+    servidores) y un token bucket que limita las consultas por segundo.
+    No usa getaddrinfo ni hilos.
+    """
+
+    def __init__(self, nameservers: Iterable[str] = None, sockets: int = 4, timeout: float = 1.0,
+                 retries: int = 2, rate: float = 2000.0, max_timeout: float = 4.0):
+        self.nameservers = [parse_nameserver(server) for server in (nameservers or system_nameservers())]
+        self.socket_count = max(1, sockets)
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.retries = retries
+        self.rate = rate
+        self.burst = max(1.0, rate / 20) if rate else 0.0
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.pools: Dict[int, List[_DNSProtocol]] = {}
+        # Apertura en curso de cada pool: las consultas concurrentes del arranque la comparten
+        self.opening: Dict[int, asyncio.Task] = {}
+        self.turn = 0
+        self.stats = {'queries': 0, 'answers': 0, 'retransmits': 0, 'timeouts': 0, 'failures': 0,
+                      'malformed': 0, 'unexpected': 0, 'socket_errors': 0}
+
+    async def __aenter__(self) -> 'AsyncDNSResolver':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for task in self.opening.values():
+            task.cancel()
+        self.opening.clear()
+        for pool in self.pools.values():
+            for protocol in pool:
+                if protocol.transport is not None:
+                    protocol.transport.close()
+        self.pools.clear()
+
+    async def socket_for(self, family: int) -> _DNSProtocol:
+        """Socket del pool en turno rotatorio (el pool se abre la primera vez)
+
+        Las primeras consultas concurrentes esperan a la misma apertura; la
+        cancelación de una de ellas no interrumpe la apertura para el resto.
+        """
+        pool = self.pools.get(family)
+        if pool is None:
+            task = self.opening.get(family)
+            if task is None:
+                task = self.opening[family] = asyncio.ensure_future(self.open_pool(family))
+                # Si falla, la siguiente consulta vuelve a intentarlo
+                task.add_done_callback(lambda _: self.opening.pop(family, None))
+            pool = await asyncio.shield(task)
+        self.turn += 1
+        return pool[self.turn % len(pool)]
+
+    async def open_pool(self, family: int) -> List[_DNSProtocol]:
+        """Abre los sockets de una familia; si algo falla cierra los ya abiertos"""
+        loop = asyncio.get_running_loop()
+        pool = []
+        try:
+            for _ in range(self.socket_count):
+                _, protocol = await loop.create_datagram_endpoint(
+                    lambda: _DNSProtocol(self), family=family,
+                    local_addr=('::' if family == socket.AF_INET6 else '0.0.0.0', 0)
+                )
+                pool.append(protocol)
+        except BaseException:
+            for protocol in pool:
+                protocol.transport.close()
+            raise
+        self.pools[family] = pool
+        return pool
+
+    async def throttle(self):
+        """Token bucket: como mucho `rate` consultas por segundo (ráfagas de rate/20)"""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            # El token queda reservado: los siguientes esperan detrás
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    async def resolve(self, name: str, qtype: str = 'A') -> Dict[str, Any]:
+        """{'name', 'status', 'addresses', 'cnames'}; status TIMEOUT si nadie responde"""
+        name = name.rstrip('.').lower()
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout
+        start = random.randrange(len(self.nameservers))
+        status = 'TIMEOUT'
+
+        for attempt in range(self.retries + 1):
+            host, port = self.nameservers[(start + attempt) % len(self.nameservers)]
+            family = socket.AF_INET6 if ':' in host else socket.AF_INET
+            protocol = await self.socket_for(family)
+            qid = secrets.randbelow(65536)
+            while qid in protocol.pending:
+                qid = secrets.randbelow(65536)
+            future = loop.create_future()
+            protocol.pending[qid] = (name, future)
+            try:
+                await self.throttle()
+                protocol.transport.sendto(build_query(qid, name, QTYPES[qtype]), (host, port))
+                self.stats['queries'] += 1
+                if attempt:
+                    self.stats['retransmits'] += 1
+                reply = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                timeout = min(timeout * 2, self.max_timeout)
+                continue
+            finally:
+                protocol.pending.pop(qid, None)
+
+            status = RCODES.get(reply['rcode'], str(reply['rcode']))
+            if reply['rcode'] in RETRY_RCODES:
+                continue
+            self.stats['answers'] += 1
+            return {'name': name, 'status': status, 'addresses': reply['addresses'], 'cnames': reply['cnames']}
+
+        self.stats['failures'] += 1
+        return {'name': name, 'status': status, 'addresses': [], 'cnames': []}
+
+
+class WildcardFilter:
+    """Detecta DNS comodín resolviendo etiquetas aleatorias del dominio"""
+
+    def __init__(self, resolver: AsyncDNSResolver, domain: str, samples: int = 3):
+        self.resolver = resolver
+        self.domain = domain
+        self.samples = samples
+        self.addresses = set()
+        self.cnames = set()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.addresses or self.cnames)
+
+    async def detect(self) -> bool:
+        answers = await asyncio.gather(*[
+            self.resolver.resolve(f"{secrets.token_hex(6)}.{self.domain}") for _ in range(self.samples)
+        ])
+        for answer in answers:
+            self.addresses.update(answer['addresses'])
+            self.cnames.update(answer['cnames'])
+        return self.active
+
+    def is_real(self, answer: Optional[Dict[str, Any]]) -> bool:
+        """Respuesta con direcciones que no son (solo) las del comodín"""
+        if not answer or answer.get('status') != 'NOERROR' or not answer.get('addresses'):
+            return False
+        if self.cnames and self.cnames.intersection(answer['cnames']):
+            return False
+        return not set(answer['addresses']) <= self.addresses
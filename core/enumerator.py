@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Dict, Any, Callable, Awaitable, AsyncIterator, Iterator, Tuple
+
+
+class WordlistEnumerator:
+    """Recorre un wordlist en streaming con una ventana acotada de peticiones
+
+    El fichero se lee línea a línea (memoria constante), nunca hay más de
+    `window` sondas en vuelo y la posición se guarda periódicamente en un
+    checkpoint para poder reanudar un escaneo interrumpido. De cada acierto
+    solo se conserva el resumen de `record` (por defecto url y status), no
+    la respuesta completa, para que memoria y checkpoint no crezcan con las
+    cabeceras y cuerpos de los aciertos.
+    """
+
+    def __init__(self, wordlist: str, probe: Callable[[str], Awaitable[Dict[str, Any]]],
+                 is_hit: Callable[[Dict[str, Any]], bool], window: int = 50,
+                 checkpoint_path: str = None, checkpoint_every: int = 500,
+                 progress_callback: Callable[[Dict[str, Any]], Any] = None, progress_every: int = 1000,
+                 record: Callable[[Dict[str, Any]], Dict[str, Any]] = None):
+        self.wordlist = wordlist
+        self.probe = probe
+        self.is_hit = is_hit
+        self.window = max(1, window)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.progress_callback = progress_callback
+        self.progress_every = progress_every
+        self.record = record or self.default_record
+        self.file_size = os.path.getsize(wordlist)
+        self.progress = {'tested': 0, 'hits': 0, 'errors': 0, 'offset': 0, 'percent': 0.0}
+        self.found = []
+        self.found_words = set()
+
+    @staticmethod
+    def default_record(response: Dict[str, Any]) -> Dict[str, Any]:
+        return {'url': response.get('url'), 'status': response.get('status')}
+
+    @staticmethod
+    def checkpoint_file(checkpoint_dir: str, *key: str) -> str:
+        """Ruta de checkpoint estable para una combinación target/wordlist"""
+        digest = hashlib.sha1('|'.join(key).encode()).hexdigest()[:16]
+        return os.path.join(checkpoint_dir, f"enum_{digest}.json")
+
+    def iter_words(self, offset: int) -> Iterator[Tuple[int, int, str]]:
+        """Palabras del wordlist con los offsets en bytes de inicio y fin de su línea"""
+        with open(self.wordlist, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                start, offset = offset, offset + len(raw)
+                word = raw.decode('utf-8', errors='ignore').strip()
+                if word and not word.startswith('#'):
+                    yield start, offset, word
+
+    def load_checkpoint(self) -> int:
+        """Offset desde el que reanudar (0 si no hay checkpoint válido)"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if state.get('wordlist') != self.wordlist or state.get('file_size') != self.file_size:
+            return 0
+        self.found = state.get('found', [])
+        self.found_words = {word for word, _ in self.found}
+        self.progress.update(state.get('progress', {}))
+        return state.get('offset', 0)
+
+    def save_checkpoint(self, offset: int):
+        """Guarda la posición hasta la que todas las sondas han terminado"""
+        if not self.checkpoint_path:
+            return
+        state = {
+            'wordlist': self.wordlist,
+            'file_size': self.file_size,
+            'offset': offset,
+            'found': self.found,
+            'progress': self.progress
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def report_progress(self, offset: int):
+        self.progress['offset'] = offset
+        self.progress['percent'] = 100.0 * offset / self.file_size if self.file_size else 100.0
+        if self.progress_callback is not None:
+            self.progress_callback(dict(self.progress))
+        else:
+            print(f"[*] {self.progress['tested']} probadas, {self.progress['hits']} encontradas "
+                  f"({self.progress['percent']:.1f}%)")
+
+    async def run(self) -> AsyncIterator[Dict[str, Any]]:
+        """Genera cada acierto en cuanto se confirma
+
+        Los aciertos recuperados de un checkpoint se generan como su resumen
+        de `record`; los nuevos, con la respuesta completa.
+        """
+        read_offset = self.load_checkpoint()
+        for _, hit in self.found:
+            yield hit
+
+        words = self.iter_words(read_offset)
+        pending = {}
+        # Inicio de las líneas en vuelo: se reanuda desde la menor no completada
+        in_flight = set()
+        exhausted = False
+
+        def watermark() -> int:
+            return min(in_flight) if in_flight else read_offset
+
+        try:
+            while True:
+                while not exhausted and len(pending) < self.window:
+                    item = next(words, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    start, read_offset, word = item
+                    pending[asyncio.ensure_future(self.probe(word))] = (start, word)
+                    in_flight.add(start)
+
+                if not pending:
+                    break
+
+                done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    start, word = pending.pop(task)
+                    in_flight.discard(start)
+                    self.progress['tested'] += 1
+                    try:
+                        response = task.result()
+                    except Exception:
+                        self.progress['errors'] += 1
+                        continue
+                    if self.is_hit(response) and word not in self.found_words:
+                        self.progress['hits'] += 1
+                        self.found.append((word, self.record(response)))
+                        self.found_words.add(word)
+                        yield response
+
+                    if self.progress['tested'] % self.progress_every == 0:
+                        self.report_progress(watermark())
+                    if self.progress['tested'] % self.checkpoint_every == 0:
+                        self.save_checkpoint(watermark())
+        finally:
+            if pending:
+                # Interrumpido: cancelar sondas y guardar desde dónde reanudar
+                for task in pending:
+                    task.cancel()
+                self.save_checkpoint(watermark())
+
+        self.report_progress(self.file_size)
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
@@ -0,0 +1,120 @@
+import ssl
+import time
+import aiohttp
+from types import SimpleNamespace
+from typing import Dict, Any
+
+from core.metrics import get_metrics
+
+
+class HTTPClientManager:
+    """Cliente HTTP compartido por todos los checks de un escaneo
+
+    Un único ClientSession con pool keep-alive, límite de conexiones por
+    host y caché DNS. Solo las conexiones reutilizadas del pool (keep-alive)
+    se ahorran el handshake TLS; cada conexión nueva hace uno completo,
+    porque el transporte TLS de asyncio no reanuda sesiones. El SSLContext
+    se comparte para cargar los certificados una sola vez.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.session: aiohttp.ClientSession = None
+        self.ssl_context = self.create_ssl_context(config.get('verify_ssl', True))
+        self.stats = {
+            'requests': 0,
+            'in_flight': 0,
+            'errors': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
+
+    @staticmethod
+    def create_ssl_context(verify: bool) -> ssl.SSLContext:
+        """Contexto TLS (almacén de certificados) cargado una sola vez para todo el escaneo"""
+        context = ssl.create_default_context()
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    async def open(self) -> aiohttp.ClientSession:
+        """Crea la sesión y su pool de conexiones"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.get('max_connections', 100),
+                limit_per_host=self.config.get('connections_per_host', self.config.get('threads', 10)),
+                ttl_dns_cache=self.config.get('dns_cache_ttl', 300),
+                use_dns_cache=True,
+                keepalive_timeout=self.config.get('keepalive_timeout', 30),
+                ssl=self.ssl_context
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.config.get('timeout', 30)),
+                headers={'User-Agent': self.config.get('user_agent', 'KaliNova-Scanner/1.0')},
+                trace_configs=[self.create_trace_config()]
+            )
+        return self.session
+
+    async def close(self):
+        """Cierra la sesión y todas las conexiones del pool"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self) -> 'HTTPClientManager':
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def create_trace_config(self) -> aiohttp.TraceConfig:
+        """Hooks de aiohttp que alimentan las estadísticas del pool"""
+        trace_config = aiohttp.TraceConfig()
+
+        def count(key: str, delta: int = 1):
+            async def handler(session, context: SimpleNamespace, params):
+                self.stats[key] += delta
+            return handler
+
+        trace_config.on_request_start.append(count('requests'))
+        trace_config.on_request_start.append(count('in_flight'))
+        trace_config.on_request_end.append(count('in_flight', -1))
+        trace_config.on_request_exception.append(count('in_flight', -1))
+        trace_config.on_request_exception.append(count('errors'))
+        trace_config.on_connection_create_end.append(count('connections_created'))
+        trace_config.on_connection_reuseconn.append(count('connections_reused'))
+        trace_config.on_dns_cache_hit.append(count('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(count('dns_cache_misses'))
+
+        # Latencias por método/estado solo si hay un registro de métricas activo
+        metrics = get_metrics()
+        if metrics.enabled:
+            async def request_start(session, context: SimpleNamespace, params):
+                context.started = time.perf_counter()
+
+            async def request_end(session, context: SimpleNamespace, params):
+                metrics.observe('http_request_seconds', time.perf_counter() - context.started,
+                                method=params.method, status=params.response.status)
+
+            async def request_exception(session, context: SimpleNamespace, params):
+                metrics.observe('http_request_seconds', time.perf_counter() - context.started,
+                                method=params.method, status=type(params.exception).__name__)
+
+            trace_config.on_request_start.append(request_start)
+            trace_config.on_request_end.append(request_end)
+            trace_config.on_request_exception.append(request_exception)
+        return trace_config
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del pool de conexiones"""
+        stats = dict(self.stats)
+        total = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_ratio'] = stats['connections_reused'] / total if total else 0.0
+        if self.session is not None and not self.session.closed:
+            stats['limit'] = self.session.connector.limit
+            stats['limit_per_host'] = self.session.connector.limit_per_host
+        return stats
@@ -0,0 +1,180 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple, Iterable, AsyncIterable, Union, Callable, Awaitable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+@dataclass(frozen=True)
+class InjectionPoint:
+    """Un parámetro de una URL concreta en el que inyectar payloads"""
+    url: str
+    param: str
+    params: Tuple[Tuple[str, str], ...] = ()
+
+    def query(self, payload: str) -> List[Tuple[str, str]]:
+        query = [(name, payload if name == self.param else value) for name, value in self.params]
+        if not any(name == self.param for name, _ in self.params):
+            query.append((self.param, payload))
+        return query
+
+    def original(self) -> str:
+        """URL sin payload (la query tal como se descubrió)"""
+        return f"{self.url}?{urlencode(self.params)}" if self.params else self.url
+
+    def build(self, payload: str) -> str:
+        """URL con el payload en el parámetro y el resto de la query intacta"""
+        return f"{self.url}?{urlencode(self.query(payload))}"
+
+    def request_key(self, payload: str) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        """Clave canónica: dos peticiones con la misma clave son idénticas"""
+        return self.url, tuple(sorted(self.query(payload)))
+
+
+def injection_points(urls: Iterable[str], default_params: Iterable[str] = ()) -> List[InjectionPoint]:
+    """Un punto por URL × parámetro de su query
+
+    Las URLs sin query se prueban con `default_params`. Los puntos repetidos
+    (la misma URL con distinto orden de parámetros, fragmentos...) se descartan.
+    """
+    points = {}
+    for url in urls:
+        parts = urlsplit(url)
+        base = urlunsplit((parts.scheme, parts.netloc, parts.path or '/', '', ''))
+        params = tuple(parse_qsl(parts.query, keep_blank_values=True))
+        names = [name for name, _ in params] or list(default_params)
+        for name in dict.fromkeys(names):
+            point = InjectionPoint(base, name, tuple(sorted(params)))
+            points.setdefault((base, name, point.params), point)
+    return list(points.values())
+
+
+class InjectionEngine:
+    """Motor concurrente de pruebas de inyección (XSS, SQLi...)
+
+    Todas las comprobaciones del escaneo comparten el mismo límite de
+    peticiones en vuelo. Cada punto de inyección recibe sus payloads en
+    orden y deja de recibirlos en cuanto se confirma como vulnerable; los
+    puntos se prueban según llegan (también desde un iterador asíncrono,
+    p. ej. el crawler) con `max_in_flight` workers por comprobación, que
+    frenan al productor si van por detrás, y las peticiones idénticas de una misma
+    comprobación se envían una sola vez. Con `baseline`, cada punto se pide
+    también sin payload (una vez por URL para todas las comprobaciones) y
+    esa respuesta se pasa a `detect` para comparar.
+    """
+
+    def __init__(self, probe: Callable[[str, List[str]], Awaitable[Dict[str, Any]]], max_in_flight: int = 50):
+        self.probe = probe
+        self.max_in_flight = max(1, max_in_flight)
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.seen = set()
+        self.baselines: Dict[str, asyncio.Task] = {}
+        self.stats = {'points': 0, 'requests': 0, 'duplicates': 0, 'skipped_confirmed': 0, 'errors': 0,
+                      'findings': 0, 'baseline_requests': 0}
+
+    async def baseline(self, point: InjectionPoint) -> Dict[str, Any]:
+        """Respuesta sin payload del punto, pedida una sola vez por URL
+
+        La petición es una tarea propia: cancelar al punto que la pidió no
+        deja colgados a los demás, y si la tarea no termina bien se olvida
+        para que el siguiente punto la repita.
+        """
+        url = point.original()
+        task = self.baselines.get(url)
+        if task is None:
+            task = self.baselines[url] = asyncio.ensure_future(self.fetch_baseline(url))
+
+            def forget(done: asyncio.Task):
+                if (done.cancelled() or done.exception() is not None) and self.baselines.get(url) is done:
+                    del self.baselines[url]
+            task.add_done_callback(forget)
+        return await asyncio.shield(task)
+
+    async def fetch_baseline(self, url: str) -> Dict[str, Any]:
+        try:
+            async with self.semaphore:
+                self.stats['baseline_requests'] += 1
+                return await self.probe(url, None)
+        except Exception as e:
+            return {'url': url, 'success': False, 'error': str(e)}
+
+    async def run(self, kind: str, points: Union[Iterable[InjectionPoint], AsyncIterable[InjectionPoint]],
+                  payloads: List[str], detect: Callable[[Dict[str, Any], str, Dict[str, Any]], bool],
+                  stop_patterns: Callable[[str], List[str]] = None,
+                  baseline: bool = False,
+                  on_finding: Callable[[Dict[str, Any]], Any] = None) -> List[Dict[str, Any]]:
+        """Prueba los payloads en cada punto; devuelve un hallazgo por punto vulnerable
+
+        `detect(respuesta, payload, respuesta_sin_payload)` recibe None como
+        tercer argumento salvo con `baseline`. Cada hallazgo se entrega
+        además a `on_finding` en cuanto se confirma.
+        """
+        findings = []
+        started = set()
+        queue: asyncio.Queue = asyncio.Queue(self.max_in_flight)
+
+        async def test(point: InjectionPoint):
+            reference = None
+            if baseline:
+                reference = await self.baseline(point)
+                if not reference.get('success'):
+                    # Sin respuesta de referencia no se puede distinguir un error provocado
+                    self.stats['errors'] += 1
+                    return
+            for index, payload in enumerate(payloads):
+                key = (kind, point.request_key(payload))
+                if key in self.seen:
+                    self.stats['duplicates'] += 1
+                    continue
+                self.seen.add(key)
+                url = point.build(payload)
+                async with self.semaphore:
+                    self.stats['requests'] += 1
+                    response = await self.probe(url, stop_patterns(payload) if stop_patterns else None)
+                if not response.get('success'):
+                    self.stats['errors'] += 1
+                elif detect(response, payload, reference):
+                    self.stats['findings'] += 1
+                    self.stats['skipped_confirmed'] += len(payloads) - index - 1
+                    finding = {
+                        'type': kind,
+                        'payload': payload,
+                        'url': url,
+                        'parameter': point.param
+                    }
+                    findings.append(finding)
+                    if on_finding is not None:
+                        on_finding(finding)
+                    return
+
+        async def worker():
+            while True:
+                point = await queue.get()
+                if point is None:
+                    return
+                await test(point)
+
+        async def start(point: InjectionPoint):
+            if point in started:
+                return
+            started.add(point)
+            self.stats['points'] += 1
+            await queue.put(point)
+
+        async def produce():
+            if hasattr(points, '__aiter__'):
+                async for point in points:
+                    await start(point)
+            else:
+                for point in points:
+                    await start(point)
+            for _ in workers:
+                await queue.put(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.max_in_flight)]
+        producer = asyncio.ensure_future(produce())
+        try:
+            await asyncio.gather(producer, *workers)
+        finally:
+            for task in (producer, *workers):
+                task.cancel()
+        return findings
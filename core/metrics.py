@@ -0,0 +1,277 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Tuple, Iterable
+
+# Límites (segundos) de los histogramas de latencia; el último cubre todo
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (key + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == math.inf else repr(bound)
+
+
+class Histogram:
+    """Histograma acumulativo de latencias con límites fijos"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[min(bisect.bisect_left(self.buckets, value), len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Cuantil aproximado (límite superior del bucket que lo contiene)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': {_format_bound(bound): count for bound, count in zip(self.buckets, self.counts)}
+        }
+
+
+class _Timer:
+    """Context manager que observa la duración del bloque en un histograma"""
+
+    __slots__ = ('registry', 'name', 'labels', 'started')
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.labels = {**self.labels, 'error': exc_type.__name__}
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Registro de métricas en proceso: contadores, gauges e histogramas
+
+    Cada métrica se identifica por nombre y etiquetas (módulo, etapa,
+    cola...). Es seguro entre hilos, así que los workers del engine
+    pueden compartirlo. Se exporta en formato texto de Prometheus o en
+    JSON, a un fichero o a un endpoint HTTP local.
+    """
+
+    enabled = True
+
+    def __init__(self, namespace: str = 'kalinova', buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.server = None
+
+    # --- Registro ---
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        key = _labels(labels)
+        with self.lock:
+            series = self.gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels) -> _Timer:
+        """`with metrics.timer('scan_duration_seconds', module='web', stage='execute'):`"""
+        return _Timer(self, name, labels)
+
+    # --- Exportación ---
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de todas las series (etiquetas como dict) apta para JSON"""
+        def series(metrics: Dict[str, Dict[Labels, Any]], value=lambda v: v):
+            return {name: [{'labels': dict(labels), 'value': value(v)} for labels, v in entries.items()]
+                    for name, entries in metrics.items()}
+
+        with self.lock:
+            return {
+                'timestamp': time.time(),
+                'counters': series(self.counters),
+                'gauges': series(self.gauges),
+                'histograms': series(self.histograms, Histogram.to_dict)
+            }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus (0.0.4)"""
+        lines = []
+        with self.lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, entries in sorted(metrics.items()):
+                    full_name = f"{self.namespace}_{name}"
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    for labels, value in entries.items():
+                        lines.append(f"{full_name}{_format_labels(labels)} {value}")
+            for name, entries in sorted(self.histograms.items()):
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# TYPE {full_name} histogram")
+                for labels, histogram in entries.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} "
+                                     f"{cumulative}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def render(self, fmt: str = 'prometheus') -> str:
+        return self.to_json() if fmt == 'json' else self.to_prometheus()
+
+    def write(self, path: str, fmt: str = None):
+        """Vuelca las métricas a un fichero de forma atómica (formato según la extensión)"""
+        fmt = fmt or ('json' if path.endswith('.json') else 'prometheus')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render(fmt))
+        os.replace(tmp_path, path)
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9464) -> ThreadingHTTPServer:
+        """Endpoint HTTP local: /metrics (Prometheus) y /metrics.json"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path not in ('/metrics', '/metrics.json'):
+                    self.send_error(404)
+                    return
+                fmt = 'json' if path.endswith('.json') else 'prometheus'
+                body = registry.render(fmt).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json' if fmt == 'json'
+                                 else 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='nova-metrics', daemon=True).start()
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class NullMetricsRegistry(MetricsRegistry):
+    """Registro desactivado: todas las operaciones son no-ops"""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def set_gauge(self, name: str, value: float, **labels):
+        pass
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def timer(self, name: str, **labels) -> _NullTimer:
+        return _NULL_TIMER
+
+
+# Registro global: desactivado hasta que el engine (o un script) instale uno
+_metrics: MetricsRegistry = NullMetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _metrics
+
+
+def set_metrics(registry: MetricsRegistry = None) -> MetricsRegistry:
+    """Instala el registro global (None lo desactiva) y devuelve el anterior"""
+    global _metrics
+    previous = _metrics
+    _metrics = registry if registry is not None else NullMetricsRegistry()
+    return previous
@@ -0,0 +1,165 @@
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional, Callable
+
+from core.metrics import get_metrics
+
+
+@dataclass
+class NmapScript:
+    id: str
+    output: str
+
+
+@dataclass
+class NmapService:
+    name: str = 'unknown'
+    product: str = ''
+    version: str = ''
+    extrainfo: str = ''
+    tunnel: str = ''
+    method: str = ''
+    confidence: int = 0
+
+
+@dataclass
+class NmapPort:
+    port: int
+    protocol: str
+    state: str
+    reason: str = ''
+    service: NmapService = field(default_factory=NmapService)
+    scripts: List[NmapScript] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Mismo formato que NetworkScanner.parse_nmap_output, más protocolo y versión"""
+        return {
+            'port': str(self.port),
+            'protocol': self.protocol,
+            'state': self.state,
+            'service': self.service.name,
+            'product': self.service.product,
+            'version': self.service.version
+        }
+
+
+@dataclass
+class NmapHost:
+    address: str
+    status: str = 'unknown'
+    hostnames: List[str] = field(default_factory=list)
+    ports: List[NmapPort] = field(default_factory=list)
+    os_matches: List[str] = field(default_factory=list)
+    scripts: List[NmapScript] = field(default_factory=list)
+
+    def open_ports(self) -> List[NmapPort]:
+        return [port for port in self.ports if port.state.startswith('open')]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class NmapXMLStreamParser:
+    """Parser incremental de la salida `-oX -` de nmap
+
+    Se alimenta con trozos de XML conforme nmap los escribe y emite un
+    NmapHost en cuanto se cierra cada elemento <host>, sin esperar a que
+    termine el escaneo. Los elementos procesados se liberan para que la
+    memoria no crezca con el número de hosts.
+    """
+
+    def __init__(self, on_host: Callable[[NmapHost], Any] = None):
+        self.on_host = on_host
+        self.parser = ET.XMLPullParser(events=('start', 'end'))
+        self.root = None
+        self.hosts: List[NmapHost] = []
+        self.run_stats: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def feed(self, data: str):
+        """Procesa un fragmento de XML (por ejemplo, una línea de stdout)"""
+        if self.error:
+            return
+        try:
+            self.parser.feed(data if data.endswith('\n') else data + '\n')
+            self.process_events()
+        except ET.ParseError as e:
+            self.error = str(e)
+
+    def close(self) -> List[NmapHost]:
+        """Termina el parseo y devuelve todos los hosts encontrados"""
+        if not self.error:
+            try:
+                self.parser.close()
+                self.process_events()
+            except ET.ParseError as e:
+                self.error = str(e)
+        return self.hosts
+
+    def process_events(self):
+        for event, element in self.parser.read_events():
+            if event == 'start':
+                if self.root is None:
+                    self.root = element
+                continue
+            if element.tag == 'host':
+                with get_metrics().timer('parse_seconds', parser='nmap_xml'):
+                    host = self.parse_host(element)
+                self.hosts.append(host)
+                if self.on_host is not None:
+                    self.on_host(host)
+                # Liberar el subárbol ya procesado
+                element.clear()
+                if self.root is not None:
+                    try:
+                        self.root.remove(element)
+                    except ValueError:
+                        pass
+            elif element.tag == 'finished':
+                self.run_stats = dict(element.attrib)
+
+    @staticmethod
+    def parse_scripts(element: ET.Element) -> List[NmapScript]:
+        return [NmapScript(script.get('id', ''), script.get('output', ''))
+                for script in element.findall('script')]
+
+    def parse_host(self, element: ET.Element) -> NmapHost:
+        addresses = element.findall('address')
+        address = next((a.get('addr') for a in addresses if a.get('addrtype') in ('ipv4', 'ipv6')),
+                       addresses[0].get('addr') if addresses else '')
+        status = element.find('status')
+
+        host = NmapHost(
+            address=address,
+            status=status.get('state', 'unknown') if status is not None else 'unknown',
+            hostnames=[h.get('name') for h in element.findall('hostnames/hostname')],
+            os_matches=[m.get('name') for m in element.findall('os/osmatch')]
+        )
+
+        hostscript = element.find('hostscript')
+        if hostscript is not None:
+            host.scripts = self.parse_scripts(hostscript)
+
+        for port_el in element.findall('ports/port'):
+            state = port_el.find('state')
+            service_el = port_el.find('service')
+            service = NmapService()
+            if service_el is not None:
+                service = NmapService(
+                    name=service_el.get('name', 'unknown'),
+                    product=service_el.get('product', ''),
+                    version=service_el.get('version', ''),
+                    extrainfo=service_el.get('extrainfo', ''),
+                    tunnel=service_el.get('tunnel', ''),
+                    method=service_el.get('method', ''),
+                    confidence=int(service_el.get('conf', 0))
+                )
+            host.ports.append(NmapPort(
+                port=int(port_el.get('portid', 0)),
+                protocol=port_el.get('protocol', 'tcp'),
+                state=state.get('state', 'unknown') if state is not None else 'unknown',
+                reason=state.get('reason', '') if state is not None else '',
+                service=service,
+                scripts=self.parse_scripts(port_el)
+            ))
+        return host
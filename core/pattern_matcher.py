@@ -0,0 +1,85 @@
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick es opcional
+    ahocorasick = None
+
+
+class PatternMatcher:
+    """Busca muchas subcadenas a la vez en un texto
+
+    Con pyahocorasick instalado compila un autómata Aho-Corasick y recorre
+    el texto una sola vez sea cual sea el número de patrones. Sin él, el
+    texto se pliega una vez a minúsculas y cada patrón se busca con
+    str.find (en C), que para pocos patrones es igual de rápido.
+
+    Las posiciones devueltas se refieren al texto plegado, que coincide con
+    el original salvo para los pocos caracteres cuya minúscula cambia de
+    longitud.
+    """
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        self.patterns = list(dict.fromkeys(pattern for pattern in patterns if pattern))
+        self.folded = [self.fold(pattern) for pattern in self.patterns]
+        self.automaton = None
+        if ahocorasick is not None and self.patterns:
+            self.automaton = ahocorasick.Automaton()
+            for pattern, folded in zip(self.patterns, self.folded):
+                self.automaton.add_word(folded, (len(folded), pattern))
+            self.automaton.make_automaton()
+
+    def fold(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(posición, patrón) de cada aparición, solapadas incluidas"""
+        if not self.patterns or not text:
+            return
+        text = self.fold(text)
+        if self.automaton is not None:
+            for end, (length, pattern) in self.automaton.iter(text):
+                yield end - length + 1, pattern
+            return
+        found = []
+        for pattern, folded in zip(self.patterns, self.folded):
+            start = text.find(folded)
+            while start != -1:
+                found.append((start, pattern))
+                start = text.find(folded, start + 1)
+        yield from sorted(found)
+
+    def findall(self, text: str) -> List[Tuple[int, str]]:
+        return list(self.finditer(text))
+
+    def search(self, text: str) -> Optional[Tuple[int, str]]:
+        """Primera aparición de cualquier patrón (None si no hay)"""
+        if not self.patterns or not text:
+            return None
+        if self.automaton is not None:
+            return next(self.finditer(text), None)
+        text = self.fold(text)
+        best = None
+        for pattern, folded in zip(self.patterns, self.folded):
+            start = text.find(folded, 0, best[0] + len(folded) if best else len(text))
+            if start != -1 and (best is None or start < best[0]):
+                best = (start, pattern)
+        return best
+
+    def matches(self, text: str) -> Set[str]:
+        """Patrones distintos presentes en el texto"""
+        if self.automaton is not None:
+            return {pattern for _, pattern in self.finditer(text)}
+        text = self.fold(text)
+        return {pattern for pattern, folded in zip(self.patterns, self.folded) if folded in text}
+
+    def contains_any(self, text: str) -> bool:
+        return self.search(text) is not None
+
+
+@lru_cache(maxsize=256)
+def get_matcher(patterns: Tuple[str, ...], ignore_case: bool = True) -> PatternMatcher:
+    """Matcher compilado y compartido para una tupla de patrones"""
+    return PatternMatcher(patterns, ignore_case)
@@ -0,0 +1,248 @@
+import asyncio
+import inspect
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+
+from core.metrics import get_metrics
+
+DEFAULT_MAX_PROCESSES = os.cpu_count() or 4
+
+# Un único runner por proceso: el límite de hijos vale para todos los hilos y event loops
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_process_runner(max_processes: int = None) -> 'AsyncProcessRunner':
+    """Devuelve el runner compartido del proceso (el límite lo fija la primera llamada)
+
+    run_scan_many ejecuta cada escaneo en su propio hilo con su propio
+    event loop; todos comparten este runner y su límite de procesos.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncProcessRunner(max_processes or DEFAULT_MAX_PROCESSES)
+        return _runner
+
+
+class ProcessSlots:
+    """Semáforo de procesos compartido entre hilos y event loops
+
+    Como threading.BoundedSemaphore, pero la espera es un future del loop
+    que pide el hueco: no bloquea ningún hilo. Los huecos se entregan en
+    orden de llegada.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.used = 0
+        self.lock = threading.Lock()
+        self.waiters = deque()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.used < self.limit and not self.waiters:
+                self.used += 1
+                return
+            future = loop.create_future()
+            self.waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.lock:
+                try:
+                    self.waiters.remove((loop, future))
+                    handed = False
+                except ValueError:
+                    handed = True
+            # Ya se nos entregó el hueco: si el future llegó a resolverse hay que devolverlo
+            # aquí; si se canceló antes, lo devuelve grant()
+            if handed and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self.lock:
+            while self.waiters:
+                loop, future = self.waiters.popleft()
+                try:
+                    # El hueco pasa al siguiente sin liberarse
+                    loop.call_soon_threadsafe(self.grant, future)
+                    return
+                except RuntimeError:
+                    # Su event loop ya se cerró
+                    continue
+            if self.used <= 0:
+                raise ValueError('release() sin acquire()')
+            self.used -= 1
+
+    def grant(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class AsyncProcessRunner:
+    def __init__(self, max_processes: int = DEFAULT_MAX_PROCESSES, kill_grace: float = 3.0):
+        self.max_processes = max_processes
+        self.kill_grace = kill_grace
+        self.line_limit = 2 ** 20
+        self.slots = ProcessSlots(max_processes)
+        # Un hilo por proceso vivo, bloqueado en wait4 hasta que termina
+        self.wait_pool = ThreadPoolExecutor(max_workers=max_processes, thread_name_prefix='nova-wait')
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            'commands': 0,
+            'timeouts': 0,
+            'failures': 0,
+            'wall_time': 0.0,
+            'cpu_time': 0.0
+        }
+
+    async def run(self, command: List[str], timeout: float = 300,
+                  line_callback: Callable[[str], Any] = None) -> Dict[str, Any]:
+        """Ejecuta un comando sin bloquear el event loop
+
+        Cada línea de stdout se entrega a `line_callback` (función o corutina)
+        en cuanto llega. Si vence el timeout o se cancela la tarea se mata
+        el grupo de procesos completo.
+        """
+        metrics = get_metrics()
+        # Profundidad de la cola de procesos a la espera de un hueco
+        metrics.add_gauge('subprocess_waiting', 1)
+        try:
+            await self.slots.acquire()
+        finally:
+            metrics.add_gauge('subprocess_waiting', -1)
+        metrics.set_gauge('subprocess_running', self.running)
+        try:
+            return await self._run(command, timeout, line_callback)
+        finally:
+            self.slots.release()
+            metrics.set_gauge('subprocess_running', self.running)
+
+    @property
+    def running(self) -> int:
+        """Procesos en marcha en todo el proceso (todos los event loops)"""
+        return self.slots.used
+
+    def shutdown(self):
+        """Libera los hilos de espera (al salir del programa)"""
+        self.wait_pool.shutdown(wait=False)
+
+    async def _run(self, command: List[str], timeout: float, line_callback) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            # Popen + wait4 propio en lugar de create_subprocess_exec para obtener
+            # el rusage exacto del hijo (CPU de usuario + sistema)
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True
+            )
+        except (OSError, ValueError) as e:
+            with self.stats_lock:
+                self.stats['failures'] += 1
+            get_metrics().inc('subprocess_total', command=os.path.basename(command[0]) if command else '',
+                              status='failed')
+            return {'success': False, 'error': str(e)}
+
+        exit_future = loop.run_in_executor(self.wait_pool, os.wait4, process.pid, 0)
+        stdout = await self.open_reader(process.stdout)
+        stderr = await self.open_reader(process.stderr)
+        stderr_task = asyncio.ensure_future(stderr.read())
+        stdout_lines = []
+
+        async def consume_stdout():
+            async for raw in stdout:
+                line = raw.decode(errors='replace')
+                stdout_lines.append(line)
+                if line_callback is not None:
+                    result = line_callback(line.rstrip('\n'))
+                    if inspect.isawaitable(result):
+                        await result
+            return await asyncio.shield(exit_future)
+
+        try:
+            _, status, rusage = await asyncio.wait_for(consume_stdout(), timeout=timeout)
+        except asyncio.TimeoutError:
+            rusage = await self.kill(process, exit_future)
+            stderr_task.cancel()
+            with self.stats_lock:
+                self.stats['timeouts'] += 1
+            return self.account(command, started, rusage, {
+                'success': False,
+                'error': 'Timeout expired',
+                'timed_out': True,
+                'stdout': ''.join(stdout_lines)
+            })
+        except BaseException:
+            # Cancelación o error del parser: no dejar procesos huérfanos
+            await asyncio.shield(self.kill(process, exit_future))
+            stderr_task.cancel()
+            raise
+
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return self.account(command, started, rusage, {
+            'success': True,
+            'stdout': ''.join(stdout_lines),
+            'stderr': (await stderr_task).decode(errors='replace'),
+            'returncode': process.returncode
+        })
+
+    async def open_reader(self, pipe) -> asyncio.StreamReader:
+        """Conecta un pipe del proceso a un StreamReader del event loop"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=self.line_limit)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        return reader
+
+    async def kill(self, process: subprocess.Popen, exit_future: asyncio.Future):
+        """Termina el grupo de procesos: SIGTERM y SIGKILL tras el periodo de gracia"""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            if exit_future.done():
+                break
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                await asyncio.wait_for(asyncio.shield(exit_future), timeout=self.kill_grace)
+            except asyncio.TimeoutError:
+                continue
+        try:
+            _, status, rusage = await exit_future
+        except ChildProcessError:
+            return None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return rusage
+
+    def account(self, command: List[str], started: float, rusage, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Añade tiempos de pared y CPU al resultado y a las estadísticas globales"""
+        wall_time = time.monotonic() - started
+        cpu_time = rusage.ru_utime + rusage.ru_stime if rusage else None
+        result['wall_time'] = wall_time
+        result['cpu_time'] = cpu_time
+        with self.stats_lock:
+            self.stats['commands'] += 1
+            self.stats['wall_time'] += wall_time
+            self.stats['cpu_time'] += cpu_time or 0.0
+
+        metrics = get_metrics()
+        if metrics.enabled:
+            name = os.path.basename(command[0])
+            status = 'timeout' if result.get('timed_out') else 'ok'
+            metrics.observe('subprocess_seconds', wall_time, command=name, status=status)
+            metrics.inc('subprocess_cpu_seconds_total', cpu_time or 0.0, command=name)
+            metrics.inc('subprocess_total', command=name, status=status)
+        return result
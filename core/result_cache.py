@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+# Segundos de validez por tipo de resultado
+DEFAULT_TTLS = {
+    'active_hosts': 3600,
+    'port_scan': 86400,
+    'service_detection': 86400,
+    'os_detection': 7 * 86400,
+    'dir_enumeration': 86400,
+    'module': 6 * 3600,
+    'default': 6 * 3600
+}
+
+# Claves de configuración que no cambian el resultado de un escaneo
+VOLATILE_CONFIG_KEYS = {'checkpoint_dir', 'cache_path', 'max_processes', 'max_in_flight', 'timeout'}
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Hash estable de la configuración que afecta a los resultados"""
+    relevant = {k: v for k, v in config.items() if k not in VOLATILE_CONFIG_KEYS}
+    encoded = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """Caché persistente (SQLite) de resultados de escaneo
+
+    Cada entrada se indexa por target, módulo, hash de configuración,
+    tipo de resultado y una clave opcional (p. ej. el host o la URL), de
+    forma que un re-escaneo puede reutilizar lo que sigue vigente y
+    sondear solo lo caducado o nuevo.
+    """
+
+    def __init__(self, path: str = 'outputs/scan_cache.db', ttls: Dict[str, int] = None):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                target TEXT NOT NULL,
+                module TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                result_type TEXT NOT NULL,
+                key TEXT NOT NULL DEFAULT '',
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (target, module, config_hash, result_type, key)
+            )
+        ''')
+        self.db.commit()
+
+    def ttl(self, result_type: str) -> int:
+        return self.ttls.get(result_type, self.ttls['default'])
+
+    def get(self, target: str, module: str, cfg_hash: str, result_type: str, key: str = '') -> Optional[Any]:
+        """Valor cacheado si no ha caducado, None en caso contrario"""
+        with self.lock:
+            row = self.db.execute(
+                'SELECT value, updated_at FROM results WHERE target=? AND module=? AND config_hash=? '
+                'AND result_type=? AND key=?',
+                (target, module, cfg_hash, result_type, key)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl(result_type):
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, target: str, module: str, cfg_hash: str, result_type: str, value: Any, key: str = ''):
+        """Guarda (o reemplaza) un resultado"""
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (target, module, cfg_hash, result_type, key, json.dumps(value, default=str), time.time())
+            )
+            self.db.commit()
+        self.stats['writes'] += 1
+
+    def invalidate(self, target: str, module: str = None):
+        """Elimina los resultados de un target (opcionalmente solo de un módulo)"""
+        with self.lock:
+            if module:
+                self.db.execute('DELETE FROM results WHERE target=? AND module=?', (target, module))
+            else:
+                self.db.execute('DELETE FROM results WHERE target=?', (target,))
+            self.db.commit()
+
+    def purge_expired(self) -> int:
+        """Borra entradas caducadas; devuelve cuántas"""
+        now = time.time()
+        removed = 0
+        with self.lock:
+            rows = self.db.execute('SELECT DISTINCT result_type FROM results').fetchall()
+            for (result_type,) in rows:
+                cursor = self.db.execute(
+                    'DELETE FROM results WHERE result_type=? AND updated_at < ?',
+                    (result_type, now - self.ttl(result_type))
+                )
+                removed += cursor.rowcount
+            self.db.commit()
+        return removed
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Any, Iterator, Optional, TextIO
+
+
+class ResultStore:
+    """Almacén de resultados en streaming (SQLite, modo WAL)
+
+    Cada resultado parcial, hallazgo o análisis se guarda como un registro
+    en cuanto se produce, indexado por ejecución, target, módulo y
+    severidad. Un fallo al final del escaneo no pierde lo ya escrito, la
+    memoria no crece con el número de targets y los reportes se generan
+    recorriendo el almacén con un cursor.
+
+    Los registros se confirman por lotes: cada `commit_every` registros o
+    `commit_interval` segundos, y siempre al cerrar una ejecución, en
+    flush() y en close(). Un corte deja como mucho el último lote sin
+    escribir, nunca una sección a medio reemplazar.
+    """
+
+    def __init__(self, path: str = 'outputs/results.db', commit_every: int = 100,
+                 commit_interval: float = 1.0):
+        self.path = path
+        self.lock = threading.Lock()
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.last_commit = time.monotonic()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                status TEXT NOT NULL DEFAULT 'running',
+                metadata TEXT NOT NULL DEFAULT '{}'
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                target TEXT NOT NULL,
+                module TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL DEFAULT '',
+                severity TEXT,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS records_run ON records (run_id, kind);
+            CREATE INDEX IF NOT EXISTS records_target ON records (target, module);
+            CREATE INDEX IF NOT EXISTS records_severity ON records (severity) WHERE severity IS NOT NULL;
+            CREATE UNIQUE INDEX IF NOT EXISTS records_finding ON records (run_id, key) WHERE kind = 'finding';
+        ''')
+        self.db.commit()
+
+    # --- Escritura ---
+
+    def written(self, count: int = 1):
+        """Cuenta registros sin confirmar y confirma el lote si toca (con el lock tomado)"""
+        self.pending += count
+        if self.pending >= self.commit_every or time.monotonic() - self.last_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        """Confirma lo pendiente (con el lock tomado)"""
+        self.db.commit()
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def flush(self):
+        """Confirma en disco los registros pendientes"""
+        with self.lock:
+            self.commit()
+
+    def start_run(self, target: str, metadata: Dict[str, Any] = None) -> str:
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        with self.lock:
+            self.db.execute('INSERT INTO runs (run_id, target, started_at, metadata) VALUES (?, ?, ?, ?)',
+                            (run_id, target, time.time(), json.dumps(metadata or {}, default=str)))
+            self.commit()
+        return run_id
+
+    def finish_run(self, run_id: str, status: str = 'completed'):
+        with self.lock:
+            self.db.execute('UPDATE runs SET finished_at=?, status=? WHERE run_id=?', (time.time(), status, run_id))
+            self.commit()
+
+    def append(self, run_id: str, target: str, module: str, kind: str, data: Any,
+               key: str = '', severity: str = None) -> bool:
+        """Añade un registro (se confirma con su lote); False si era un hallazgo repetido"""
+        with self.lock:
+            inserted = self.insert(run_id, target, module, kind, json.dumps(data, default=str), key, severity)
+            self.written(inserted)
+        return inserted > 0
+
+    def insert(self, run_id: str, target: str, module: str, kind: str, data: str,
+               key: str = '', severity: str = None) -> int:
+        """INSERT de un registro ya serializado (con el lock tomado); devuelve las filas insertadas"""
+        return self.db.execute(
+            'INSERT OR IGNORE INTO records (run_id, target, module, kind, key, severity, data, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (run_id, target, module, kind, key, severity, data, time.time())
+        ).rowcount
+
+    def append_result(self, run_id: str, target: str, module: str, result: Dict[str, Any]):
+        """Guarda el resultado de un scanner, una sección (clave de primer nivel) por registro
+
+        Las secciones ya guardadas de la misma ejecución y módulo se
+        reemplazan, así que un scanner puede ir guardando cada check según
+        termina y completar al final sin duplicar secciones. El borrado y la
+        inserción de todas las secciones van bajo el mismo lock y en la
+        misma transacción: nunca se confirma una sección borrada sin su
+        reemplazo.
+        """
+        # Serializar antes de tocar la base: un valor que falle no deja secciones borradas
+        encoded = {section: json.dumps(value, default=str) for section, value in result.items()}
+        if not encoded:
+            return
+        with self.lock:
+            for section, data in encoded.items():
+                self.db.execute("DELETE FROM records WHERE run_id=? AND target=? AND module=? "
+                                "AND kind='result' AND key=?", (run_id, target, module, section))
+                self.insert(run_id, target, module, 'result', data, key=section)
+            self.written(len(encoded))
+
+    def append_finding(self, run_id: str, target: str, module: str, finding: Dict[str, Any]) -> bool:
+        return self.append(run_id, target, module, 'finding', finding,
+                           key=finding.get('fingerprint', ''), severity=finding.get('severity'))
+
+    # --- Consultas ---
+
+    def runs(self, target: str = None, run_id: str = None) -> Iterator[Dict[str, Any]]:
+        filters = {'target': target, 'run_id': run_id}
+        clauses = [f"{column}=?" for column, value in filters.items() if value is not None]
+        query = 'SELECT run_id, target, started_at, finished_at, status, metadata FROM runs'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        for row in self.db.execute(query + ' ORDER BY started_at', [v for v in filters.values() if v is not None]):
+            yield {'run_id': row[0], 'target': row[1], 'started_at': row[2], 'finished_at': row[3],
+                   'status': row[4], 'metadata': json.loads(row[5])}
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return next(self.runs(run_id=run_id), None)
+
+    def records(self, run_id: str = None, target: str = None, module: str = None, kind: str = None,
+                severity: str = None) -> Iterator[Dict[str, Any]]:
+        """Registros filtrados, leídos con un cursor (sin cargarlos todos)"""
+        filters = {'run_id': run_id, 'target': target, 'module': module, 'kind': kind, 'severity': severity}
+        clauses = [f"{column}=?" for column, value in filters.items() if value is not None]
+        query = 'SELECT run_id, target, module, kind, key, severity, data, created_at FROM records'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        cursor = self.db.cursor()
+        for row in cursor.execute(query + ' ORDER BY id', [v for v in filters.values() if v is not None]):
+            yield {'run_id': row[0], 'target': row[1], 'module': row[2], 'kind': row[3], 'key': row[4],
+                   'severity': row[5], 'data': json.loads(row[6]), 'created_at': row[7]}
+
+    def severity_counts(self, run_id: str) -> Dict[str, int]:
+        rows = self.db.execute(
+            "SELECT severity, COUNT(*) FROM records WHERE run_id=? AND kind='finding' GROUP BY severity",
+            (run_id,)
+        )
+        return {severity or 'info': count for severity, count in rows}
+
+    def write_report(self, run_id: str, fp: TextIO, indent: int = 2):
+        """Escribe el reporte JSON de una ejecución registro a registro"""
+        run = self.get_run(run_id)
+        if run is None:
+            raise KeyError(f"Ejecución desconocida: {run_id}")
+        pad = ' ' * indent
+
+        def dump(value: Any, level: int) -> str:
+            text = json.dumps(value, indent=indent, default=str)
+            return text.replace('\n', '\n' + pad * level)
+
+        fp.write('{\n')
+        for field in ('run_id', 'target', 'started_at', 'finished_at', 'status'):
+            fp.write(f"{pad}{json.dumps(field)}: {json.dumps(run[field])},\n")
+        fp.write(f"{pad}\"summary\": {dump(self.severity_counts(run_id), 1)},\n")
+
+        # Resultados agrupados por módulo (los registros de un módulo se escriben juntos)
+        fp.write(f"{pad}\"results\": {{")
+        current = None
+        first_section = True
+        modules = [row[0] for row in self.db.execute(
+            "SELECT DISTINCT module FROM records WHERE run_id=? AND kind='result' ORDER BY module", (run_id,))]
+        for module in modules:
+            fp.write(f"{',' if current is not None else ''}\n{pad * 2}{json.dumps(module)}: {{")
+            current, first_section = module, True
+            for record in self.records(run_id=run_id, module=module, kind='result'):
+                fp.write(f"{'' if first_section else ','}\n{pad * 3}{json.dumps(record['key'])}: "
+                         f"{dump(record['data'], 3)}")
+                first_section = False
+            fp.write(f"\n{pad * 2}}}")
+        fp.write(f"\n{pad}}},\n" if modules else "},\n")
+
+        # Hosts emitidos por las fases de nmap: cada dirección con sus observaciones en orden
+        fp.write(f"{pad}\"hosts\": {{")
+        current = None
+        for key, module, data in self.db.execute(
+                "SELECT key, module, data FROM records WHERE run_id=? AND kind='host' ORDER BY key, id", (run_id,)):
+            if key != current:
+                if current is not None:
+                    fp.write(f"\n{pad * 2}],")
+                fp.write(f"\n{pad * 2}{json.dumps(key)}: [")
+                first = True
+            observation = {'module': module, **json.loads(data)}
+            fp.write(f"{'' if first else ','}\n{pad * 3}{dump(observation, 3)}")
+            current, first = key, False
+        fp.write(f"\n{pad * 2}]\n{pad}}},\n" if current is not None else "},\n")
+
+        for kind, field in (('analysis', 'analysis'), ('finding', 'vulnerabilities')):
+            fp.write(f"{pad}\"{field}\": [")
+            first = True
+            for record in self.records(run_id=run_id, kind=kind):
+                fp.write(f"{'' if first else ','}\n{pad * 2}{dump(record['data'], 2)}")
+                first = False
+            fp.write(f"\n{pad}]" if not first else "]")
+            fp.write(',\n' if kind == 'analysis' else '\n')
+        fp.write('}\n')
+
+    def close(self):
+        with self.lock:
+            self.commit()
+            self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='KaliNova - Consultas al almacén de resultados')
+    parser.add_argument('store', nargs='?', default='outputs/results.db', help='Base de datos de resultados')
+    parser.add_argument('--runs', action='store_true', help='Listar ejecuciones')
+    parser.add_argument('--report', metavar='RUN_ID', help='Reporte JSON completo de una ejecución')
+    parser.add_argument('--run', dest='run_id', help='Filtrar por ejecución')
+    parser.add_argument('--target', help='Filtrar por target')
+    parser.add_argument('--module', help='Filtrar por módulo')
+    parser.add_argument('--kind', choices=['result', 'finding', 'analysis', 'host'], help='Filtrar por tipo de registro')
+    parser.add_argument('--severity', help='Filtrar por severidad')
+
+    args = parser.parse_args()
+    store = ResultStore(args.store)
+    try:
+        if args.runs:
+            for run in store.runs(args.target):
+                print(json.dumps(run, default=str))
+        elif args.report:
+            store.write_report(args.report, sys.stdout)
+        else:
+            # NDJSON: un registro por línea
+            for record in store.records(args.run_id, args.target, args.module, args.kind, args.severity):
+                print(json.dumps(record, default=str))
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
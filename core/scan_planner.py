@@ -0,0 +1,157 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Tuple
+
+# Sondas por segundo y worker aproximadas para estimar la duración
+PROBE_RATES = {
+    'syn': 2000.0,
+    'connect': 500.0,
+    'udp': 20.0
+}
+TOTAL_PORTS = 65535
+
+
+@dataclass
+class PortScanTask:
+    phase: str
+    hosts: List[str]
+    tcp: bool = True
+    udp: bool = False
+    ports: str = ''
+    top_ports: int = 0
+    tcp_method: str = 'connect'
+    probes: int = 0
+    estimated_seconds: float = 0.0
+
+    def nmap_args(self) -> List[str]:
+        """Una sola pasada de nmap con los protocolos combinados"""
+        args = ['-Pn', '--open']
+        if self.tcp:
+            args.append('-sS' if self.tcp_method == 'syn' else '-sT')
+        if self.udp:
+            args.append('-sU')
+        if self.top_ports:
+            args += ['--top-ports', str(self.top_ports)]
+        else:
+            args += ['-p', self.ports]
+        return args
+
+
+@dataclass
+class PortScanPlan:
+    tasks: List[PortScanTask] = field(default_factory=list)
+    workers: int = 1
+    started: float = field(default_factory=time.monotonic)
+    completed_probes: int = 0
+    completed_tasks: int = 0
+
+    @property
+    def total_probes(self) -> int:
+        return sum(task.probes for task in self.tasks)
+
+    def estimated_total(self) -> float:
+        """Duración estimada del plan completo con `workers` tareas en paralelo"""
+        return sum(task.estimated_seconds for task in self.tasks) / max(self.workers, 1)
+
+    def mark_done(self, task: PortScanTask):
+        self.completed_tasks += 1
+        self.completed_probes += task.probes
+
+    def eta(self) -> float:
+        """Segundos restantes: usa la velocidad medida en cuanto hay tareas completadas"""
+        remaining = self.total_probes - self.completed_probes
+        elapsed = time.monotonic() - self.started
+        if self.completed_probes and elapsed > 0:
+            return remaining / (self.completed_probes / elapsed)
+        return self.estimated_total()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'tasks': len(self.tasks),
+            'completed_tasks': self.completed_tasks,
+            'workers': self.workers,
+            'total_probes': self.total_probes,
+            'estimated_seconds': round(self.estimated_total(), 1),
+            'eta_seconds': round(self.eta(), 1),
+            'elapsed_seconds': round(time.monotonic() - self.started, 1)
+        }
+
+
+class PortScanPlanner:
+    """Planifica el escaneo de puertos sobre los hosts vivos
+
+    - Solo escanea hosts que respondieron al ping sweep (con -Pn)
+    - Combina TCP (SYN si hay privilegios, connect si no) y UDP en una pasada;
+      con udp_top_ports distinto de top_ports (p. ej. menos puertos UDP, que
+      son lentos) UDP va en una tarea aparte
+    - UDP solo con privilegios: nmap rechaza -sU sin root y en una pasada
+      combinada se perderían también los resultados TCP
+    - Primero top-ports; la expansión a 1-65535 es opcional y vuelve a
+      cubrir los top-ports (nmap no expone su lista): los resultados se
+      deduplican al unirlos
+    - Reparte hosts y rangos de puertos entre workers paralelos
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.top_ports = config.get('top_ports', 1000)
+        self.full_scan = config.get('full_port_scan', False)
+        self.udp = config.get('udp_scan', True)
+        if self.udp and not self.is_privileged():
+            print("[!] El escaneo UDP (-sU) requiere root: se omite")
+            self.udp = False
+        # Por defecto la misma lista que TCP: una sola pasada combinada
+        self.udp_top_ports = config.get('udp_top_ports', self.top_ports)
+        self.workers = config.get('port_scan_workers', 4)
+        self.hosts_per_task = config.get('hosts_per_task', 16)
+        self.port_chunk_size = config.get('port_chunk_size', 16384)
+        self.tcp_method = config.get('tcp_method') or ('syn' if self.is_privileged() else 'connect')
+
+    @staticmethod
+    def is_privileged() -> bool:
+        return hasattr(os, 'geteuid') and os.geteuid() == 0
+
+    @staticmethod
+    def chunk(items: List[str], size: int) -> List[List[str]]:
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def port_ranges(self) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.port_chunk_size - 1, TOTAL_PORTS))
+                for start in range(1, TOTAL_PORTS + 1, self.port_chunk_size)]
+
+    def estimate(self, task: PortScanTask, tcp_count: int, udp_count: int) -> PortScanTask:
+        hosts = len(task.hosts)
+        task.probes = hosts * (tcp_count + udp_count)
+        task.estimated_seconds = hosts * (
+            tcp_count / PROBE_RATES[self.tcp_method] + udp_count / PROBE_RATES['udp']
+        )
+        return task
+
+    def plan(self, live_hosts: List[str]) -> PortScanPlan:
+        """Genera las tareas de escaneo para los hosts vivos"""
+        plan = PortScanPlan(workers=self.workers)
+        host_groups = self.chunk(sorted(set(live_hosts)), self.hosts_per_task)
+        full_tasks = []
+
+        for hosts in host_groups:
+            # Fase 1: top-ports, TCP y UDP en la misma pasada cuando comparten lista
+            if self.udp and self.udp_top_ports == self.top_ports:
+                task = PortScanTask('top', hosts, udp=True, top_ports=self.top_ports,
+                                    tcp_method=self.tcp_method)
+                plan.tasks.append(self.estimate(task, self.top_ports, self.top_ports))
+            else:
+                task = PortScanTask('top', hosts, top_ports=self.top_ports, tcp_method=self.tcp_method)
+                plan.tasks.append(self.estimate(task, self.top_ports, 0))
+                if self.udp and self.udp_top_ports:
+                    udp_task = PortScanTask('top', hosts, tcp=False, udp=True, top_ports=self.udp_top_ports)
+                    plan.tasks.append(self.estimate(udp_task, 0, self.udp_top_ports))
+
+            # Fase 2 (opcional): rango TCP completo troceado entre workers
+            if self.full_scan:
+                for start, end in self.port_ranges():
+                    task = PortScanTask('full', hosts, ports=f"{start}-{end}", tcp_method=self.tcp_method)
+                    full_tasks.append(self.estimate(task, end - start + 1, 0))
+
+        # Todos los top-ports antes que la expansión: resultados útiles cuanto antes
+        plan.tasks.extend(full_tasks)
+        return plan
@@ -1,10 +1,20 @@
 import asyncio
 import aiohttp
-import subprocess
+import codecs
+import hashlib
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Awaitable
 from concurrent.futures import ThreadPoolExecutor
+from core.process_runner import get_process_runner
+from core.http_client import HTTPClientManager
+from core.result_cache import config_hash
+from core.pattern_matcher import get_matcher
+
+# Límite por defecto de bytes de cuerpo capturados por petición
+DEFAULT_MAX_BODY_BYTES = 256 * 1024
+BODY_CHUNK_SIZE = 16 * 1024
 
 class BaseScanner:
     def __init__(self, target: str, config: Dict[str, Any]):
@@ -12,40 +22,172 @@ class BaseScanner:
         self.config = config
         self.results = {}
         self.start_time = datetime.now()
+        self.http = None
+        self.cache = None
+        self.body_analysis = {}
+        # Destino de los resultados parciales: result_sink(tipo, sección, valor)
+        self.result_sink: Callable[[str, str, Any], Any] = None
+        self.streamed: Dict[str, Any] = {}
     
     async def run_scan(self):
         """Método base para ejecutar escaneos"""
         raise NotImplementedError("Debe implementar run_scan")
     
-    def execute_command(self, command: List[str]) -> Dict[str, Any]:
-        """Ejecuta comandos del sistema de forma segura"""
-        try:
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                timeout=self.config.get('timeout', 300)
-            )
-            return {
-                'success': True,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'returncode': result.returncode
-            }
-        except subprocess.TimeoutExpired:
-            return {'success': False, 'error': 'Timeout expired'}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+    def emit(self, kind: str, section: str, value: Any):
+        """Entrega un resultado parcial a result_sink en cuanto se produce"""
+        if kind == 'result':
+            self.streamed[section] = value
+        if self.result_sink is not None:
+            self.result_sink(kind, section, value)
+    
+    async def gather_checks(self, *checks: Awaitable[Dict[str, Any]]) -> List[Any]:
+        """Ejecuta los checks en paralelo y emite las secciones de cada uno según termina"""
+        async def run(check: Awaitable[Dict[str, Any]]):
+            result = await check
+            if isinstance(result, dict):
+                for section, value in result.items():
+                    self.emit('result', section, value)
+            return result
+        return await asyncio.gather(*[run(check) for check in checks], return_exceptions=True)
+    
+    def compile_results(self, results: List[Any]) -> Dict[str, Any]:
+        """Combina los resultados de las tareas del escaneo"""
+        compiled = {'target': self.target, 'errors': []}
+        for result in results:
+            if isinstance(result, BaseException):
+                compiled['errors'].append(str(result))
+            elif isinstance(result, dict):
+                compiled.update(result)
+        compiled['duration'] = (datetime.now() - self.start_time).total_seconds()
+        return compiled
+    
+    @property
+    def module_name(self) -> str:
+        return self.__class__.__name__.replace('Scanner', '').lower()
+    
+    def cache_get(self, result_type: str, key: str = '') -> Any:
+        """Resultado vigente en la caché persistente (None si no hay caché o caducó)"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.target, self.module_name, config_hash(self.config), result_type, key)
     
-    async def async_http_request(self, session: aiohttp.ClientSession, url: str) -> Dict[str, Any]:
-        """Realiza peticiones HTTP asíncronas"""
+    def cache_put(self, result_type: str, value: Any, key: str = ''):
+        """Guarda un resultado en la caché persistente, si está activa"""
+        if self.cache is not None:
+            self.cache.put(self.target, self.module_name, config_hash(self.config), result_type, value, key)
+    
+    async def run_command(self, command: List[str], line_callback: Callable[[str], Any] = None,
+                          timeout: float = None) -> Dict[str, Any]:
+        """Ejecuta comandos del sistema sin bloquear el event loop
+        
+        Comparte con el resto de scanners el límite global de procesos
+        (config['max_processes']) y entrega stdout línea a línea a line_callback.
+        """
+        runner = get_process_runner(self.config.get('max_processes'))
+        return await runner.run(
+            command,
+            timeout=timeout or self.config.get('timeout', 300),
+            line_callback=line_callback
+        )
+    
+    @asynccontextmanager
+    async def http_session(self):
+        """Sesión HTTP del escaneo: todos los checks comparten el mismo pool"""
+        if self.http is not None:
+            yield self.http.session
+            return
+        
+        async with HTTPClientManager(self.config) as self.http:
+            try:
+                yield self.http.session
+            finally:
+                self.results['http_stats'] = self.http.get_stats()
+                self.http = None
+    
+    async def async_http_request(self, session: aiohttp.ClientSession, url: str, capture_body: bool = False,
+                                 max_body_bytes: int = None, stop_patterns: Iterable[str] = None,
+                                 method: str = 'GET', allow_redirects: bool = True) -> Dict[str, Any]:
+        """Realiza peticiones HTTP asíncronas (timeout por defecto de la sesión)
+        
+        Con capture_body lee el cuerpo en streaming hasta max_body_bytes
+        (config['max_body_bytes']) y deja de leer en cuanto aparece alguno
+        de stop_patterns (sin distinguir mayúsculas). El resultado incluye
+        el hash del contenido leído para no analizar dos veces el mismo cuerpo.
+        """
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                return {
+            async with session.request(method, url, allow_redirects=allow_redirects) as response:
+                result = {
                     'url': url,
                     'status': response.status,
                     'headers': dict(response.headers),
                     'success': True
                 }
+                if capture_body:
+                    result.update(await self.read_body(response, max_body_bytes, stop_patterns))
+                return result
         except Exception as e:
-            return {'url': url, 'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'url': url, 'success': False, 'error': str(e)}
+    
+    async def read_body(self, response: aiohttp.ClientResponse, max_body_bytes: int = None,
+                        stop_patterns: Iterable[str] = None) -> Dict[str, Any]:
+        """Lee el cuerpo por trozos con un tope de bytes y parada temprana"""
+        limit = max_body_bytes or self.config.get('max_body_bytes', DEFAULT_MAX_BODY_BYTES)
+        matcher = get_matcher(tuple(stop_patterns)) if stop_patterns else None
+        # Caracteres del trozo anterior que se conservan para no perder coincidencias partidas
+        overlap = max((len(pattern) for pattern in matcher.patterns), default=1) - 1 if matcher else 0
+        decoder = self.body_decoder(response.charset)
+        digest = hashlib.sha256()
+        parts = []
+        size = 0
+        tail = ''
+        matched = None
+        
+        async for chunk in response.content.iter_chunked(BODY_CHUNK_SIZE):
+            chunk = chunk[:limit - size]
+            digest.update(chunk)
+            size += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            if matcher is not None:
+                window = tail + text
+                hit = matcher.search(window)
+                if hit is not None:
+                    matched = hit[1]
+                    break
+                tail = window[-overlap:] if overlap else ''
+            if size >= limit:
+                break
+        
+        parts.append(decoder.decode(b'', final=True))
+        return {
+            'body': ''.join(parts),
+            'body_hash': digest.hexdigest(),
+            'body_bytes': size,
+            'body_complete': response.content.at_eof(),
+            'matched_pattern': matched
+        }
+    
+    @staticmethod
+    def body_decoder(charset: str = None) -> codecs.IncrementalDecoder:
+        """Decodificador incremental del charset anunciado; utf-8 si es desconocido o no es de texto"""
+        try:
+            info = codecs.lookup(charset or 'utf-8')
+        except LookupError:
+            info = None
+        # codecs también registra transformaciones bytes->bytes (base64, zlib...)
+        if info is None or not info._is_text_encoding:
+            info = codecs.lookup('utf-8')
+        return info.incrementaldecoder(errors='replace')
+    
+    def analyze_body(self, response: Dict[str, Any], analyzer: Callable[[str], Any], key: str = '') -> Any:
+        """Aplica `analyzer` al cuerpo una sola vez por contenido distinto
+        
+        Las respuestas con el mismo body_hash (páginas de error idénticas,
+        la misma plantilla para todos los payloads...) reutilizan el análisis.
+        """
+        memo_key = (response.get('body_hash'), key or analyzer.__name__)
+        if memo_key[0] is None:
+            return analyzer(response.get('body', ''))
+        if memo_key not in self.body_analysis:
+            self.body_analysis[memo_key] = analyzer(response['body'])
+        return self.body_analysis[memo_key]
@@ -0,0 +1,208 @@
+import asyncio
+import heapq
+import os
+import re
+import secrets
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Tuple, Optional, Callable, Awaitable, FrozenSet
+from urllib.parse import urlsplit, urljoin
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+SKETCH_SIZE = 64
+_WORD = re.compile(r'\w+')
+
+
+def header(headers: Dict[str, Any], name: str, default: str = '') -> str:
+    """Cabecera sin distinguir mayúsculas (el dict pierde el CIMultiDict de aiohttp)"""
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), default)
+
+
+def length_bucket(length: Optional[int]) -> Optional[int]:
+    """Cubo logarítmico (cuartos de octava): tolera páginas que reflejan la ruta"""
+    if length is None:
+        return None
+    top = length.bit_length()
+    if top <= 2:
+        return length
+    return top * 4 + ((length >> (top - 3)) & 0b11)
+
+
+def similarity_sketch(text: str) -> FrozenSet[int]:
+    """Bottom-k de los hashes de trigramas de palabras (estimador de Jaccard)"""
+    words = _WORD.findall(text.lower())
+    shingles = {hash(tuple(words[i:i + 3])) for i in range(max(len(words) - 2, 1))}
+    return frozenset(heapq.nsmallest(SKETCH_SIZE, shingles))
+
+
+def sketch_similarity(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    """Similitud de Jaccard estimada entre dos sketches"""
+    if not a and not b:
+        return 1.0
+    union = heapq.nsmallest(SKETCH_SIZE, a | b)
+    return sum(1 for value in union if value in a and value in b) / len(union)
+
+
+@dataclass(frozen=True)
+class ResponseFingerprint:
+    """Huella de una respuesta
+
+    `length_bucket` sale de la cabecera Content-Length tal como viaja (con
+    gzip es el tamaño comprimido) y `encoding` de Content-Encoding, así que
+    un HEAD y un GET del mismo recurso dan la misma huella de tamaño. El
+    sketch se calcula sobre el cuerpo ya descomprimido, solo si se descargó.
+    """
+    status: int
+    length_bucket: Optional[int] = None
+    encoding: str = ''
+    location: str = ''
+    sketch: FrozenSet[int] = frozenset()
+
+
+@dataclass
+class HostBaseline:
+    """Respuestas de un host a rutas aleatorias que no deberían existir"""
+    fingerprints: List[ResponseFingerprint] = field(default_factory=list)
+    wildcard: bool = False
+
+    @property
+    def statuses(self) -> set:
+        return {fp.status for fp in self.fingerprints}
+
+    def buckets(self, status: int, encoding: str) -> Optional[set]:
+        """Cubos de Content-Length con ese status y codificación (None si alguna muestra no lo trae)"""
+        buckets = {fp.length_bucket for fp in self.fingerprints if fp.status == status and fp.encoding == encoding}
+        return None if not buckets or None in buckets else buckets
+
+
+class Soft404Detector:
+    """Filtra falsos positivos de servidores catch-all (soft-404 / comodín)
+
+    Por cada host y directorio se piden unas cuantas rutas aleatorias y se
+    guarda su huella (status, cubo de longitud, Location y un sketch de
+    similitud del cuerpo) durante todo el escaneo. Cada candidata se sondea
+    primero con HEAD: si su Content-Length (con la misma codificación) queda
+    claramente fuera de los de las rutas inexistentes es una página real;
+    si no, se descarga el cuerpo y decide la similitud. Un tamaño parecido
+    nunca basta por sí solo para descartar una ruta.
+    """
+
+    def __init__(self, request: Callable[..., Awaitable[Dict[str, Any]]], hit_statuses=(200, 301, 302),
+                 samples: int = 3, similarity: float = 0.8, body_bytes: int = 64 * 1024):
+        self.request = request
+        self.hit_statuses = set(hit_statuses)
+        self.samples = samples
+        self.similarity = similarity
+        self.body_bytes = body_bytes
+        self.baselines: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.head_supported: Dict[str, bool] = {}
+        self.stats = {'head_requests': 0, 'get_requests': 0, 'bytes_downloaded': 0,
+                      'soft_404': 0, 'baseline_requests': 0}
+
+    @staticmethod
+    def split(url: str) -> Tuple[str, str, str, str]:
+        """(host, directorio, último segmento, extensión) de una URL"""
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        directory, _, name = path.rstrip('/').rpartition('/')
+        return f"{parts.scheme}://{parts.netloc}", f"{directory}/", name, os.path.splitext(name)[1]
+
+    def fingerprint(self, response: Dict[str, Any], token: str) -> ResponseFingerprint:
+        headers = response.get('headers', {})
+        location = header(headers, 'Location')
+        if token:
+            location = location.replace(token, '{}')
+        length = header(headers, 'Content-Length')
+        length = int(length) if length.isdigit() else None
+        body = response.get('body')
+        sketch = frozenset()
+        if body is not None:
+            sketch = similarity_sketch(body.replace(token, ' ') if token else body)
+        return ResponseFingerprint(response.get('status'), length_bucket(length),
+                                   header(headers, 'Content-Encoding').lower(), location, sketch)
+
+    async def get(self, url: str) -> Dict[str, Any]:
+        response = await self.request(url, capture_body=True, max_body_bytes=self.body_bytes,
+                                      allow_redirects=False)
+        self.stats['get_requests'] += 1
+        self.stats['bytes_downloaded'] += response.get('body_bytes', 0)
+        return response
+
+    async def measure(self, host: str, directory: str, extension: str) -> HostBaseline:
+        baseline = HostBaseline()
+        for _ in range(self.samples):
+            token = f"{secrets.token_hex(8)}{extension}"
+            self.stats['baseline_requests'] += 1
+            response = await self.get(urljoin(host, f"{directory}{token}"))
+            if response.get('success'):
+                baseline.fingerprints.append(self.fingerprint(response, token))
+        baseline.wildcard = bool(baseline.statuses & self.hit_statuses)
+        return baseline
+
+    async def baseline(self, host: str, directory: str, extension: str) -> HostBaseline:
+        """Huella cacheada por host/directorio/extensión para todo el escaneo
+
+        Se espera a través de asyncio.shield: cancelar al primer sondeo no
+        cancela la medida que comparten los demás. Una medida cancelada,
+        fallida o sin ninguna respuesta se olvida y el siguiente sondeo la repite.
+        """
+        key = (f"{host}{directory}", extension)
+        task = self.baselines.get(key)
+        if task is None:
+            task = self.baselines[key] = asyncio.ensure_future(self.measure(host, directory, extension))
+
+            def forget(done: asyncio.Task):
+                failed = done.cancelled() or done.exception() is not None or not done.result().fingerprints
+                if failed and self.baselines.get(key) is done:
+                    del self.baselines[key]
+            task.add_done_callback(forget)
+        return await asyncio.shield(task)
+
+    def similar(self, baseline: HostBaseline, fingerprint: ResponseFingerprint) -> bool:
+        return any(fp.status == fingerprint.status and
+                   sketch_similarity(fp.sketch, fingerprint.sketch) >= self.similarity
+                   for fp in baseline.fingerprints)
+
+    async def probe(self, url: str) -> Dict[str, Any]:
+        """Sondea una ruta; la respuesta lleva 'soft_404' si es la página comodín"""
+        host, directory, token, extension = self.split(url)
+        baseline = await self.baseline(host, directory, extension)
+
+        response = None
+        if self.head_supported.get(host, True):
+            response = await self.request(url, method='HEAD', allow_redirects=False)
+            self.stats['head_requests'] += 1
+            if response.get('status') in (405, 501):
+                self.head_supported[host] = False
+                response = None
+        if response is None:
+            response = await self.get(url)
+
+        response['soft_404'] = False
+        status = response.get('status')
+        if not response.get('success') or status not in self.hit_statuses or not baseline.wildcard:
+            return response
+        if status not in baseline.statuses:
+            return response
+
+        fingerprint = self.fingerprint(response, token)
+        if status in REDIRECT_STATUSES:
+            # Redirección comodín (p. ej. todo a /login): mismo Location salvo la ruta
+            response['soft_404'] = any(fp.location == fingerprint.location for fp in baseline.fingerprints
+                                       if fp.status == status)
+        elif fingerprint.sketch:
+            response['soft_404'] = self.similar(baseline, fingerprint)
+        else:
+            buckets = baseline.buckets(status, fingerprint.encoding)
+            distinct = (fingerprint.length_bucket is not None and buckets is not None and
+                        all(abs(fingerprint.length_bucket - bucket) > 1 for bucket in buckets))
+            if not distinct:
+                # Mismo tamaño aproximado o no comparable: decide el cuerpo
+                body_response = await self.get(url)
+                body_response['soft_404'] = (body_response.get('status') == status and
+                                             self.similar(baseline, self.fingerprint(body_response, token)))
+                response = body_response
+
+        if response['soft_404']:
+            self.stats['soft_404'] += 1
+        return response
@@ -4,8 +4,9 @@ KaliNova - Main CLI Interface
 """
 
 import argparse
+import asyncio
 import sys
-from core.engine.nova_engine import engine
+from core.engine.nova_engine import get_engine
 
 def show_banner():
     """Mostrar banner de KaliNova"""
@@ -41,6 +42,35 @@ def legal_disclaimer():
     response = input("¿Acepta estos términos? (yes/no): ")
     return response.lower() in ['yes', 'y', 'si', 's']
 
+def read_targets(path: str):
+    """Leer targets de un fichero, uno por línea (ignora vacías y comentarios)"""
+    with open(path, 'r') as f:
+        for line in f:
+            target = line.strip()
+            if target and not target.startswith('#'):
+                yield target
+
+def print_results(results: dict):
+    """Mostrar resultados de un escaneo"""
+    print("\n📊 Resultados del escaneo:")
+    print(f"Target: {results.get('target', 'N/A')}")
+    print(f"Tipo: {results.get('scan_type', 'N/A')}")
+    
+    if 'error' in results:
+        print(f"❌ Error: {results['error']}")
+    else:
+        print(f"ℹ️  Info encontrada: {len(results.get('info_found', []))}")
+        print(f"🛡️  Vulnerabilidades: {len(results.get('vulnerabilities', []))}")
+
+async def run_batch(targets_file: str, modules: list, workers: int = None, refresh: bool = False):
+    """Escanear todos los targets de un fichero mostrando cada resultado al terminar"""
+    total = 0
+    async for results in get_engine().run_scan_many(read_targets(targets_file), modules, max_workers=workers,
+                                              accept_disclaimer=True, force_rescan=refresh):
+        total += 1
+        print_results(results)
+    print(f"\n✅ Escaneos completados: {total}")
+
 def main():
     """Función principal"""
     show_banner()
@@ -49,18 +79,24 @@ def main():
     parser.add_argument('--target', '-t', help='Target to scan')
     parser.add_argument('--module', '-m', help='Module to use', default='web')
     parser.add_argument('--list-modules', '-l', action='store_true', help='List available modules')
+    parser.add_argument('--targets-file', '-T', help='File with one target per line')
+    parser.add_argument('--workers', '-w', type=int, help='Concurrent scans for --targets-file')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the result cache')
+    parser.add_argument('--refresh', action='store_true', help='Ignore cached results and rescan')
     
     args = parser.parse_args()
     
     if args.list_modules:
-        modules = engine.list_modules()
+        modules = get_engine().describe_modules()
         print("📦 Módulos disponibles:")
         for module in modules:
-            print(f"  - {module}")
+            version = f" v{module['version']}" if module['version'] else ""
+            description = f" - {module['description']}" if module['description'] else ""
+            print(f"  - {module['name']}{version}{description}")
         return
     
-    if not args.target:
-        print("❌ Error: Debe especificar un target con --target")
+    if not args.target and not args.targets_file:
+        print("❌ Error: Debe especificar un target con --target o --targets-file")
         sys.exit(1)
     
     # Verificar disclaimer legal
@@ -68,20 +104,20 @@ def main():
         print("❌ Debe aceptar los términos para continuar")
         sys.exit(1)
     
+    if args.no_cache:
+        get_engine().config['result_cache'] = None
+    
+    if args.targets_file:
+        print(f"🎯 Iniciando escaneo masivo desde {args.targets_file}...")
+        asyncio.run(run_batch(args.targets_file, args.module.split(','), args.workers, args.refresh))
+        return
+    
     # Ejecutar escaneo
     print(f"🎯 Iniciando escaneo de {args.target}...")
-    results = engine.run_scan(args.target, args.module, accept_disclaimer=True)
+    results = get_engine().run_scan(args.target, args.module, accept_disclaimer=True, force_rescan=args.refresh)
     
     # Mostrar resultados
-    print("\n📊 Resultados del escaneo:")
-    print(f"Target: {results.get('target', 'N/A')}")
-    print(f"Tipo: {results.get('scan_type', 'N/A')}")
-    
-    if 'error' in results:
-        print(f"❌ Error: {results['error']}")
-    else:
-        print(f"ℹ️  Info encontrada: {len(results.get('info_found', []))}")
-        print(f"🛡️  Vulnerabilidades: {len(results.get('vulnerabilities', []))}")
+    print_results(results)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
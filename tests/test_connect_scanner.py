@@ -0,0 +1,71 @@
+"""
+KaliNova - Escáner TCP connect asíncrono
+
+    python -m pytest tests/test_connect_scanner.py
+"""
+
+import asyncio
+import errno
+import os
+import socket
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core import connect_scanner
+from core.connect_scanner import AsyncConnectScanner
+
+
+def listening_port():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    return server, server.getsockname()[1]
+
+
+def closed_port():
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def test_open_and_closed_ports():
+    server, open_port = listening_port()
+    closed = closed_port()
+
+    async def scenario():
+        scanner = AsyncConnectScanner(concurrency=8, report_closed=True)
+        return [record async for record in scanner.scan(['127.0.0.1'], [open_port, closed])], scanner.stats
+
+    records, stats = asyncio.run(scenario())
+    server.close()
+    assert {int(record['port']): record['state'] for record in records} == {open_port: 'open', closed: 'closed'}
+    assert stats['open'] == 1 and stats['closed'] == 1 and stats['retries'] == 0
+
+
+def test_fd_exhaustion_does_not_spend_attempts(monkeypatch):
+    server, port = listening_port()
+    failures = {'left': 5}
+
+    def flaky_socket(*args, **kwargs):
+        # Los primeros socket() fallan como con la tabla de descriptores llena
+        if failures['left']:
+            failures['left'] -= 1
+            raise OSError(errno.EMFILE, os.strerror(errno.EMFILE))
+        return socket.socket(*args, **kwargs)
+
+    fake = types.SimpleNamespace(**{name: getattr(socket, name) for name in dir(socket) if name.isupper()})
+    fake.socket = flaky_socket
+    monkeypatch.setattr(connect_scanner, 'socket', fake)
+    monkeypatch.setattr(connect_scanner, 'FD_WAIT_INITIAL', 0.001)
+
+    scanner = AsyncConnectScanner(retries=0)
+    state = asyncio.run(scanner.probe('127.0.0.1', port))
+    server.close()
+
+    assert state == 'open'
+    assert scanner.stats['fd_waits'] == 5 and scanner.stats['probes'] == 1 and scanner.stats['retries'] == 0
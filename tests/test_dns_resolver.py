@@ -0,0 +1,174 @@
+"""
+KaliNova - Resolver DNS asíncrono contra un servidor DNS local de prueba
+
+    python -m pytest tests/test_dns_resolver.py
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.dns_resolver import AsyncDNSResolver, WildcardFilter, read_name
+
+WILDCARD_ADDRESS = '10.9.9.9'
+
+
+class StubDNSServer(asyncio.DatagramProtocol):
+    """Servidor DNS UDP mínimo en 127.0.0.1
+
+    `records` nombre -> direcciones A; los nombres bajo `wildcard` responden
+    WILDCARD_ADDRESS; los de `silent` nunca reciben respuesta y los de
+    `drop_first` pierden su primera respuesta. El resto es NXDOMAIN.
+    """
+
+    def __init__(self, records=None, wildcard=None, silent=(), drop_first=()):
+        self.records = records or {}
+        self.wildcard = wildcard
+        self.silent = set(silent)
+        self.drop_first = set(drop_first)
+        self.queries = []
+        self.transport = None
+
+    async def start(self) -> str:
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=('127.0.0.1', 0))
+        return '127.0.0.1:%d' % self.transport.get_extra_info('sockname')[1]
+
+    def close(self):
+        self.transport.close()
+
+    def datagram_received(self, data: bytes, addr):
+        name, end = read_name(data, 12)
+        self.queries.append(name)
+        if name in self.silent:
+            return
+        if name in self.drop_first:
+            self.drop_first.discard(name)
+            return
+        addresses = self.records.get(name)
+        if addresses is None and self.wildcard and name.endswith('.' + self.wildcard):
+            addresses = [WILDCARD_ADDRESS]
+        rcode = 0 if addresses is not None else 3
+        addresses = addresses or []
+        header = struct.pack('!HHHHHH', struct.unpack('!H', data[:2])[0], 0x8180 | rcode, 1, len(addresses), 0, 0)
+        answers = b''.join(struct.pack('!HHHIH', 0xC00C, 1, 1, 60, 4) + socket.inet_aton(address)
+                           for address in addresses)
+        self.transport.sendto(header + data[12:end + 4] + answers, addr)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def serve(server: StubDNSServer, **options):
+    nameserver = await server.start()
+    options = {'sockets': 2, 'timeout': 0.2, 'retries': 2, 'rate': 0, **options}
+    return AsyncDNSResolver([nameserver], **options)
+
+
+def test_resolve_and_nxdomain():
+    async def scenario():
+        server = StubDNSServer({'www.example.test': ['192.0.2.10', '192.0.2.11']})
+        async with await serve(server) as resolver:
+            found = await resolver.resolve('WWW.example.test.')
+            missing = await resolver.resolve('nope.example.test')
+        server.close()
+        return found, missing, resolver.stats
+
+    found, missing, stats = run(scenario())
+    assert found == {'name': 'www.example.test', 'status': 'NOERROR',
+                     'addresses': ['192.0.2.10', '192.0.2.11'], 'cnames': []}
+    assert missing['status'] == 'NXDOMAIN' and missing['addresses'] == []
+    assert stats['answers'] == 2 and stats['retransmits'] == 0
+
+
+def test_retransmit_after_dropped_reply():
+    async def scenario():
+        server = StubDNSServer({'flaky.test': ['192.0.2.1']}, drop_first={'flaky.test'})
+        async with await serve(server, timeout=0.05) as resolver:
+            answer = await resolver.resolve('flaky.test')
+        server.close()
+        return answer, resolver.stats, server.queries
+
+    answer, stats, queries = run(scenario())
+    assert answer['status'] == 'NOERROR' and answer['addresses'] == ['192.0.2.1']
+    assert queries == ['flaky.test', 'flaky.test']
+    assert stats['timeouts'] == 1 and stats['retransmits'] == 1
+
+
+def test_timeout_status():
+    async def scenario():
+        server = StubDNSServer(silent={'silent.test'})
+        async with await serve(server, timeout=0.02, retries=1) as resolver:
+            answer = await resolver.resolve('silent.test')
+        server.close()
+        return answer, resolver.stats
+
+    answer, stats = run(scenario())
+    assert answer == {'name': 'silent.test', 'status': 'TIMEOUT', 'addresses': [], 'cnames': []}
+    assert stats['timeouts'] == 2 and stats['failures'] == 1
+
+
+def test_wildcard_filtering():
+    async def scenario():
+        server = StubDNSServer({'real.wild.test': ['192.0.2.50']}, wildcard='wild.test')
+        async with await serve(server) as resolver:
+            wildcard = WildcardFilter(resolver, 'wild.test')
+            detected = await wildcard.detect()
+            real = await resolver.resolve('real.wild.test')
+            fake = await resolver.resolve('anything.wild.test')
+        server.close()
+        return detected, wildcard, real, fake
+
+    detected, wildcard, real, fake = run(scenario())
+    assert detected and wildcard.addresses == {WILDCARD_ADDRESS}
+    assert wildcard.is_real(real)
+    assert not wildcard.is_real(fake)
+
+
+def test_no_wildcard():
+    async def scenario():
+        server = StubDNSServer({'real.plain.test': ['192.0.2.60']})
+        async with await serve(server) as resolver:
+            wildcard = WildcardFilter(resolver, 'plain.test')
+            detected = await wildcard.detect()
+            real = await resolver.resolve('real.plain.test')
+        server.close()
+        return detected, wildcard, real
+
+    detected, wildcard, real = run(scenario())
+    assert not detected
+    assert wildcard.is_real(real)
+
+
+def test_concurrent_first_use_opens_one_pool():
+    async def scenario():
+        server = StubDNSServer({'a.test': ['192.0.2.1']})
+        resolver = await serve(server, sockets=4)
+        loop = asyncio.get_running_loop()
+        opened = []
+        create = loop.create_datagram_endpoint
+
+        async def counting(*args, **kwargs):
+            transport, protocol = await create(*args, **kwargs)
+            opened.append(transport)
+            return transport, protocol
+
+        loop.create_datagram_endpoint = counting
+        try:
+            answers = await asyncio.gather(*[resolver.resolve('a.test') for _ in range(3)])
+        finally:
+            del loop.create_datagram_endpoint
+        resolver.close()
+        server.close()
+        return answers, opened
+
+    answers, opened = run(scenario())
+    assert all(answer['status'] == 'NOERROR' for answer in answers)
+    assert len(opened) == 4
+    assert all(transport.is_closing() for transport in opened)
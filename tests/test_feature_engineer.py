@@ -0,0 +1,113 @@
+"""
+KaliNova - Paridad entre la extracción por paquete y la vectorizada
+
+    python -m pytest tests/test_feature_engineer.py
+"""
+
+import importlib.util
+import os
+import sys
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+# feature-engineer.py no es importable por nombre (guion)
+spec = importlib.util.spec_from_file_location('feature_engineer', os.path.join(ROOT, 'core', 'ML', 'feature-engineer.py'))
+feature_engineer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(feature_engineer)
+ThreatFeatureEngineer = feature_engineer.ThreatFeatureEngineer
+NETWORK_FEATURES = feature_engineer.NETWORK_FEATURES
+
+HOUR, DAY = NETWORK_FEATURES.index('hour'), NETWORK_FEATURES.index('day_of_week')
+UTC_PLUS_5 = timezone(timedelta(hours=5))
+UTC_MINUS_8 = timezone(timedelta(hours=-8))
+
+
+def per_packet(packets):
+    engineer = ThreatFeatureEngineer()
+    rows = [engineer.extract_network_features(packet) for packet in packets]
+    return np.array([[row[name] for name in NETWORK_FEATURES] for row in rows], dtype=np.float32)
+
+
+def batch(columns):
+    with warnings.catch_warnings():
+        # La conversión a UTC de NumPy avisa con UserWarning: no debe ocurrir
+        warnings.simplefilter('error')
+        return ThreatFeatureEngineer().extract_network_features_batch(columns)
+
+
+def assert_parity(packets, missing_timestamp=()):
+    expected = per_packet(packets)
+    actual = batch(ThreatFeatureEngineer.packets_to_columns(packets))
+    # Sin timestamp cada camino toma su propio datetime.now(): hora y día pueden diferir en el cambio de hora
+    mask = np.ones_like(expected, dtype=bool)
+    for index in missing_timestamp:
+        mask[index, [HOUR, DAY]] = False
+    np.testing.assert_array_equal(actual[mask], expected[mask])
+
+
+def test_tz_aware_keeps_wall_clock():
+    packets = [
+        {'length': 100, 'protocol': 'TCP', 'timestamp': datetime(2024, 1, 7, 23, 30, tzinfo=UTC_PLUS_5)},
+        {'length': 200, 'protocol': 'UDP', 'timestamp': datetime(2024, 1, 8, 1, 15, tzinfo=UTC_PLUS_5)},
+    ]
+    features = batch(ThreatFeatureEngineer.packets_to_columns(packets))
+    assert features[:, HOUR].tolist() == [23, 1]
+    assert features[:, DAY].tolist() == [6, 0]
+    assert_parity(packets)
+
+
+def test_mixed_zones_naive_and_missing():
+    packets = [
+        {'length': 60, 'protocol': 'TCP', 'src_port': 4444, 'dst_port': 22,
+         'timestamp': datetime(2024, 3, 1, 22, 0, tzinfo=UTC_PLUS_5)},
+        {'length': 1500, 'protocol': 'icmp', 'timestamp': datetime(2024, 3, 1, 2, 0, tzinfo=UTC_MINUS_8)},
+        {'length': 80, 'timestamp': datetime(2024, 3, 2, 13, 45)},
+        {'protocol': 'SCTP', 'dst_port': 3389, 'packet_count': 10, 'time_window': 4},
+        {'length': 90, 'protocol': 'GRE', 'timestamp': pd.Timestamp('2024-03-03 04:05', tz='Asia/Tokyo'),
+         'recent_ports': [22, 22, 80], 'recent_sizes': [60, 1500]},
+    ]
+    assert_parity(packets, missing_timestamp=[3])
+
+
+def test_random_packets():
+    rng = np.random.default_rng(0)
+    zones = [None, timezone.utc, UTC_PLUS_5, UTC_MINUS_8]
+    packets = []
+    for _ in range(500):
+        packet = {'length': int(rng.integers(40, 2000)), 'protocol': str(rng.choice(['TCP', 'UDP', 'ICMP', 'x'])),
+                  'src_port': int(rng.integers(0, 65536)), 'dst_port': int(rng.integers(0, 65536))}
+        if rng.random() < 0.9:
+            moment = datetime(2024, 1, 1) + timedelta(minutes=int(rng.integers(0, 60 * 24 * 30)))
+            packet['timestamp'] = moment.replace(tzinfo=zones[rng.integers(len(zones))])
+        if rng.random() < 0.3:
+            packet['packet_count'] = int(rng.integers(1, 100))
+            packet['time_window'] = float(rng.uniform(0.5, 10))
+        packets.append(packet)
+    missing = [index for index, packet in enumerate(packets) if 'timestamp' not in packet]
+    assert_parity(packets, missing_timestamp=missing)
+
+
+@pytest.mark.parametrize('column', [
+    pd.Series(pd.to_datetime(['2024-05-05 23:10', '2024-05-06 00:20']).tz_localize('Asia/Kolkata')),
+    pd.Series([pd.Timestamp('2024-05-05 23:10', tz='Asia/Kolkata'), pd.Timestamp('2024-05-06 00:20')]),
+    np.array(['2024-05-05T23:10', '2024-05-06T00:20'], dtype='datetime64[us]'),
+    ['2024-05-05 23:10:00+05:30', '2024-05-06 00:20:00-03:00'],
+])
+def test_timestamp_column_types(column):
+    features = batch({'length': np.array([1, 2]), 'timestamp': column})
+    assert features[:, HOUR].tolist() == [23, 0]
+    assert features[:, DAY].tolist() == [6, 0]
+
+
+def test_missing_values_in_column_use_now():
+    now = datetime.now()
+    features = batch({'length': np.array([1, 2]), 'timestamp': [datetime(2024, 5, 5, 23, 10), None]})
+    assert features[0, HOUR] == 23
+    assert features[1, HOUR] in (now.hour, (now.hour + 1) % 24)
@@ -0,0 +1,169 @@
+"""
+KaliNova - Estadísticas por flujo (FlowStateEngine) y su uso en las características
+
+    python -m pytest tests/test_flow_state.py
+"""
+
+import importlib.util
+import math
+import os
+import sys
+import types
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.ML import flow_state, tree_scorer
+from core.ML.flow_state import FlowStateEngine
+
+# Los módulos de core/ML se importan entre sí como paquete `ml`
+sys.modules.setdefault('ml', types.ModuleType('ml'))
+sys.modules.setdefault('ml.flow_state', flow_state)
+sys.modules.setdefault('ml.tree_scorer', tree_scorer)
+spec = importlib.util.spec_from_file_location('ml.feature_engineer', os.path.join(ROOT, 'core', 'ML', 'feature-engineer.py'))
+feature_engineer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(feature_engineer)
+ThreatFeatureEngineer = feature_engineer.ThreatFeatureEngineer
+NETWORK_FEATURES = feature_engineer.NETWORK_FEATURES
+
+
+def packet(t: float, length: int = 100, src_ip: str = '10.0.0.1', dst_port: int = 80, **fields):
+    return {'src_ip': src_ip, 'dst_ip': '10.0.0.9', 'src_port': 40000, 'dst_port': dst_port,
+            'protocol': 'TCP', 'length': length, 'timestamp': t, **fields}
+
+
+def test_sliding_window_counts():
+    engine = FlowStateEngine(window=10.0, buckets=10)
+    for t in range(10):
+        features = engine.update(packet(t))
+    assert features['packet_count'] == 10 and features['byte_count'] == 1000
+    assert features['time_window'] == 10.0
+
+    # En t=15 solo quedan los buckets de 6..9 más el paquete nuevo
+    features = engine.update(packet(15, length=50))
+    assert features['packet_count'] == 5 and features['byte_count'] == 450
+
+    # Más de una ventana sin tráfico: todo caducado
+    features = engine.update(packet(40))
+    assert features['packet_count'] == 1
+
+
+def test_first_packet_rates():
+    features = FlowStateEngine(window=10.0, buckets=10).update(packet(100.0, length=300))
+    assert features['packet_count'] == 1 and features['time_window'] == 1.0
+    assert features['size_variance'] == 0.0 and features['port_entropy'] == 0.0
+
+
+def test_size_variance_matches_numpy():
+    rng = np.random.default_rng(0)
+    sizes = rng.integers(40, 1500, 200)
+    engine = FlowStateEngine()
+    for index, size in enumerate(sizes):
+        features = engine.update(packet(index * 0.01, length=int(size)))
+    assert features['size_variance'] == pytest.approx(np.var(sizes), rel=1e-9)
+
+
+def test_port_entropy_per_source():
+    engine = FlowStateEngine(port_window=8)
+    for index, port in enumerate([22, 23, 80, 443] * 2):
+        scan = engine.update(packet(index, src_ip='10.0.0.66', dst_port=port))
+    assert scan['port_entropy'] == pytest.approx(2.0)
+
+    for index in range(8):
+        normal = engine.update(packet(index, src_ip='10.0.0.5', dst_port=443))
+    assert normal['port_entropy'] == 0.0
+
+    # La ventana de puertos se desliza: tras 8 paquetes al mismo puerto ya no hay entropía
+    for index in range(8):
+        scan = engine.update(packet(10 + index, src_ip='10.0.0.66', dst_port=22))
+    assert scan['port_entropy'] == 0.0
+
+
+def test_entropy_matches_histogram():
+    rng = np.random.default_rng(1)
+    ports = rng.choice([21, 22, 25, 80, 443, 8080], 500).tolist()
+    engine = FlowStateEngine(port_window=64)
+    for index, port in enumerate(ports):
+        features = engine.update(packet(index * 0.001, dst_port=port))
+    _, counts = np.unique(ports[-64:], return_counts=True)
+    probabilities = counts / counts.sum()
+    assert features['port_entropy'] == pytest.approx(-(probabilities * np.log2(probabilities)).sum())
+
+
+def test_out_of_order_packets_do_not_rewind_the_window():
+    engine = FlowStateEngine(window=10.0, buckets=10)
+    engine.update(packet(50))
+    features = engine.update(packet(20))
+    assert features['packet_count'] == 2 and engine.now == 50
+
+
+def test_idle_and_budget_eviction():
+    engine = FlowStateEngine(idle_timeout=30.0, max_flows=3)
+    for index in range(3):
+        engine.update(packet(index, src_ip=f"10.0.1.{index}"))
+    engine.update(packet(3, src_ip='10.0.1.9'))
+    assert len(engine) == 3 and engine.stats['evicted_budget'] == 1
+    assert ('10.0.1.0', '10.0.0.9', 40000, 80, 'TCP') not in engine.flows
+
+    # Caducan los 3 flujos y los 4 histogramas de origen
+    engine.update(packet(100, src_ip='10.0.2.1'))
+    assert len(engine) == 1 and len(engine.sources) == 1 and engine.stats['evicted_idle'] == 7
+
+
+def test_update_batch_matches_update():
+    rng = np.random.default_rng(2)
+    packets = [packet(t, length=int(rng.integers(40, 1500)), src_ip=f"10.0.0.{rng.integers(1, 4)}",
+                      dst_port=int(rng.choice([22, 80, 443])))
+               for t in np.sort(rng.uniform(0, 30, 300))]
+    one_by_one = FlowStateEngine()
+    expected = [one_by_one.update(p) for p in packets]
+    columns = {key: np.array([p[key] for p in packets]) for key in packets[0]}
+    batch = FlowStateEngine().update_batch(columns)
+    for name in expected[0]:
+        np.testing.assert_allclose(batch[name], [row[name] for row in expected])
+
+
+def test_feature_engineer_uses_flow_state_in_both_paths():
+    start = datetime(2024, 6, 1, 12, 0)
+    packets = [packet(0, length=60 + index, dst_port=1000 + index % 5,
+                      timestamp=start + timedelta(milliseconds=100 * index))
+               for index in range(50)]
+    single = ThreatFeatureEngineer(FlowStateEngine())
+    expected = np.array([[row[name] for name in NETWORK_FEATURES]
+                         for row in map(single.extract_network_features, packets)], dtype=np.float32)
+    batch = ThreatFeatureEngineer(FlowStateEngine()).extract_network_features_batch(
+        ThreatFeatureEngineer.packets_to_columns(packets))
+    np.testing.assert_array_equal(batch, expected)
+
+    pps = NETWORK_FEATURES.index('packets_per_second')
+    entropy = NETWORK_FEATURES.index('port_entropy')
+    # Cada puerto es un flujo: 10 paquetes en 4.5 s más un bucket; la entropía es por origen
+    assert batch[-1, pps] == pytest.approx(10 / 5.5)
+    assert batch[-1, entropy] == pytest.approx(math.log2(5))
+
+
+def test_registry_rejects_other_flow_features(tmp_path):
+    pytest.importorskip('joblib')
+    from sklearn.ensemble import RandomForestClassifier
+    spec = importlib.util.spec_from_file_location('ml.model_registry',
+                                                  os.path.join(ROOT, 'core', 'ML', 'model_registry.py'))
+    model_registry = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(model_registry)
+
+    registry = model_registry.ModelRegistry(str(tmp_path))
+    X = np.random.default_rng(0).random((50, len(NETWORK_FEATURES)))
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, X[:, 0] > 0.5)
+    config = FlowStateEngine().config()
+    registry.register('network_threat', model, schema=NETWORK_FEATURES, flow_features=config)
+
+    assert registry.load('network_threat', schema=NETWORK_FEATURES, flow_features=config).version == 1
+    with pytest.raises(ValueError):
+        registry.load('network_threat', flow_features=FlowStateEngine(window=5.0).config())
+
+    registry.register('legacy', model, schema=NETWORK_FEATURES)
+    with pytest.raises(ValueError):
+        registry.load('legacy', flow_features=config)
@@ -0,0 +1,117 @@
+"""
+KaliNova - Parser incremental de la salida XML de nmap
+
+    python -m pytest tests/test_nmap_parser.py
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.nmap_parser import NmapXMLStreamParser
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE nmaprun>
+<nmaprun scanner="nmap" args="nmap -sV -oX - 192.0.2.0/30" start="1700000000">
+<scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>"""
+
+HOST_A = """<host starttime="1700000001" endtime="1700000002">
+<status state="up" reason="syn-ack"/>
+<address addr="192.0.2.1" addrtype="ipv4"/>
+<address addr="00:11:22:33:44:55" addrtype="mac"/>
+<hostnames><hostname name="router.test" type="PTR"/></hostnames>
+<ports>
+<extraports state="closed" count="997"/>
+<port protocol="tcp" portid="22"><state state="open" reason="syn-ack"/>
+<service name="ssh" product="OpenSSH" version="9.6" method="probed" conf="10"/>
+<script id="ssh-hostkey" output="256 aa:bb (ED25519)"/></port>
+<port protocol="tcp" portid="80"><state state="open" reason="syn-ack"/>
+<service name="http" product="nginx" version="1.24.0" tunnel="" method="probed" conf="10"/></port>
+<port protocol="tcp" portid="443"><state state="filtered" reason="no-response"/></port>
+</ports>
+<os><osmatch name="Linux 5.X" accuracy="96"/></os>
+<hostscript><script id="smb-os-discovery" output="n/a"/></hostscript>
+</host>"""
+
+HOST_B = """<host><status state="up" reason="echo-reply"/>
+<address addr="192.0.2.2" addrtype="ipv4"/>
+<ports><port protocol="udp" portid="53"><state state="open|filtered" reason="no-response"/>
+<service name="domain" method="table" conf="3"/></port></ports>
+</host>"""
+
+FOOTER = """<runstats><finished time="1700000010" elapsed="9.5" exit="success"/>
+<hosts up="2" down="2" total="4"/></runstats>
+</nmaprun>"""
+
+
+def lines(*parts):
+    return '\n'.join(parts).splitlines()
+
+
+def test_hosts_are_emitted_as_soon_as_they_close():
+    seen = []
+    parser = NmapXMLStreamParser(on_host=lambda host: seen.append(host.address))
+    for line in lines(HEADER, HOST_A):
+        parser.feed(line)
+    # El primer host llega antes de que nmap escriba el siguiente
+    assert seen == ['192.0.2.1']
+    for line in lines(HOST_B, FOOTER):
+        parser.feed(line)
+    hosts = parser.close()
+
+    assert seen == ['192.0.2.1', '192.0.2.2'] and [host.address for host in hosts] == seen
+    assert parser.error is None
+    assert parser.run_stats['exit'] == 'success' and parser.run_stats['elapsed'] == '9.5'
+
+
+def test_host_details():
+    parser = NmapXMLStreamParser()
+    parser.feed('\n'.join([HEADER, HOST_A, HOST_B, FOOTER]))
+    first, second = parser.close()
+
+    assert first.status == 'up' and first.hostnames == ['router.test']
+    assert first.os_matches == ['Linux 5.X'] and first.scripts[0].id == 'smb-os-discovery'
+    assert [port.port for port in first.ports] == [22, 80, 443]
+    assert [port.port for port in first.open_ports()] == [22, 80]
+    ssh = first.ports[0]
+    assert (ssh.service.product, ssh.service.version, ssh.service.confidence) == ('OpenSSH', '9.6', 10)
+    assert ssh.scripts[0].output == '256 aa:bb (ED25519)'
+    assert ssh.to_dict() == {'port': '22', 'protocol': 'tcp', 'state': 'open',
+                             'service': 'ssh', 'product': 'OpenSSH', 'version': '9.6'}
+
+    # open|filtered cuenta como abierto (UDP)
+    assert [port.to_dict()['protocol'] for port in second.open_ports()] == ['udp']
+    assert second.to_dict()['ports'][0]['service']['name'] == 'domain'
+
+
+def test_processed_hosts_are_released():
+    parser = NmapXMLStreamParser()
+    parser.feed(HEADER)
+    for _ in range(50):
+        parser.feed(HOST_B)
+    assert len(parser.hosts) == 50
+    assert len(parser.root.findall('host')) == 0
+
+
+def test_malformed_xml_keeps_earlier_hosts():
+    seen = []
+    parser = NmapXMLStreamParser(on_host=seen.append)
+    for line in lines(HEADER, HOST_B, '<host><status state="up"></host>', HOST_A):
+        parser.feed(line)
+    hosts = parser.close()
+
+    assert parser.error and 'mismatched tag' in parser.error
+    # Tras el error no se procesa nada más
+    assert [host.address for host in hosts] == ['192.0.2.2'] and len(seen) == 1
+
+
+def test_truncated_output():
+    parser = NmapXMLStreamParser()
+    for line in lines(HEADER, HOST_A):
+        parser.feed(line)
+    hosts = parser.close()
+    # nmap terminado a medias: los hosts completos se conservan y se informa del error
+    assert [host.address for host in hosts] == ['192.0.2.1']
+    assert parser.error is not None and parser.run_stats == {}
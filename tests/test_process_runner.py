@@ -0,0 +1,104 @@
+"""
+KaliNova - Límite global de procesos del runner compartido
+
+    python -m pytest tests/test_process_runner.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.process_runner import AsyncProcessRunner, ProcessSlots, get_process_runner
+
+
+def test_runner_is_shared_across_event_loops():
+    runners = []
+
+    async def fetch():
+        runners.append(get_process_runner())
+
+    threads = [threading.Thread(target=asyncio.run, args=(fetch(),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(runner) for runner in runners}) == 1
+
+
+def test_limit_holds_across_threads():
+    runner = AsyncProcessRunner(max_processes=2)
+    peak = 0
+    lock = threading.Lock()
+
+    def track(_line):
+        nonlocal peak
+        with lock:
+            peak = max(peak, runner.running)
+
+    async def scan():
+        return await asyncio.gather(*[
+            runner.run([sys.executable, '-c', 'import time; print(1, flush=True); time.sleep(0.2)'],
+                       line_callback=track)
+            for _ in range(3)
+        ])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.extend(asyncio.run(scan()))) for _ in range(4)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    runner.shutdown()
+
+    assert len(results) == 12 and all(result['success'] for result in results)
+    assert peak <= 2
+    # 12 procesos de 0.2 s de dos en dos
+    assert elapsed >= 1.1
+    assert runner.running == 0 and runner.stats['commands'] == 12
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    slots = ProcessSlots(1)
+
+    async def scenario():
+        await slots.acquire()
+        waiter = asyncio.ensure_future(slots.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        slots.release()
+        await asyncio.wait_for(slots.acquire(), 1)
+        slots.release()
+
+    asyncio.run(scenario())
+    assert slots.used == 0 and not slots.waiters
+
+
+def test_slot_handed_to_cancelled_waiter_is_returned():
+    slots = ProcessSlots(1)
+
+    async def scenario():
+        await slots.acquire()
+        waiter = asyncio.ensure_future(slots.acquire())
+        await asyncio.sleep(0)
+        # El hueco se entrega (grant pendiente en el loop) y el que espera se cancela antes
+        slots.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        await asyncio.wait_for(slots.acquire(), 1)
+        slots.release()
+
+    asyncio.run(scenario())
+    assert slots.used == 0
@@ -0,0 +1,64 @@
+"""
+KaliNova - Lectura del cuerpo HTTP por trozos y su decodificación
+
+    python -m pytest tests/test_read_body.py
+"""
+
+import asyncio
+import os
+import sys
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.scanner import BaseScanner
+
+BODY = 'café ' * 10 + '<b>error in your SQL syntax</b>' + ' ñ' * 5000
+
+
+def fetch(content_type: str, body: bytes = BODY.encode('utf-8'), **options):
+    async def handle(request):
+        return web.Response(body=body, headers={'Content-Type': content_type})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        url = 'http://127.0.0.1:%d/' % runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await BaseScanner(url, {}).async_http_request(session, url, capture_body=True, **options)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('charset', ['x-unknown-charset', 'base64', 'rot13', ''])
+def test_unknown_or_non_text_charset_falls_back_to_utf8(charset):
+    result = fetch(f"text/html; charset={charset}")
+    assert result['success'] and result['body'] == BODY and result['body_complete']
+
+
+def test_declared_charset_is_used():
+    result = fetch('text/html; charset=iso-8859-1', 'café'.encode('latin-1'))
+    assert result['body'] == 'café'
+
+
+def test_invalid_bytes_are_replaced():
+    result = fetch('text/html; charset=utf-8', b'ok \xff\xfe ok')
+    assert result['body'] == 'ok �� ok'
+
+
+def test_stop_pattern_and_limit():
+    result = fetch('text/html; charset=x-unknown-charset', stop_patterns=['sql syntax'])
+    assert result['matched_pattern'] is not None
+
+    result = fetch('text/html; charset=x-unknown-charset', max_body_bytes=20)
+    assert result['body_bytes'] == 20 and result['body'] == BODY.encode('utf-8')[:20].decode('utf-8', 'replace')
@@ -0,0 +1,142 @@
+"""
+KaliNova - Micro-lotes y políticas de descarte del detector en tiempo real
+
+    python -m pytest tests/test_realtime_detector.py
+"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+import types
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.ML import flow_state, tree_scorer
+
+
+def load(name: str, filename: str):
+    """Carga core/ML/<filename> como ml.<name>, el paquete que usan los módulos de ML"""
+    if f"ml.{name}" not in sys.modules:
+        spec = importlib.util.spec_from_file_location(f"ml.{name}", os.path.join(ROOT, 'core', 'ML', filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[f"ml.{name}"] = module
+        spec.loader.exec_module(module)
+    return sys.modules[f"ml.{name}"]
+
+
+sys.modules.setdefault('ml', types.ModuleType('ml'))
+sys.modules.setdefault('ml.flow_state', flow_state)
+sys.modules.setdefault('ml.tree_scorer', tree_scorer)
+load('feature_engineer', 'feature-engineer.py')
+load('model_registry', 'model_registry.py')
+realtime_detector = load('realtime_detector', os.path.join('Monitoring', 'realtime_detector.py'))
+RealTimeThreatDetector = realtime_detector.RealTimeThreatDetector
+NETWORK_FEATURES = sys.modules['ml.feature_engineer'].NETWORK_FEATURES
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    # Siempre "amenaza" con probabilidad 1
+    X = np.zeros((2, len(NETWORK_FEATURES)))
+    model = DummyClassifier(strategy='constant', constant=1).fit(X, [0, 1])
+    path = tmp_path / 'model.joblib'
+    joblib.dump(model, path)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def quiet_alerts(monkeypatch):
+    async def nothing(self, alert):
+        pass
+    monkeypatch.setattr(RealTimeThreatDetector, 'send_alert_notification', nothing)
+    monkeypatch.setattr(RealTimeThreatDetector, 'auto_mitigate', nothing)
+
+
+def packet(index: int) -> dict:
+    return {'id': index, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 40000,
+            'dst_port': 80, 'protocol': 'TCP', 'length': 100, 'timestamp': float(index)}
+
+
+def burst(detector, count: int):
+    """Encola `count` paquetes sin ceder el loop y devuelve sus veredictos tras vaciar la cola"""
+    async def scenario():
+        futures = [await detector.submit(packet(index)) for index in range(count)]
+        await detector.stop()
+        return [future.result() for future in futures]
+    return asyncio.run(scenario())
+
+
+def analyzed_ids(verdicts):
+    return [None if verdict is None else verdict['packet_data']['id'] for verdict in verdicts]
+
+
+def test_block_analyzes_everything_in_batches(model_path):
+    detector = RealTimeThreatDetector(model_path, batch_size=4, queue_size=2)
+    verdicts = burst(detector, 10)
+
+    assert analyzed_ids(verdicts) == list(range(10))
+    assert all(verdict['is_threat'] for verdict in verdicts)
+    stats = detector.get_detection_stats()
+    assert (stats['received'], stats['accepted'], stats['total_packets'], stats['dropped']) == (10, 10, 10, 0)
+    assert stats['detection_rate'] == 1.0 and stats['queue_depth'] == 0
+
+
+def test_drop_newest_rejects_incoming_packets(model_path):
+    detector = RealTimeThreatDetector(model_path, queue_size=3, drop_policy='drop_newest')
+    verdicts = burst(detector, 5)
+
+    assert analyzed_ids(verdicts) == [0, 1, 2, None, None]
+    stats = detector.stats
+    assert (stats['received'], stats['accepted'], stats['total_packets'], stats['dropped']) == (5, 3, 3, 2)
+
+
+def test_drop_oldest_evicts_queued_packets(model_path):
+    detector = RealTimeThreatDetector(model_path, queue_size=3, drop_policy='drop_oldest')
+    verdicts = burst(detector, 5)
+
+    assert analyzed_ids(verdicts) == [None, None, 2, 3, 4]
+    stats = detector.stats
+    assert (stats['received'], stats['accepted'], stats['total_packets'], stats['dropped']) == (5, 5, 3, 2)
+
+
+def test_detection_rate_ignores_dropped_packets(model_path):
+    detector = RealTimeThreatDetector(model_path, queue_size=2, drop_policy='drop_newest')
+    burst(detector, 8)
+    stats = detector.get_detection_stats()
+    # Solo se predijeron 2 paquetes y los 2 son amenaza
+    assert stats['threats_detected'] == 2 and stats['detection_rate'] == 1.0
+
+
+def test_max_wait_flushes_partial_batch(model_path):
+    async def scenario():
+        detector = RealTimeThreatDetector(model_path, batch_size=256, max_wait=0.01)
+        verdict = await asyncio.wait_for(detector.analyze_packet(packet(0)), 1)
+        await detector.stop()
+        return detector, verdict
+
+    detector, verdict = asyncio.run(scenario())
+    assert verdict['packet_data']['id'] == 0 and detector.stats['batches'] == 1
+
+
+def test_failed_batch_resolves_to_none(model_path, monkeypatch):
+    detector = RealTimeThreatDetector(model_path, batch_size=4)
+
+    def broken(matrix, active=None):
+        raise RuntimeError('modelo roto')
+    monkeypatch.setattr(detector, 'predict_batch', broken)
+    verdicts = burst(detector, 6)
+
+    assert verdicts == [None] * 6
+    assert detector.stats['errors'] == 2 and detector.stats['dropped'] == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        RealTimeThreatDetector(drop_policy='drop_random')
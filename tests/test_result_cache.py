@@ -0,0 +1,191 @@
+"""
+KaliNova - Caché persistente de resultados: TTL y re-escaneos incrementales
+
+    python -m pytest tests/test_result_cache.py
+"""
+
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Los escáneres se importan como desde Core/main.py (`modules.*`, `config.settings`)
+sys.path[:0] = [os.path.join(ROOT, 'Core'), ROOT]
+
+from core import result_cache
+from core.result_cache import ResultCache, config_hash
+from modules.network_scanner import NetworkScanner
+from modules.web_scanner import WebScanner
+
+CFG = config_hash({})
+
+
+class Clock:
+    """Sustituye time.time() en core.result_cache"""
+
+    def __init__(self, monkeypatch, now: float = 1_700_000_000.0):
+        self.now = now
+        monkeypatch.setattr(result_cache.time, 'time', lambda: self.now)
+
+
+def test_ttl_per_result_type(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    cache = ResultCache(str(tmp_path / 'cache.db'), ttls={'port_scan': 100})
+    cache.put('t', 'network', CFG, 'port_scan', [22, 80], key='10.0.0.1')
+    cache.put('t', 'network', CFG, 'active_hosts', ['10.0.0.1'])
+
+    assert cache.get('t', 'network', CFG, 'port_scan', key='10.0.0.1') == [22, 80]
+    assert cache.get('t', 'network', CFG, 'port_scan', key='10.0.0.2') is None
+    assert cache.get('t', 'network', config_hash({'ports': '1-10'}), 'port_scan', key='10.0.0.1') is None
+
+    clock.now += 101
+    assert cache.get('t', 'network', CFG, 'port_scan', key='10.0.0.1') is None
+    # active_hosts conserva su TTL por defecto (1 h)
+    assert cache.get('t', 'network', CFG, 'active_hosts') == ['10.0.0.1']
+    assert cache.purge_expired() == 1
+    assert cache.stats == {'hits': 2, 'misses': 3, 'writes': 2}
+    cache.close()
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = ResultCache(path)
+    cache.put('t', 'web', CFG, 'dir_enumeration', [{'url': 'http://t/admin', 'status': 200}])
+    cache.close()
+
+    cache = ResultCache(path)
+    assert cache.get('t', 'web', CFG, 'dir_enumeration') == [{'url': 'http://t/admin', 'status': 200}]
+    cache.invalidate('t', 'web')
+    assert cache.get('t', 'web', CFG, 'dir_enumeration') is None
+    cache.close()
+
+
+def test_config_hash_ignores_volatile_keys():
+    assert config_hash({'threads': 4, 'timeout': 5, 'checkpoint_dir': '/tmp/a'}) == config_hash({'threads': 4})
+    assert config_hash({'threads': 4}) != config_hash({'threads': 8})
+
+
+def test_host_stage_scans_only_stale_hosts(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    cache = ResultCache(str(tmp_path / 'cache.db'), ttls={'port_scan': 100})
+    scanned = []
+
+    async def run(hosts):
+        scanned.append(list(hosts))
+        # 10.0.0.3 falla: no debe quedar en caché
+        return {host: [{'host': host, 'port': '22'}] for host in hosts if host != '10.0.0.3'}
+
+    def stage(hosts):
+        scanner = NetworkScanner('10.0.0.0/24', {})
+        scanner.cache = cache
+        return asyncio.run(scanner.cached_host_stage('port_scan', hosts, run))
+
+    stage(['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+    clock.now += 50
+    result = stage(['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4'])
+    clock.now += 60
+    stage(['10.0.0.1', '10.0.0.4'])
+
+    assert scanned == [['10.0.0.1', '10.0.0.2', '10.0.0.3'], ['10.0.0.3', '10.0.0.4'], ['10.0.0.1']]
+    assert sorted(result) == ['10.0.0.1', '10.0.0.2', '10.0.0.4']
+    cache.close()
+
+
+class StubSite:
+    """Servidor HTTP local: `paths` ruta -> código de estado; el resto es 404"""
+
+    def __init__(self, paths):
+        self.paths = dict(paths)
+        self.requests = []
+        self.runner = None
+
+    async def handle(self, request):
+        self.requests.append(request.path)
+        return web.Response(status=self.paths.get(request.path, 404), text=f"page {request.path}")
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_route('GET', '/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        return 'http://127.0.0.1:%d/' % self.runner.addresses[0][1]
+
+    async def close(self):
+        await self.runner.cleanup()
+
+
+def wordlist_file(tmp_path, words):
+    path = tmp_path / 'words.txt'
+    path.write_text('\n'.join(words) + '\n')
+    return path
+
+
+def rescan(cache, site, config, between=None):
+    """Dos dir_enumeration seguidas contra el mismo sitio; `between` lo modifica entre ambas"""
+    async def scenario():
+        url = await site.start()
+        results = []
+        for run in range(2):
+            scanner = WebScanner(url, config)
+            scanner.cache = cache
+            writes = cache.stats['writes']
+            results.append(await scanner.dir_enumeration())
+            results.append(cache.stats['writes'] - writes)
+            if run == 0 and between:
+                between()
+        await site.close()
+        return url, results
+
+    return asyncio.run(scenario())
+
+
+def test_dir_enumeration_revalidates_cached_hits(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    config = {'wordlist': str(wordlist_file(tmp_path, ['admin', 'login', 'backup', 'missing'])),
+              'soft404_samples': 1}
+    site = StubSite({'/admin': 200, '/login': 302, '/backup': 200})
+
+    def change():
+        site.paths['/backup'] = 404
+        site.requests.clear()
+
+    url, (first, first_writes, second, second_writes) = rescan(cache, site, config, change)
+
+    assert sorted(first['dir_enumeration']) == [url + 'admin', url + 'backup', url + 'login']
+    assert first_writes == 1
+    # El re-escaneo solo pide las rutas cacheadas (más las sondas de soft-404), no el wordlist
+    assert '/missing' not in site.requests
+    assert sorted(second['dir_enumeration']) == [url + 'admin', url + 'login']
+    assert second['dir_enumeration_changes'] == [{'url': url + 'backup', 'old_status': 200, 'status': 404}]
+    assert second_writes == 1
+    cached = cache.get(url, 'web', config_hash(config), 'dir_enumeration')
+    assert sorted(hit['url'] for hit in cached) == [url + 'admin', url + 'login']
+    cache.close()
+
+
+def test_unchanged_revalidation_does_not_rewrite(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    site = StubSite({'/admin': 200})
+    config = {'wordlist': str(wordlist_file(tmp_path, ['admin', 'nope'])), 'soft404_samples': 1}
+    url, (_, _, second, writes) = rescan(cache, site, config)
+
+    assert second == {'dir_enumeration': [url + 'admin'], 'dir_enumeration_changes': []}
+    assert writes == 0 and site.requests.count('/nope') == 1
+    cache.close()
+
+
+def test_failed_enumeration_is_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    config = {'wordlist': str(wordlist_file(tmp_path, ['admin', 'login'])), 'soft404_samples': 1}
+    # Puerto sin servidor: ninguna sonda obtiene respuesta
+    scanner = WebScanner('http://127.0.0.1:9/', config)
+    scanner.cache = cache
+    result = asyncio.run(scanner.dir_enumeration())
+
+    assert result['dir_enumeration'] == []
+    assert cache.stats['writes'] == 0 and scanner.cache_get('dir_enumeration') is None
+    cache.close()
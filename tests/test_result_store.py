@@ -0,0 +1,121 @@
+"""
+KaliNova - Almacén de resultados en streaming (SQLite)
+
+    python -m pytest tests/test_result_store.py
+"""
+
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from core.result_store import ResultStore
+
+
+def committed(path, query='SELECT kind, key, data FROM records ORDER BY id'):
+    """Lo que ve otra conexión: solo lo ya confirmado"""
+    other = sqlite3.connect(path)
+    try:
+        return other.execute(query).fetchall()
+    finally:
+        other.close()
+
+
+def test_commits_are_batched(tmp_path):
+    path = str(tmp_path / 'results.db')
+    store = ResultStore(path, commit_every=3, commit_interval=3600)
+    run_id = store.start_run('t')
+
+    store.append(run_id, 't', 'web', 'host', {'address': 'a'}, key='a')
+    store.append_result(run_id, 't', 'web', {'headers': {}})
+    assert committed(path) == []
+    store.append_finding(run_id, 't', 'web', {'fingerprint': 'f1', 'severity': 'high'})
+    assert len(committed(path)) == 3
+
+    # Un hallazgo repetido no cuenta para el lote
+    assert not store.append_finding(run_id, 't', 'web', {'fingerprint': 'f1', 'severity': 'high'})
+    store.append(run_id, 't', 'web', 'host', {'address': 'b'}, key='b')
+    assert len(committed(path)) == 3
+    store.flush()
+    assert len(committed(path)) == 4
+
+    store.append(run_id, 't', 'web', 'host', {'address': 'c'}, key='c')
+    store.finish_run(run_id)
+    assert len(committed(path)) == 5
+    store.close()
+
+
+def test_section_replacement_is_atomic(tmp_path):
+    path = str(tmp_path / 'results.db')
+    store = ResultStore(path, commit_every=1)
+    run_id = store.start_run('t')
+    store.append_result(run_id, 't', 'network', {'port_scan': [22], 'os': 'linux'})
+    store.append_result(run_id, 't', 'network', {'port_scan': [22, 80], 'services': ['ssh']})
+
+    rows = committed(path)
+    assert [(key, json.loads(data)) for _, key, data in rows] == [
+        ('os', 'linux'), ('port_scan', [22, 80]), ('services', ['ssh'])]
+
+    class Unserializable:
+        def __str__(self):
+            raise RuntimeError('no serializable')
+
+    # Un valor que no se puede serializar no deja la sección borrada
+    try:
+        store.append_result(run_id, 't', 'network', {'port_scan': Unserializable()})
+    except RuntimeError:
+        pass
+    assert committed(path) == rows
+    store.close()
+
+
+def test_concurrent_section_updates_keep_one_record(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'), commit_every=7)
+    run_id = store.start_run('t')
+
+    def update(worker):
+        for index in range(50):
+            store.append_result(run_id, 't', 'web', {'progress': [worker, index], 'last': worker})
+
+    threads = [threading.Thread(target=update, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+
+    keys = [key for _, key, _ in committed(store.path)]
+    assert sorted(keys) == ['last', 'progress']
+
+
+def test_report_includes_hosts(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    run_id = store.start_run('10.0.0.0/30')
+    store.append_result(run_id, '10.0.0.0/30', 'network', {'active_hosts': ['10.0.0.1', '10.0.0.2']})
+    store.append(run_id, '10.0.0.0/30', 'network', 'host', {'address': '10.0.0.2', 'status': 'up'}, key='10.0.0.2')
+    store.append(run_id, '10.0.0.0/30', 'network', 'host', {'address': '10.0.0.1', 'status': 'up'}, key='10.0.0.1')
+    store.append(run_id, '10.0.0.0/30', 'network', 'host',
+                 {'address': '10.0.0.1', 'ports': [{'port': 22}]}, key='10.0.0.1')
+    store.append_finding(run_id, '10.0.0.0/30', 'network', {'fingerprint': 'x', 'severity': 'low'})
+    store.finish_run(run_id)
+
+    report = io.StringIO()
+    store.write_report(run_id, report)
+    data = json.loads(report.getvalue())
+    assert data['results'] == {'network': {'active_hosts': ['10.0.0.1', '10.0.0.2']}}
+    assert list(data['hosts']) == ['10.0.0.1', '10.0.0.2']
+    assert data['hosts']['10.0.0.1'] == [{'module': 'network', 'address': '10.0.0.1', 'status': 'up'},
+                                         {'module': 'network', 'address': '10.0.0.1', 'ports': [{'port': 22}]}]
+    assert data['summary'] == {'low': 1} and len(data['vulnerabilities']) == 1
+
+    # Una ejecución sin registros sigue dando un JSON válido
+    empty = store.start_run('t')
+    report = io.StringIO()
+    store.write_report(empty, report)
+    assert json.loads(report.getvalue())['hosts'] == {}
+    store.close()
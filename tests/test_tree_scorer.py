@@ -0,0 +1,154 @@
+"""
+KaliNova - Paridad del scorer de árboles aplanados con predict_proba
+
+    python -m pytest tests/test_tree_scorer.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import (RandomForestClassifier, ExtraTreesClassifier, VotingClassifier,
+                              IsolationForest)
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'core', 'ML')]
+
+from tree_scorer import flatten_model, check_parity
+
+
+def dataset(n_classes: int = 2, n_samples: int = 600, n_features: int = 8, seed: int = 0):
+    X, y = make_classification(n_samples=n_samples, n_features=n_features, n_informative=5,
+                               n_classes=n_classes, random_state=seed)
+    return X.astype(np.float32), y
+
+
+def assert_parity(model, X):
+    scorer = flatten_model(model)
+    parity = check_parity(model, scorer, X)
+    assert parity['ok'], parity
+    np.testing.assert_array_equal(scorer.predict(X), model.predict(X))
+    return scorer
+
+
+def test_random_forest():
+    X, y = dataset()
+    model = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(X, y)
+    assert_parity(model, X)
+
+
+def test_decision_tree_and_extra_trees():
+    X, y = dataset()
+    assert_parity(DecisionTreeClassifier(random_state=0).fit(X, y), X)
+    assert_parity(ExtraTreesClassifier(n_estimators=20, random_state=0).fit(X, y), X)
+
+
+def test_soft_voting():
+    X, y = dataset()
+    model = VotingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=20, random_state=0)),
+                    ('et', ExtraTreesClassifier(n_estimators=20, random_state=0))],
+        voting='soft', weights=[2, 1]
+    ).fit(X, y)
+    assert_parity(model, X)
+
+
+def test_soft_voting_with_dropped_estimator():
+    X, y = dataset()
+    model = VotingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=20, random_state=0)), ('skip', 'drop'),
+                    ('et', ExtraTreesClassifier(n_estimators=20, random_state=0))],
+        voting='soft', weights=[1, 5, 3]
+    ).fit(X, y)
+    assert_parity(model, X)
+
+
+def test_multiclass():
+    X, y = dataset(n_classes=4)
+    model = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+    scorer = assert_parity(model, X)
+    assert scorer.predict_proba(X).shape == (len(X), 4)
+
+
+def test_string_labels():
+    X, y = dataset(n_classes=3)
+    labels = np.array(['benign', 'scan', 'flood'])[y]
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, labels)
+    scorer = assert_parity(model, X)
+    assert set(scorer.predict(X)) <= {'benign', 'scan', 'flood'}
+
+
+def test_nan_inputs():
+    X, y = dataset()
+    rng = np.random.default_rng(0)
+    X_missing = X.copy()
+    X_missing[rng.random(X.shape) < 0.1] = np.nan
+    # sklearn >= 1.3 aprende hacia qué lado van los NaN en cada nodo
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X_missing, y)
+    assert_parity(model, X_missing)
+    assert_parity(model, np.full((5, X.shape[1]), np.nan, dtype=np.float32))
+
+
+def test_single_row_and_empty_batch():
+    X, y = dataset()
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    scorer = assert_parity(model, X[:1])
+    assert scorer.predict_proba(X[:0]).shape == (0, 2)
+
+
+def test_apply_matches_sklearn_leaves():
+    # Los nodos se renumeran en anchura: se compara la partición de filas por hoja, no los índices
+    X, y = dataset()
+    model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+    leaves = flatten_model(model).apply(X)[:, 0]
+    pairs = set(zip(leaves.tolist(), model.apply(X).tolist()))
+    assert len(pairs) == len(set(leaves.tolist())) == len(set(model.apply(X).tolist()))
+
+
+@pytest.mark.parametrize('model', [
+    IsolationForest(n_estimators=10, random_state=0),
+    LogisticRegression(),
+])
+def test_unsupported_models(model):
+    X, y = dataset()
+    model.fit(X, y)
+    with pytest.raises(TypeError):
+        flatten_model(model)
+
+
+def test_hard_voting_is_rejected():
+    X, y = dataset()
+    model = VotingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=5, random_state=0)),
+                    ('et', ExtraTreesClassifier(n_estimators=5, random_state=0))],
+        voting='hard'
+    ).fit(X, y)
+    with pytest.raises(TypeError, match='soft'):
+        flatten_model(model)
+
+
+def test_wrong_feature_count():
+    X, y = dataset()
+    scorer = flatten_model(RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y))
+    with pytest.raises(ValueError):
+        scorer.predict_proba(X[:, :-1])
+
+
+def test_xgboost():
+    xgb = pytest.importorskip('xgboost')
+    X, y = dataset()
+    X[::7, 2] = np.nan
+    model = xgb.XGBClassifier(n_estimators=30, max_depth=4, random_state=0).fit(X, y)
+    assert_parity(model, X)
+
+
+def test_xgboost_multiclass_is_rejected():
+    xgb = pytest.importorskip('xgboost')
+    X, y = dataset(n_classes=3)
+    model = xgb.XGBClassifier(n_estimators=5, random_state=0).fit(X, y)
+    with pytest.raises(TypeError):
+        flatten_model(model)